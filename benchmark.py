@@ -0,0 +1,284 @@
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from calculation import Calculations
+from chunked_io import calculation_column_names
+from mysql_database import CSVImporter, DataProcessor
+from ploting import Plot
+from storage_backend import SQLiteBackend
+
+# Number of training functions, as in the project data
+TRAINING_FUNCTIONS = 4
+
+
+def _load_read_csv():
+    """
+    Imports ReadCsv from 'read csv files.py', whose file name is not a valid module name.
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'read csv files.py')
+    spec = importlib.util.spec_from_file_location('read_csv_files', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.ReadCsv
+
+
+def make_dataset(rows, n_ideal, n_test, noise=0.3, outliers=0.1, seed=0):
+    """
+    Generates synthetic train / ideal / test data with the shape of the project data.
+
+    The ideal functions are random mixes of sines and lines on an X grid of `rows` points in [-20, 20]; the
+    training functions are four of them plus Gaussian noise, and the test points are taken at random grid X
+    values from the chosen functions, with a share of `outliers` placed far away from every function.
+
+    Returns:
+        tuple: (df_train, df_ideal, df_test) with the column names Calculations expects, plus the list of the
+            ideal columns the training functions were generated from.
+    """
+    rng = np.random.default_rng(seed)
+    x = np.round(np.linspace(-20, 20, rows), 6)
+    amplitude, frequency, phase, slope, offset = (rng.uniform(low, high, n_ideal) for low, high in
+                                                 ((0.5, 20), (0.05, 2), (0, np.pi), (-3, 3), (-50, 50)))
+    ideal = amplitude * np.sin(frequency * x[:, None] + phase) + slope * x[:, None] + offset
+
+    chosen = rng.choice(n_ideal, TRAINING_FUNCTIONS, replace=False)
+    train = ideal[:, chosen] + rng.normal(0, noise, (rows, TRAINING_FUNCTIONS))
+
+    test_rows = rng.integers(0, rows, n_test)
+    test_funcs = chosen[rng.integers(0, TRAINING_FUNCTIONS, n_test)]
+    test_y = ideal[test_rows, test_funcs] + rng.normal(0, noise, n_test)
+    far = rng.random(n_test) < outliers
+    test_y[far] += rng.choice([-1, 1], far.sum()) * (np.abs(ideal).max() + 100)
+
+    df_ideal = pd.DataFrame(np.column_stack([x, ideal]), columns=calculation_column_names('ideal', n_ideal + 1))
+    df_train = pd.DataFrame(np.column_stack([x, train]),
+                            columns=calculation_column_names('training', TRAINING_FUNCTIONS + 1))
+    df_test = pd.DataFrame({'X (test func)': x[test_rows], 'Y (test func)': test_y})
+    return df_train, df_ideal, df_test, [df_ideal.columns[1 + i] for i in chosen]
+
+
+def write_csv_files(directory, df_train, df_ideal, df_test):
+    """
+    Writes the frames as train.csv, ideal.csv and test.csv with the headers of the project files (x, y1, ...).
+    """
+    paths = {}
+    for name, frame in (('train', df_train), ('ideal', df_ideal), ('test', df_test)):
+        raw = frame.copy()
+        raw.columns = ['x', 'y'] if name == 'test' else ['x'] + [f'y{i}' for i in range(1, frame.shape[1])]
+        paths[name] = os.path.join(directory, f'{name}.csv')
+        raw.to_csv(paths[name], index=False)
+    return paths
+
+
+class StageBenchmark:
+    """
+    Times pipeline stages on synthetic data and collects machine-readable results.
+
+    Every stage runs once under tracemalloc to record the peak of Python/NumPy allocations (worker processes of
+    the parallel engines are not traced), then `repeat` more times untraced for the timings.
+
+    Attributes:
+        repeat (int): Timed runs per stage.
+        results (list of dict): One record per stage and dataset size: 'stage', 'variant', dataset axes,
+            'seconds' (median), 'seconds_min', 'items', 'items_per_second' and 'peak_bytes'.
+
+    Methods:
+        measure(stage, variant, fn, items, setup=None, **labels): Runs and records one stage.
+        run_size(rows, n_ideal, n_test, workdir, ...): Runs every stage for one dataset size.
+        report(path=None): Returns (and optionally writes) the results as a JSON document.
+    """
+    def __init__(self, repeat=3):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, stage, variant, fn, items, setup=None, **labels):
+        """
+        Runs `fn` (after `setup`, when given, outside the measurement) and records its median time, throughput
+        in `items` per second and peak traced memory.
+
+        Returns:
+            The value returned by the last run of `fn`.
+        """
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            value = fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            gc.collect()
+            start = time.perf_counter()
+            value = fn()
+            timings.append(time.perf_counter() - start)
+
+        seconds = statistics.median(timings) if timings else float('nan')
+        record = dict(labels, stage=stage, variant=variant, seconds=seconds,
+                      seconds_min=min(timings) if timings else float('nan'), items=items,
+                      items_per_second=items / seconds if timings and seconds > 0 else None, peak_bytes=peak)
+        self.results.append(record)
+        print(f"{stage:<22} {variant:<12} {seconds * 1000:10.2f} ms  {peak / 1e6:9.2f} MB peak")
+        return value
+
+    def run_size(self, rows, n_ideal, n_test, workdir, criteria_engines=('vectorized', 'fused', 'loop'),
+                 result_engines=('vectorized', 'loop'), workers=None, dashboard=True):
+        """
+        Generates one dataset size and benchmarks the CSV load into SQL, the CSV import, the SSD selection, the
+        test assignment, the database matching and the dashboard on it, using an SQLite file in `workdir` as the
+        database.
+        """
+        labels = {'rows': rows, 'n_ideal': n_ideal, 'n_test': n_test}
+        print(f"\n# rows={rows} ideal functions={n_ideal} test points={n_test}")
+        df_train, df_ideal, df_test, _ = make_dataset(rows, n_ideal, n_test)
+        paths = write_csv_files(workdir, df_train, df_ideal, df_test)
+        db_path = os.path.join(workdir, 'benchmark.db')
+        backend = SQLiteBackend(db_path)
+        cells = rows * (TRAINING_FUNCTIONS + n_ideal + 1) + 2 * n_test
+
+        # ReadCsv.read_csv_to_sql, sequential and concurrent
+        read_csv = _load_read_csv()
+        tabels = {name: [(col, 'FLOAT') for col in frame.columns]
+                  for name, frame in (('train', df_train), ('ideal', df_ideal), ('test', df_test))}
+        loader = read_csv(None, None, None, None, None, None, workdir, ['train.csv', 'ideal.csv', 'test.csv'], tabels,
+                          {'train.csv': 'train', 'ideal.csv': 'ideal', 'test.csv': 'test'}, backend=backend)
+        for concurrent in (False, True):
+            self.measure('read_csv_to_sql', 'concurrent' if concurrent else 'sequential',
+                         lambda: loader.read_csv_to_sql(concurrent=concurrent, keep_frames=[]), cells, **labels)
+
+        # CSVImporter.import_csv_to_db into id-keyed tables
+        importer = CSVImporter(None, None, None, None, backend=backend)
+        importer.connect()
+        ideal_columns = ', '.join(f'y{i} FLOAT' for i in range(1, n_ideal + 1))
+        ddl = ["DROP TABLE IF EXISTS ideal_db", "DROP TABLE IF EXISTS test_db", "DROP TABLE IF EXISTS mapping",
+               f"CREATE TABLE ideal_db (id INTEGER PRIMARY KEY, x FLOAT, {ideal_columns})",
+               "CREATE TABLE test_db (id INTEGER PRIMARY KEY, x FLOAT, y FLOAT)",
+               "CREATE TABLE mapping (id INTEGER PRIMARY KEY, x FLOAT, y FLOAT, ideal_function VARCHAR(255), "
+               "deviation FLOAT, UNIQUE (x, y))"]
+
+        def reset_tables():
+            for statement in ddl:
+                importer.cursor.execute(statement)
+            importer.connection.commit()
+
+        def import_all():
+            importer.import_csv_to_db(paths['ideal'], 'ideal_db')
+            importer.import_csv_to_db(paths['test'], 'test_db')
+
+        self.measure('import_csv_to_db', 'batched', import_all, rows * (n_ideal + 1) + 2 * n_test,
+                     setup=reset_tables, **labels)
+        importer.disconnect()
+
+        # Calculations: SSD selection and test assignment
+        pairs = rows * TRAINING_FUNCTIONS * n_ideal
+        calculations = None
+        for engine in criteria_engines:
+            calculations = Calculations(df_train, df_ideal, df_test)
+            self.measure('calculate_criteria1', engine,
+                         lambda: calculations.calculate_criteria1(engine, workers=workers), pairs, **labels)
+        if calculations is None:
+            calculations = Calculations(df_train, df_ideal, df_test)
+            calculations.calculate_criteria1('fused')
+        if not calculations.adjusted_deviations:
+            calculations.deviations()
+        for engine in result_engines:
+            def assign():
+                calculations.test_results = []
+                calculations.results(engine, workers)
+            self.measure('results', engine, assign, n_test, **labels)
+
+        # DataProcessor: client-side and in-database matching against the imported tables
+        funcs = {f'y{i}': func.split(' ')[0].lower()
+                 for i, func in enumerate(calculations.top_four_ideal_functions, start=1)}
+        thresholds = {func.split(' ')[0].lower(): value for func, value in calculations.adjusted_deviations.items()}
+        processor = DataProcessor(None, None, None, None, backend=backend)
+        processor.connect()
+        self.measure('process_test_data', 'python',
+                     lambda: processor.process_test_data(paths['test'], 'ideal_db', 'mapping', funcs, mode='replace'),
+                     n_test, **labels)
+        self.measure('process_test_data', 'in_db',
+                     lambda: processor.process_test_data_in_db('test_db', 'ideal_db', 'mapping', funcs, thresholds,
+                                                               mode='replace'), n_test, **labels)
+        processor.disconnect()
+
+        if dashboard:
+            results = pd.DataFrame(calculations.get_test_results())
+            filename = os.path.join(workdir, 'dashboard.html')
+            # A new Plot per run measures a full render; the cached variant re-renders unchanged inputs
+            self.measure('dashboard', 'bokeh',
+                         lambda: Plot(calculations.get_ssd_sums(), results).dashboard(show_plot=False, filename=filename),
+                         n_ideal * TRAINING_FUNCTIONS + n_test, **labels)
+            plot = Plot(calculations.get_ssd_sums(), results)
+            plot.dashboard(show_plot=False, filename=filename)
+            self.measure('dashboard', 'bokeh_cached', lambda: plot.dashboard(show_plot=False, filename=filename),
+                         n_ideal * TRAINING_FUNCTIONS + n_test, **labels)
+
+    def report(self, path=None):
+        """
+        Returns the results with the machine and library versions as a JSON-serializable dictionary, and writes
+        it to `path` when given.
+        """
+        document = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                        'cpus': os.cpu_count(), 'python': platform.python_version(),
+                        'numpy': np.__version__, 'pandas': pd.__version__},
+            'repeat': self.repeat,
+            'results': self.results,
+        }
+        if path:
+            with open(path, 'w') as output:
+                json.dump(document, output, indent=2)
+            print(f"\nBenchmark results written to {path}")
+        return document
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g.
+
+        python benchmark.py --rows 400 4000 --ideal 50 500 --test 100 --engines vectorized fused --output bench.json
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data (offline, SQLite).")
+    parser.add_argument('--rows', type=int, nargs='+', default=[400], help="X rows of the generated data")
+    parser.add_argument('--ideal', type=int, nargs='+', default=[50], help="number of ideal functions")
+    parser.add_argument('--test', type=int, nargs='+', default=[100], help="number of test points")
+    parser.add_argument('--engines', nargs='+', default=['vectorized', 'fused', 'loop'],
+                        help="calculate_criteria1 engines to compare (vectorized, fused, loop, parallel)")
+    parser.add_argument('--result-engines', nargs='+', default=['vectorized', 'loop'],
+                        help="results engines to compare (vectorized, loop, parallel)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes of the parallel engines")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage")
+    parser.add_argument('--no-dashboard', action='store_true', help="skip the Plot.dashboard stage")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON results file")
+    args = parser.parse_args(argv)
+
+    benchmark = StageBenchmark(repeat=args.repeat)
+    for rows in args.rows:
+        for n_ideal in args.ideal:
+            for n_test in args.test:
+                workdir = tempfile.mkdtemp(prefix='benchmark-')
+                try:
+                    benchmark.run_size(rows, n_ideal, n_test, workdir, args.engines, args.result_engines,
+                                       args.workers, not args.no_dashboard)
+                finally:
+                    shutil.rmtree(workdir, ignore_errors=True)
+    return benchmark.report(args.output)
+
+
+if __name__ == '__main__':
+    main()
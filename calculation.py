@@ -1,133 +1,598 @@
-import pandas as pd
-import numpy as np
-
-class Calculations:
-    """
-    A class to perform calculations comparing training functions to ideal functions, including SSD calculation, 
-    identifying top ideal functions, calculating deviations, and determining the best matches for test functions.
-
-    Attributes:
-        df_train (pd.DataFrame): DataFrame containing training function data sorted by 'X'.
-        df_ideal (pd.DataFrame): DataFrame containing ideal function data sorted by 'X'.
-        df_test (pd.DataFrame): DataFrame containing test function data.
-    
-    Methods:
-        calculate_criteria1(): Calculates the SSD for each training function against all ideal functions and identifies the top ideal function for each training function.
-        
-        get_ssd_sums(): Returns the dictionary containing SSD sums for each training function comparison with ideal functions.
-        
-        get_top_four_ideal_functions(): Returns the list of top four ideal functions with the lowest SSD for each training function.
-        
-        deviations(): Calculates maximum deviations for each ideal function against training functions and adjusts them by a factor of sqrt(2).
-        
-        get_adjusted_deviation(): Returns the dictionary containing adjusted maximum deviations for each ideal function.
-        
-        results(): Determines the best match for each test function based on the deviations and the selected top ideal functions. Stores the results in `test_results`.
-        
-        get_test_results(): Returns the list of dictionaries containing test results with best matches.
-    """
-    def __init__(self, df_train, df_ideal, df_test):
-        
-        """
-        Initializes the Calculations class with training, ideal, and test data.
-        """
-        self.df_train = df_train.sort_values(by='X')
-        self.df_ideal = df_ideal.sort_values(by='X')
-        self.df_test = df_test
-        self.ssd_sums = {}
-        self.top_four_ideal_functions = []
-        self.adjusted_deviations = {}
-        self.test_results = []
-
-    def calculate_criteria1(self):
-        """
-        Calculates the sum of squared differences (SSD) between each training function and all ideal functions.
-        Identifies the top ideal function with the lowest SSD for each training function.
-        """
-        for j in range(1, 5):  # Assuming df_train has columns like 'Y1', 'Y2', 'Y3', 'Y4' for training functions
-            ssd_sums1 = {}
-            for i in range(1, 51):  # Assuming 50 ideal functions
-                col_name = f'Y{i} (ideal func)'
-                ssd = ((self.df_train.iloc[:, j] - self.df_ideal[col_name])**2).sum()
-                ssd_sums1[col_name] = ssd
-            self.ssd_sums[f'Y{j} (training func)'] = ssd_sums1
-            # Sort and find the ideal function with the lowest SSD
-            self.top_four_ideal_functions.append(sorted(ssd_sums1, key=ssd_sums1.get)[0])
-        print("Top ideal function for each training function:", self.top_four_ideal_functions)
-
-    def get_ssd_sums(self):
-        """
-        Returns the dictionary of SSD sums for each training function.
-        """
-        return self.ssd_sums
-
-    def get_top_four_ideal_functions(self):
-        """
-        Returns the list of top four ideal functions based on SSD sums.
-        """
-        return self.top_four_ideal_functions
-    
-    def deviations(self):
-        """
-        Calculates maximum deviations for each ideal function across all training functions and adjusts them
-        by a factor of sqrt(2).
-        """
-        top_four_ideal_functions = self.top_four_ideal_functions
-        # Assuming the training function columns are named 'Y1 (training func)', 'Y2 (training func)', etc.
-        training_function_columns = ['Y1 (training func)', 'Y2 (training func)', 'Y3 (training func)', 'Y4 (training func)']
-
-        max_deviations = {}
-        for ideal_func in top_four_ideal_functions:
-            all_deviations = []
-            for train_func in training_function_columns:
-                # Here, we calculate deviations for each training function against the current ideal function
-                deviations = np.abs(self.df_train[train_func] - self.df_ideal[ideal_func])
-                all_deviations.append(deviations)
-            
-            # Combine deviations from all training functions for the current ideal function
-            combined_deviations = np.concatenate(all_deviations)
-            max_deviations[ideal_func] = np.max(combined_deviations)
-
-        # Adjust max deviations by factor sqrt(2)
-        adjustment_factor = np.sqrt(2)
-        self.adjusted_deviations = {func: deviation * adjustment_factor for func, deviation in max_deviations.items()}
-
-    def get_adjusted_deviation(self):
-        """
-        Returns the dictionary of adjusted deviations for each ideal function.
-        """
-        return self.adjusted_deviations
-    
-    def results(self):
-        """
-        Finds the best match for each test function based on deviations and stores the results.
-        """
-        def find_best_match(x_val, y_val, chosen_functions, df_ideal, adjusted_deviations):
-            best_match = {'func': None, 'deviation': np.inf}
-            
-            for func in chosen_functions:
-                ideal_y_val = df_ideal.loc[df_ideal['X'] == x_val, func].iloc[0]
-                deviation = np.abs(ideal_y_val - y_val)
-                
-                if deviation < adjusted_deviations[func] and deviation < best_match['deviation']:
-                    best_match = {'func': func, 'deviation': deviation}
-            
-            return best_match
-
-        for index, row in self.df_test.iterrows():
-            match = find_best_match(row['X (test func)'], row['Y (test func)'], self.top_four_ideal_functions, self.df_ideal, self.adjusted_deviations)
-            self.test_results.append({
-                'X (test func)': row['X (test func)'],
-                'Y (test func)': row['Y (test func)'],
-                'Delta Y (test func)': match['deviation'] if match['func'] else None,
-                'No. of ideal func': match['func']
-                
-            })
-            
-    def get_test_results(self):
-        """
-        Returns the list of test results containing the best matches for the test functions.
-        """
-        return self.test_results
-
-
+import pandas as pd
+import numpy as np
+from ssd_engine import SSDAccumulator, adjusted_deviations, as_block, ssd_and_max_deviation, ssd_matrix, top_k_search
+from matching import assign_points
+from grid_index import XGridIndex
+from parallel import parallel_assign_points, parallel_ssd_and_max_deviation
+from dataset import ArrayDataset
+from streaming import ResultBatch
+from instrumentation import instrumentation
+
+class Calculations:
+    """
+    A class to perform calculations comparing training functions to ideal functions, including SSD calculation, 
+    identifying top ideal functions, calculating deviations, and determining the best matches for test functions.
+
+    Attributes:
+        train (ArrayDataset): Training function data sorted by 'X', stored as one 2-D block.
+        ideal (ArrayDataset): Ideal function data sorted by 'X' (None when the ideal data is streamed).
+        test (ArrayDataset): Test function data, always float64 (None when the test data is streamed through `results_streamed`).
+        df_train, df_ideal, df_test (pd.DataFrame): Read-only DataFrame views of the datasets; assigning a DataFrame replaces the dataset.
+        dtype: Storage dtype of the training and ideal blocks (np.float64, or np.float32 to halve memory; see ArrayDataset for the accuracy bounds).
+        interpolation (str): How test X values are resolved against the ideal X grid: 'exact', 'nearest' or 'linear'.
+    
+    Methods:
+        calculate_criteria1(engine='vectorized'): Calculates the SSD for each training function against all ideal functions and identifies the top ideal function for each training function.
+        
+        calculate_criteria1_cached(cache, engine='fused'): Same selection plus adjusted deviations, memoized on disk under a fingerprint of the training and ideal data.
+        
+        calculate_criteria1_streamed(ideal_chunks): Same selection as `calculate_criteria1`, but folds the ideal data in row blocks with bounded memory.
+        
+        update_incremental(df_train_new=None, df_ideal_new=None): Folds only appended rows into persistent SSD / max deviation accumulators and refreshes the selection.
+        
+        save_accumulator(path) / load_accumulator(path): Persist and restore those accumulators between runs.
+        
+        select_top_k(k=1): Finds the k best ideal functions per training function with an early-abandoning search.
+        
+        from_cache(cache, train_csv, ideal_csv, test_csv): Creates the object from memory-mapped dataset cache files.
+        
+        set_ideal_data(df_ideal): Replaces the ideal data, e.g. with only the chosen columns after a streamed selection.
+        
+        training_columns(): Returns the names of the training function columns (every column except 'X').
+        
+        ideal_columns(): Returns the names of the ideal function columns (every column except 'X').
+        
+        get_ssd_sums(): Returns the dictionary containing SSD sums for each training function comparison with ideal functions.
+        
+        get_top_four_ideal_functions(): Returns the list of top four ideal functions with the lowest SSD for each training function.
+        
+        deviations(): Calculates maximum deviations for each ideal function against training functions and adjusts them by a factor of sqrt(2).
+        
+        get_adjusted_deviation(): Returns the dictionary containing adjusted maximum deviations for each ideal function.
+        
+        results(engine='vectorized'): Determines the best match for each test function based on the deviations and the selected top ideal functions. Stores the results in `test_results`.
+        
+        results_streamed(test_chunks): Classifies test data chunk by chunk and yields typed result batches, for test files larger than memory.
+        
+        get_test_results(): Returns the list of dictionaries containing test results with best matches.
+    """
+    def __init__(self, df_train, df_ideal, df_test, interpolation='exact', dtype=np.float64):
+        
+        """
+        Initializes the Calculations class with training, ideal, and test data (DataFrames or ArrayDatasets).
+        `interpolation` selects how off-grid test X values are resolved (see XGridIndex.lookup), and `dtype`
+        the storage of the training and ideal blocks.
+        """
+        self.dtype = np.dtype(dtype)
+        self._ideal_index = None
+        self.df_train = df_train
+        self.df_ideal = df_ideal
+        self.df_test = df_test
+        self.ssd_sums = {}
+        self.top_four_ideal_functions = []
+        self.adjusted_deviations = {}
+        self.test_results = []
+        self.interpolation = interpolation
+        self.accumulator = None
+        self.top_k_ideal_functions = {}
+        self.search_stats = {}
+
+    def _dataset(self, data, x_name, dtype, sort=True):
+        """
+        Returns `data` as an ArrayDataset with `dtype` storage; DataFrames are copied into one block, sorted
+        by X when `sort` is set and the rows are not already in order.
+        """
+        if isinstance(data, ArrayDataset):
+            return data.astype(dtype)
+        return ArrayDataset.from_frame(data, x_name, dtype, sort)
+
+    @property
+    def df_train(self):
+        return self.train.to_frame()
+
+    @df_train.setter
+    def df_train(self, df_train):
+        self.train = self._dataset(df_train, 'X', self.dtype)
+
+    @property
+    def df_ideal(self):
+        return self.ideal.to_frame() if self.ideal is not None else None
+
+    @df_ideal.setter
+    def df_ideal(self, df_ideal):
+        self.ideal = self._dataset(df_ideal, 'X', self.dtype) if df_ideal is not None else None
+        self._ideal_index = None
+
+    @property
+    def df_test(self):
+        return self.test.to_frame() if self.test is not None else None
+
+    @df_test.setter
+    def df_test(self, df_test):
+        self.test = self._dataset(df_test, 'X (test func)', np.float64, sort=False) if df_test is not None else None
+
+    def set_ideal_data(self, df_ideal):
+        """
+        Replaces the ideal data, e.g. with just 'X' and the chosen columns after `calculate_criteria1_streamed`.
+        """
+        self.df_ideal = df_ideal
+
+    @classmethod
+    def from_cache(cls, cache, train_csv, ideal_csv, test_csv, interpolation='exact', dtype=np.float64):
+        """
+        Creates a Calculations object from source CSV files through a dataset_cache.DatasetCache: the files are
+        converted to binary blocks once, and later runs memory-map them without parsing or (with float64
+        storage) copying.
+
+        Parameters:
+            cache (DatasetCache): The cache to open the files with.
+            train_csv, ideal_csv, test_csv (str): Paths to the source CSV files.
+            interpolation, dtype: As for the constructor.
+
+        Returns:
+            Calculations: The new object.
+        """
+        return cls(cache.open_dataset(train_csv, 'training', dtype), cache.open_dataset(ideal_csv, 'ideal', dtype),
+                   cache.open_dataset(test_csv, 'test'), interpolation, dtype)
+
+    def training_columns(self):
+        """
+        Returns the names of the training function columns (every column except 'X').
+        """
+        return list(self.train.columns)
+
+    def ideal_columns(self):
+        """
+        Returns the names of the ideal function columns (every column except 'X').
+        """
+        return list(self.ideal.columns)
+
+    def ideal_index(self):
+        """
+        Returns the XGridIndex over the ideal X column, building it on first use.
+        """
+        if self._ideal_index is None:
+            self._ideal_index = XGridIndex(self.ideal.x)
+        return self._ideal_index
+
+    @instrumentation.traced('ssd', 'engine')
+    def calculate_criteria1(self, engine='vectorized', sketch_index=None, candidates=32, workers=None):
+        """
+        Calculates the sum of squared differences (SSD) between each training function and all ideal functions.
+        Identifies the top ideal function with the lowest SSD for each training function.
+
+        Parameters:
+            engine (str): 'vectorized' computes the full training x ideal SSD matrix in one pass over contiguous
+                NumPy blocks; 'fused' additionally computes the maximum deviations in the same pass and fills
+                `adjusted_deviations` too, so `deviations()` does not need to rescan the data;
+                'loop' computes every SSD as a separate pandas operation; 'sketch' shortlists `candidates` ideal
+                functions per training function with `sketch_index` and computes exact SSDs on the shortlist only,
+                in which case `ssd_sums` only holds the shortlisted functions.
+            sketch_index (IdealSketchIndex, optional): The approximate candidate index used by the 'sketch' engine.
+            candidates (int): Shortlist length per training function for the 'sketch' engine (recall-versus-speed knob).
+            workers (int, optional): Worker processes for the 'parallel' engine, which runs the 'fused' computation
+                sharded over ranges of rows on a process pool (defaults to the available CPUs).
+        """
+        training_columns = self.training_columns()
+        ideal_columns = self.ideal_columns()
+
+        if engine == 'sketch':
+            self._calculate_from_shortlist(training_columns, ideal_columns, sketch_index, candidates)
+            print("Top ideal function for each training function:", self.top_four_ideal_functions)
+            return
+        if engine == 'vectorized':
+            ssd = ssd_matrix(as_block(self.train.block(training_columns)), self.ideal.block(ideal_columns))
+        elif engine == 'fused':
+            ssd, max_deviation = ssd_and_max_deviation(as_block(self.train.block(training_columns)),
+                                                       self.ideal.block(ideal_columns))
+        elif engine == 'parallel':
+            ssd, max_deviation = parallel_ssd_and_max_deviation(as_block(self.train.block(training_columns)),
+                                                                self.ideal.block(ideal_columns), workers)
+        elif engine == 'loop':
+            ssd = np.array([[((self.df_train[train_func] - self.df_ideal[ideal_func])**2).sum()
+                             for ideal_func in ideal_columns]
+                            for train_func in training_columns])
+        else:
+            raise ValueError(f"Unknown SSD engine: {engine}")
+
+        self._store_selection(training_columns, ideal_columns, ssd)
+        if engine in ('fused', 'parallel'):
+            self.adjusted_deviations = adjusted_deviations(max_deviation, ideal_columns, self.top_four_ideal_functions)
+        print("Top ideal function for each training function:", self.top_four_ideal_functions)
+
+    def calculate_criteria1_cached(self, cache, engine='fused', sketch_index=None, candidates=32, workers=None):
+        """
+        Same as `calculate_criteria1` followed by `deviations`, memoized in a selection_cache.SelectionCache: the
+        outputs are stored under a fingerprint of the training data, the ideal data and the settings that change
+        them, and a later run with the same inputs restores `ssd_sums`, `top_four_ideal_functions` and
+        `adjusted_deviations` without scanning the data again, so only `results` is left to run.
+
+        Parameters:
+            cache (SelectionCache): The cache to read and fill.
+            engine, sketch_index, candidates, workers: As for `calculate_criteria1`.
+
+        Returns:
+            bool: True when the outputs came from the cache.
+        """
+        settings = {'engine': engine, 'dtype': self.dtype.name}
+        if engine == 'sketch':
+            settings['candidates'] = candidates
+            if sketch_index is not None:
+                settings['sketch'] = cache.fingerprint([sketch_index.projection], {'method': sketch_index.method})
+        key = cache.fingerprint([self.train, self.ideal], settings)
+
+        outputs = cache.get(key)
+        if outputs is not None:
+            self.ssd_sums = outputs['ssd_sums']
+            self.top_four_ideal_functions = outputs['top_four_ideal_functions']
+            self.adjusted_deviations = outputs['adjusted_deviations']
+            print("Top ideal function for each training function (cached):", self.top_four_ideal_functions)
+            return True
+
+        self.calculate_criteria1(engine, sketch_index, candidates, workers)
+        if engine not in ('fused', 'parallel'):
+            self.deviations()
+        cache.put(key, {'ssd_sums': {train_func: {ideal_func: float(value) for ideal_func, value in sums.items()}
+                                     for train_func, sums in self.ssd_sums.items()},
+                        'top_four_ideal_functions': list(self.top_four_ideal_functions),
+                        'adjusted_deviations': {func: float(value) for func, value in self.adjusted_deviations.items()}})
+        return False
+
+    def _calculate_from_shortlist(self, training_columns, ideal_columns, sketch_index, candidates):
+        """
+        Fills `ssd_sums` and `top_four_ideal_functions` from exact SSDs over the sketch index shortlist.
+        """
+        if sketch_index is None:
+            raise ValueError("The 'sketch' engine needs a sketch_index (see sketch_index.IdealSketchIndex).")
+        if sketch_index.ideal_columns != ideal_columns:
+            raise ValueError("The sketch index was built on different ideal functions.")
+        train_block = as_block(self.train.block(training_columns))
+        shortlist = sketch_index.shortlist(train_block, candidates, x=self.train.x)
+
+        # Exact SSD on the union of all shortlists, read back per training function in column order
+        union = np.unique(shortlist)
+        ssd = ssd_matrix(train_block, self.ideal.block([ideal_columns[i] for i in union]))
+        self.ssd_sums = {}
+        self.top_four_ideal_functions = []
+        for j, (train_func, row) in enumerate(zip(training_columns, shortlist)):
+            positions = np.searchsorted(union, np.sort(row))
+            names = [ideal_columns[union[p]] for p in positions]
+            values = ssd[j, positions]
+            self.ssd_sums[train_func] = dict(zip(names, values))
+            self.top_four_ideal_functions.append(names[int(np.argmin(values))])
+
+    @instrumentation.traced('ssd')
+    def calculate_criteria1_streamed(self, ideal_chunks):
+        """
+        Streaming version of `calculate_criteria1(engine='fused')` for ideal tables larger than memory.
+
+        The ideal data is consumed block by block (see chunked_io.read_sql_chunks / read_csv_chunks); each block is
+        aligned to the training rows on X and folded into running SSD and max deviation accumulators, so peak
+        memory is bounded by the chunk size. Ideal rows whose X is not in the training data are skipped.
+        Fills `ssd_sums`, `top_four_ideal_functions` and `adjusted_deviations`.
+
+        Parameters:
+            ideal_chunks (iterable of pd.DataFrame): Blocks of ideal rows with an 'X' column and the same ideal columns.
+
+        Returns:
+            SSDAccumulator: The accumulators, also kept in `self.accumulator`.
+        """
+        training_columns = self.training_columns()
+
+        accumulator = None
+        for chunk in ideal_chunks:
+            if accumulator is None:
+                accumulator = SSDAccumulator(training_columns, [col for col in chunk.columns if col != 'X'])
+            self._fold(accumulator, self.train, chunk['X'].to_numpy(dtype=np.float64),
+                       chunk[accumulator.ideal_columns].to_numpy(dtype=np.float64))
+
+        if accumulator is None:
+            raise ValueError("No ideal data was read.")
+        self.accumulator = accumulator
+        self._store_selection(training_columns, accumulator.ideal_columns, accumulator.ssd)
+        self.adjusted_deviations = adjusted_deviations(accumulator.max_deviation, accumulator.ideal_columns,
+                                                       self.top_four_ideal_functions)
+        print("Top ideal function for each training function:", self.top_four_ideal_functions)
+        return accumulator
+
+    @staticmethod
+    def _fold(accumulator, train, ideal_x, ideal_values, skip_processed=False):
+        """
+        Aligns ideal rows (their X values and a block of the accumulator's ideal columns) to the rows of the `train`
+        dataset on X and folds the matching pairs into `accumulator`; only the matching training rows are gathered.
+        With `skip_processed`, rows at an X value the accumulator has already folded in are skipped.
+
+        Returns:
+            tuple: (folded, skipped) row counts.
+        """
+        rows, found = train.match(ideal_x)
+        skipped = 0
+        if skip_processed:
+            processed = found & accumulator.covers(ideal_x)
+            skipped = int(processed.sum())
+            found &= ~processed
+        accumulator.update(train.block(accumulator.training_columns, rows[found]), ideal_values[found], ideal_x[found])
+        return int(found.sum()), skipped
+
+    @staticmethod
+    def _new_rows(dataset, frame):
+        """
+        Returns the rows of `frame` whose X is not stored in `dataset` yet, as sorted (x, values) arrays in the
+        dataset's column order and dtype (the first row wins when an X repeats), and the number of rows dropped.
+        """
+        if frame is None or not len(frame):
+            return None, 0
+        x, first = np.unique(frame['X'].to_numpy(dtype=np.float64), return_index=True)
+        _, stored = dataset.match(x)
+        dropped = len(frame) - int((~stored).sum())
+        if stored.all():
+            return None, dropped
+        keep = first[~stored]
+        return (x[~stored], frame[list(dataset.columns)].to_numpy(dtype=dataset.dtype)[keep]), dropped
+
+    @instrumentation.traced('ssd')
+    def update_incremental(self, df_train_new=None, df_ideal_new=None):
+        """
+        Folds newly appended training/ideal rows into persistent per-pair SSD and max deviation accumulators,
+        instead of recomputing every SSD from scratch, then refreshes `ssd_sums`, `top_four_ideal_functions`
+        and `adjusted_deviations`.
+
+        Only the appended rows are read: rows at an X value that is already stored (or repeated within the new
+        rows) are dropped, and the others are merged into the sorted training/ideal datasets at their
+        np.searchsorted positions (ArrayDataset.insert_rows) so that `results` sees them, without re-sorting the
+        stored rows. The pairs folded in are the new ideal rows against the training rows at the same X, and the
+        stored ideal rows at the X of new training rows. The accumulators record the exact X values already
+        folded in and skip those, so rows that fill gaps in the X grid are folded in too. On the first call (or
+        after `load_accumulator` with no accumulator) the accumulators are seeded from the current data.
+
+        Parameters:
+            df_train_new (pd.DataFrame, optional): Appended training rows (same columns as `df_train`).
+            df_ideal_new (pd.DataFrame, optional): Appended ideal rows (same columns as `df_ideal`).
+
+        Returns:
+            dict: 'rows_folded' and 'rows_skipped' (appended rows at an X that was already stored or folded)
+                counts, 'selection_changed' and, per training function whose winner changed, the (previous, new)
+                ideal function in 'changes'.
+        """
+        training_columns = self.training_columns()
+        folded = 0
+        if self.accumulator is None:
+            self.accumulator = SSDAccumulator(training_columns, self.ideal_columns())
+            folded, _ = self._fold(self.accumulator, self.train, self.ideal.x,
+                                   self.ideal.block(self.accumulator.ideal_columns))
+        accumulator = self.accumulator
+
+        # Merge only the new rows into the sorted datasets
+        train_rows, skipped_train = self._new_rows(self.train, df_train_new)
+        ideal_rows, skipped_ideal = self._new_rows(self.ideal, df_ideal_new)
+        skipped = skipped_train + skipped_ideal
+        if train_rows is not None:
+            self.train = self.train.insert_rows(*train_rows)
+        if ideal_rows is not None:
+            self.ideal = self.ideal.insert_rows(*ideal_rows)
+            self._ideal_index = None
+
+        # New pairs are the new ideal rows against all training rows, plus the stored ideal rows at new training X
+        pending = [rows[0] for rows in (train_rows, ideal_rows) if rows is not None]
+        if pending:
+            positions, found = self.ideal.match(np.unique(np.concatenate(pending)))
+            positions = positions[found]
+            new_folded, new_skipped = self._fold(accumulator, self.train, self.ideal.x[positions],
+                                                 self.ideal.block(accumulator.ideal_columns, positions),
+                                                 skip_processed=True)
+            folded += new_folded
+            skipped += new_skipped
+
+        previous = dict(zip(training_columns, self.top_four_ideal_functions))
+        self._store_selection(training_columns, accumulator.ideal_columns, accumulator.ssd)
+        self.adjusted_deviations = adjusted_deviations(accumulator.max_deviation, accumulator.ideal_columns,
+                                                       self.top_four_ideal_functions)
+        changes = {train_func: (previous.get(train_func), func)
+                   for train_func, func in zip(training_columns, self.top_four_ideal_functions)
+                   if previous and previous.get(train_func) != func}
+        return {'rows_folded': folded, 'rows_skipped': skipped,
+                'selection_changed': bool(changes), 'changes': changes}
+
+    def save_accumulator(self, path):
+        """
+        Persists the incremental accumulators (see `update_incremental`) to a .npz file.
+        """
+        if self.accumulator is None:
+            raise ValueError("There are no accumulators to save yet.")
+        self.accumulator.save(path)
+
+    def load_accumulator(self, path):
+        """
+        Restores incremental accumulators saved by a previous run, so `update_incremental` only folds new rows.
+        """
+        self.accumulator = SSDAccumulator.load(path)
+        if self.accumulator.training_columns != self.training_columns():
+            raise ValueError("The saved accumulators were built for different training functions.")
+        return self.accumulator
+
+    def select_top_k(self, k=1, block_rows=None, batch_columns=256):
+        """
+        Finds the k ideal functions with the lowest SSD for each training function without computing every SSD
+        in full: a candidate is abandoned once its partial SSD exceeds the running k-th best (see
+        ssd_engine.top_k_search). The winners are the same as with `calculate_criteria1`.
+
+        Fills `top_four_ideal_functions` with the best function per training function, `top_k_ideal_functions`
+        with the k best per training function and `search_stats` with the pruning counters. Since pruned
+        candidates have no complete SSD, `ssd_sums` only holds the k winners of each training function.
+
+        Returns:
+            dict: The k best ideal functions (best first) for each training function.
+        """
+        training_columns = self.training_columns()
+        ideal_columns = self.ideal_columns()
+        best, best_ssd, self.search_stats = top_k_search(as_block(self.train.block(training_columns)),
+                                                         self.ideal.block(ideal_columns),
+                                                         k, block_rows, batch_columns)
+
+        self.ssd_sums = {}
+        self.top_k_ideal_functions = {}
+        for train_func, indices, values in zip(training_columns, best, best_ssd):
+            names = [ideal_columns[i] for i in indices]
+            self.ssd_sums[train_func] = dict(zip(names, values))
+            self.top_k_ideal_functions[train_func] = names
+        self.top_four_ideal_functions = [names[0] for names in self.top_k_ideal_functions.values()]
+        print("Top ideal function for each training function:", self.top_four_ideal_functions)
+        print(f"Pruned {self.search_stats['pruned']} of {self.search_stats['candidates']} candidates early.")
+        return self.top_k_ideal_functions
+
+    def _store_selection(self, training_columns, ideal_columns, ssd):
+        """
+        Fills `ssd_sums` and `top_four_ideal_functions` from an SSD matrix of shape (n_train, n_ideal).
+        """
+        self.ssd_sums = {}
+        self.top_four_ideal_functions = []
+        for train_func, row in zip(training_columns, ssd):
+            self.ssd_sums[train_func] = dict(zip(ideal_columns, row))
+            # argmin returns the first minimum, the same function a stable sort would put first
+            self.top_four_ideal_functions.append(ideal_columns[int(np.argmin(row))])
+
+    def get_ssd_sums(self):
+        """
+        Returns the dictionary of SSD sums for each training function.
+        """
+        return self.ssd_sums
+
+    def get_top_four_ideal_functions(self):
+        """
+        Returns the list of top four ideal functions based on SSD sums.
+        """
+        return self.top_four_ideal_functions
+    
+    @instrumentation.traced('deviations')
+    def deviations(self):
+        """
+        Calculates maximum deviations for each ideal function across all training functions and adjusts them
+        by a factor of sqrt(2).
+        """
+        top_four_ideal_functions = self.top_four_ideal_functions
+        # The same training functions the SSD engines use, however many there are
+        training_function_columns = self.training_columns()
+
+        max_deviations = {}
+        for ideal_func in top_four_ideal_functions:
+            all_deviations = []
+            for train_func in training_function_columns:
+                # Here, we calculate deviations for each training function against the current ideal function
+                deviations = np.abs(self.df_train[train_func] - self.df_ideal[ideal_func])
+                all_deviations.append(deviations)
+            
+            # Combine deviations from all training functions for the current ideal function
+            combined_deviations = np.concatenate(all_deviations)
+            max_deviations[ideal_func] = np.max(combined_deviations)
+
+        # Adjust max deviations by factor sqrt(2)
+        adjustment_factor = np.sqrt(2)
+        self.adjusted_deviations = {func: deviation * adjustment_factor for func, deviation in max_deviations.items()}
+
+    def get_adjusted_deviation(self):
+        """
+        Returns the dictionary of adjusted deviations for each ideal function.
+        """
+        return self.adjusted_deviations
+    
+    @instrumentation.traced('assignment', 'engine')
+    def results(self, engine='vectorized', workers=None):
+        """
+        Finds the best match for each test function based on deviations and stores the results.
+
+        Parameters:
+            engine (str): 'vectorized' looks up every test X in the ideal grid in one step (resolving off-grid
+                points with `interpolation`) and scores all chosen functions as one array; 'loop' walks the test
+                rows one at a time and only supports exact X matches; 'parallel' runs the vectorized assignment
+                sharded over the test points on a process pool.
+            workers (int, optional): Worker processes for the 'parallel' engine (defaults to the available CPUs).
+        """
+        if engine in ('vectorized', 'parallel'):
+            self._results_vectorized(workers if engine == 'parallel' else 0)
+            return
+        if engine != 'loop':
+            raise ValueError(f"Unknown assignment engine: {engine}")
+
+        def find_best_match(x_val, y_val, chosen_functions, df_ideal, adjusted_deviations):
+            best_match = {'func': None, 'deviation': np.inf}
+            
+            for func in chosen_functions:
+                ideal_y_val = df_ideal.loc[df_ideal['X'] == x_val, func].iloc[0]
+                deviation = np.abs(ideal_y_val - y_val)
+                
+                if deviation < adjusted_deviations[func] and deviation < best_match['deviation']:
+                    best_match = {'func': func, 'deviation': deviation}
+            
+            return best_match
+
+        for index, row in self.df_test.iterrows():
+            match = find_best_match(row['X (test func)'], row['Y (test func)'], self.top_four_ideal_functions, self.df_ideal, self.adjusted_deviations)
+            self.test_results.append({
+                'X (test func)': row['X (test func)'],
+                'Y (test func)': row['Y (test func)'],
+                'Delta Y (test func)': match['deviation'] if match['func'] else None,
+                'No. of ideal func': match['func']
+                
+            })
+
+    def _results_vectorized(self, workers=0):
+        """
+        Batch version of `results`: one grid lookup for all test points, one deviation array for all chosen functions.
+        With `workers` other than 0 the test points are sharded over a process pool.
+        """
+        chosen_functions = self.top_four_ideal_functions
+        test_x = self.test.x
+        test_y = self.test.column('Y (test func)')
+
+        thresholds = [self.adjusted_deviations[func] for func in chosen_functions]
+        if workers == 0:
+            candidates = self.ideal_index().lookup(self.ideal.block(chosen_functions), test_x, self.interpolation)
+            best, deviation = assign_points(test_y, candidates, thresholds)
+        else:
+            best, deviation = parallel_assign_points(self.ideal.x, self.ideal.block(chosen_functions),
+                                                     test_x, test_y, thresholds, self.interpolation, workers)
+
+        instrumentation.count('rows_classified', len(test_x))
+        for x_val, y_val, func_index, delta in zip(test_x, test_y, best, deviation):
+            func = chosen_functions[func_index] if func_index >= 0 else None
+            self.test_results.append({
+                'X (test func)': x_val,
+                'Y (test func)': y_val,
+                'Delta Y (test func)': delta if func else None,
+                'No. of ideal func': func
+            })
+            
+    def results_streamed(self, test_chunks):
+        """
+        Generator version of `results` with memory bounded by the chunk size: each block of test rows is looked
+        up in the ideal grid and classified against the chosen functions, and yielded as a streaming.ResultBatch
+        of typed arrays instead of being appended to `test_results`. Pass the batches to a streaming.ResultSink
+        to write them while later chunks are still being read.
+
+        Parameters:
+            test_chunks (iterable of pd.DataFrame): Blocks of test rows with 'X (test func)' and 'Y (test func)'
+                columns, e.g. from chunked_io.read_csv_chunks(path, 'test') or chunked_io.read_sql_chunks.
+
+        Yields:
+            ResultBatch: The matches of one chunk, in input order.
+        """
+        chosen_functions = list(self.top_four_ideal_functions)
+        thresholds = [self.adjusted_deviations[func] for func in chosen_functions]
+        index = self.ideal_index()
+        values = self.ideal.block(chosen_functions)
+        for chunk in test_chunks:
+            with instrumentation.span('assignment', engine='streamed', rows=len(chunk)):
+                test_x = chunk['X (test func)'].to_numpy(dtype=np.float64)
+                test_y = chunk['Y (test func)'].to_numpy(dtype=np.float64)
+                best, deviation = assign_points(test_y, index.lookup(values, test_x, self.interpolation), thresholds)
+            instrumentation.count('rows_classified', len(chunk))
+            yield ResultBatch(test_x, test_y, np.where(best >= 0, deviation, np.nan), best.astype(np.int32),
+                              chosen_functions)
+
+    def get_test_results(self):
+        """
+        Returns the list of test results containing the best matches for the test functions.
+        """
+        return self.test_results
+
+
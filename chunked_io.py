@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from instrumentation import instrumentation
+
+# Column name templates used by Calculations for each kind of function table
+COLUMN_TEMPLATES = {
+    'training': 'Y{} (training func)',
+    'ideal': 'Y{} (ideal func)',
+}
+
+
+def calculation_column_names(kind, n_columns):
+    """
+    Returns the column names Calculations expects for a table of the given kind.
+
+    Parameters:
+        kind (str): 'training', 'ideal' or 'test'.
+        n_columns (int): Number of columns in the source, including the X column.
+
+    Returns:
+        list of str: The column names, e.g. ['X', 'Y1 (ideal func)', 'Y2 (ideal func)', ...].
+    """
+    if kind == 'test':
+        return ['X (test func)', 'Y (test func)']
+    if kind not in COLUMN_TEMPLATES:
+        raise ValueError(f"Unknown table kind: {kind}")
+    return ['X'] + [COLUMN_TEMPLATES[kind].format(i) for i in range(1, n_columns)]
+
+
+def read_csv_chunks(csv_path, kind, chunksize=100000):
+    """
+    Streams a source CSV (such as `ideal.csv`) in row blocks, renamed to the Calculations column names.
+
+    Parameters:
+        csv_path (str): Path to the CSV file.
+        kind (str): 'training', 'ideal' or 'test'.
+        chunksize (int): Number of rows per block.
+
+    Yields:
+        pd.DataFrame: One block of rows with float64 columns.
+    """
+    with pd.read_csv(csv_path, chunksize=chunksize, dtype=np.float64) as reader:
+        for chunk in instrumentation.chunks('csv_read', reader, 'read', file=str(csv_path)):
+            chunk.columns = calculation_column_names(kind, chunk.shape[1])
+            yield chunk
+
+
+def read_csv_batches(csv_path, batch_size, chunksize=100000):
+    """
+    Streams the rows of a CSV file as batches of parameter tuples for parameterized multi-row inserts.
+
+    The file is read in blocks of `chunksize` rows, and rows left over at the end of a block are carried into
+    the next batch, so every batch except the last holds exactly `batch_size` rows. Missing values become None,
+    which drivers send as SQL NULL.
+
+    Parameters:
+        csv_path (str): Path to the CSV file (the header row names the columns).
+        batch_size (int): Number of rows per batch.
+        chunksize (int): Number of rows read from the file at a time.
+
+    Yields:
+        tuple: (columns, records), the CSV column names and a list of row tuples.
+    """
+    pending = []
+    columns = None
+    with pd.read_csv(csv_path, chunksize=chunksize, dtype=np.float64) as reader:
+        for chunk in instrumentation.chunks('csv_read', reader, 'read', file=str(csv_path)):
+            columns = list(chunk.columns)
+            if chunk.isna().to_numpy().any():
+                pending.extend(map(tuple, chunk.astype(object).where(chunk.notna(), None).to_numpy().tolist()))
+            else:
+                pending.extend(map(tuple, chunk.to_numpy().tolist()))
+            full = len(pending) - len(pending) % batch_size
+            for i in range(0, full, batch_size):
+                yield columns, pending[i:i + batch_size]
+            del pending[:full]
+    if pending:
+        yield columns, pending
+
+
+def stream_query(engine, statement, params=None, chunksize=100000):
+    """
+    Runs a query on a connection with `stream_results=True` and yields the result in blocks of `chunksize` rows.
+
+    pandas does not ask for streaming by itself, so a chunked `read_sql_query` on an engine lets a buffering
+    driver load the whole result set into client memory before the first block is returned. Whether memory
+    really stays bounded by the block size still depends on the driver:
+        - pyodbc (SQL Server) and sqlite3 fetch rows from the open cursor as `fetchmany` asks for them.
+        - pymysql and mysqlclient ('mysql+pymysql://', 'mysql+mysqldb://') switch to an unbuffered SSCursor.
+        - mysql-connector ('mysql+mysqlconnector://', as built by connection_pool.mysql_url) has no server-side
+          cursor support in SQLAlchemy and always buffers the full result; use a pymysql URL to stream from MySQL.
+
+    Parameters:
+        engine (SQLAlchemy engine): The engine to read from.
+        statement (str or sqlalchemy Executable): The query.
+        params (dict, optional): Bound parameters of the query.
+        chunksize (int): Number of rows per block.
+
+    Yields:
+        pd.DataFrame: One block of rows.
+    """
+    if isinstance(statement, str):
+        statement = text(statement)
+    with engine.connect().execution_options(stream_results=True) as connection:
+        yield from pd.read_sql_query(statement, connection, params=params, chunksize=chunksize)
+
+
+def read_sql_chunks(engine, table_name, chunksize=100000, columns='*'):
+    """
+    Streams a SQL table in row blocks using a chunked read on a streaming connection (see `stream_query`).
+
+    Parameters:
+        engine (SQLAlchemy engine): The engine to read from.
+        table_name (str): The table to read.
+        chunksize (int): Number of rows per block.
+        columns (str): The column list of the SELECT statement.
+
+    Yields:
+        pd.DataFrame: One block of rows.
+    """
+    chunks = stream_query(engine, f"SELECT {columns} FROM {table_name}", chunksize=chunksize)
+    yield from instrumentation.chunks('sql_read', chunks, 'fetched', table=table_name)
@@ -0,0 +1,179 @@
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import QueuePool
+from instrumentation import instrumentation
+
+
+class _TimedQueuePool(QueuePool):
+    """
+    A QueuePool that records how often, and for how long, a checkout had to wait for a connection to be returned.
+    """
+    _stats = None
+
+    def _do_get(self):
+        # With no idle connection and no overflow left, the checkout blocks until another caller checks in
+        saturated = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if saturated and self._stats is not None:
+                self._stats.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._stats = self._stats
+        return pool
+
+
+class PoolStats:
+    """
+    Checkout, new connection, reuse and wait counters for one pooled engine.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+
+    def as_dict(self):
+        with self._lock:
+            return {'checkouts': self.checkouts, 'connects': self.connects,
+                    'reuses': max(0, self.checkouts - self.connects),
+                    'waits': self.waits, 'wait_seconds': self.wait_seconds}
+
+
+class EngineRegistry:
+    """
+    A process-wide registry of pooled SQLAlchemy engines, keyed by connection URL and connection options,
+    so every class of the pipeline that talks to the same database shares one bounded connection pool
+    instead of opening its own connections.
+
+    Attributes:
+        pool_size (int): Connections kept open per engine.
+        max_overflow (int): Extra connections allowed above `pool_size` under load.
+        pool_timeout (float): Seconds a checkout waits for a free connection before failing.
+        pool_recycle (int): Seconds after which a connection is replaced, avoiding server-side timeouts.
+        pool_pre_ping (bool): Test connections on checkout and transparently replace dead ones.
+
+    Methods:
+        configure(**settings): Changes the pool settings used for engines created afterwards.
+        engine(url, connect_args=None): Returns the shared engine for `url`, creating it on first use.
+        raw_connection(url, connect_args=None): Checks a DB-API connection out of the shared pool.
+        stats(): Returns checkout, connect, reuse and wait counters per engine.
+        dispose_all(): Closes every pooled connection and forgets the engines.
+    """
+    def __init__(self, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=3600, pool_pre_ping=True):
+        self._lock = threading.Lock()
+        self._engines = {}
+        self._stats = {}
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+
+    def configure(self, **settings):
+        """
+        Changes the pool settings (pool_size, max_overflow, pool_timeout, pool_recycle, pool_pre_ping)
+        used for engines created afterwards.
+        """
+        for name, value in settings.items():
+            if not hasattr(self, name) or name.startswith('_'):
+                raise ValueError(f"Unknown pool setting: {name}")
+            setattr(self, name, value)
+
+    @staticmethod
+    def _key(url, connect_args):
+        return url.render_as_string(hide_password=False), tuple(sorted((connect_args or {}).items()))
+
+    def engine(self, url, connect_args=None):
+        """
+        Returns the shared engine for `url` (a string or sqlalchemy URL), creating it on first use.
+
+        Parameters:
+            url (str or URL): The database URL.
+            connect_args (dict, optional): Extra DB-API connect arguments; engines with different arguments are kept apart.
+
+        Returns:
+            SQLAlchemy engine: The pooled engine.
+        """
+        url = make_url(url)
+        key = self._key(url, connect_args)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                options = {'pool_pre_ping': self.pool_pre_ping, 'pool_recycle': self.pool_recycle}
+                if url.get_backend_name() != 'sqlite' or url.database not in (None, '', ':memory:'):
+                    # In-memory SQLite keeps its single-connection pool, since every new connection would open
+                    # an empty database; server databases and SQLite files share a bounded, timed queue pool
+                    options.update(poolclass=_TimedQueuePool, pool_size=self.pool_size,
+                                   max_overflow=self.max_overflow, pool_timeout=self.pool_timeout)
+                engine = create_engine(url, connect_args=dict(connect_args or {}), **options)
+                stats = PoolStats()
+                engine.pool._stats = stats
+                event.listen(engine, 'checkout', lambda *args: stats.record_checkout())
+                event.listen(engine, 'connect', lambda *args: stats.record_connect())
+                event.listen(engine, 'before_cursor_execute', lambda *args: instrumentation.count('queries'))
+                self._engines[key] = engine
+                self._stats[key] = stats
+            return engine
+
+    def raw_connection(self, url, connect_args=None):
+        """
+        Checks a DB-API connection out of the shared pool for `url`. Closing it returns it to the pool.
+        """
+        return self.engine(url, connect_args).raw_connection()
+
+    def stats(self):
+        """
+        Returns a dictionary of counters per engine URL (password hidden): checkouts, new connects,
+        reuses (checkouts served by an already open connection), waits and total wait seconds. Engines for the
+        same URL with different connect arguments are summed into one entry.
+        """
+        totals = {}
+        with self._lock:
+            for key, stats in self._stats.items():
+                url = make_url(key[0]).render_as_string(hide_password=True)
+                counters = stats.as_dict()
+                if url in totals:
+                    counters = {name: totals[url][name] + value for name, value in counters.items()}
+                totals[url] = counters
+        return totals
+
+    def dispose_all(self):
+        """
+        Closes every pooled connection and forgets the engines.
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._stats.clear()
+
+
+def mysql_url(host, user, password, database):
+    """
+    Returns the MySQL (mysql.connector) URL used by the DatabaseConnector classes.
+    """
+    return URL.create('mysql+mysqlconnector', username=user, password=password, host=host, database=database or None)
+
+
+# The process-wide registry shared by CSVImporter, DataProcessor, DataVisualizer and ReadCsv
+registry = EngineRegistry()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, column, func, select, table
+from chunked_io import stream_query
+from instrumentation import instrumentation
+
+
+def _table(table_name, columns):
+    """
+    Returns a lightweight SQLAlchemy table construct for a (optionally schema-qualified) table name,
+    so column names such as 'Y1 (ideal func)' are quoted by the dialect.
+    """
+    schema, _, name = table_name.rpartition('.')
+    return table(name, *[column(col) for col in dict.fromkeys(columns)], schema=schema or None)
+
+
+def projected_query(table_name, columns, x_column=None, x_values=False, x_range=False):
+    """
+    Builds a column-projected SELECT with an optional predicate on the X column.
+
+    Parameters:
+        table_name (str): The table, optionally schema-qualified ('database.table').
+        columns (list of str): The columns to select.
+        x_column (str, optional): The X column used by the predicate.
+        x_values (bool): Filter with `x_column IN (:x_values)` (an expanding parameter).
+        x_range (bool): Filter with `x_column BETWEEN :x_min AND :x_max`.
+
+    Returns:
+        sqlalchemy Select: The statement, to be executed with the matching parameters.
+    """
+    source = _table(table_name, list(columns) + ([x_column] if x_column else []))
+    statement = select(*[source.c[col] for col in columns])
+    if x_values:
+        statement = statement.where(source.c[x_column].in_(bindparam('x_values', expanding=True)))
+    elif x_range:
+        statement = statement.where(source.c[x_column].between(bindparam('x_min'), bindparam('x_max')))
+    return statement
+
+
+def x_bounds(engine, table_name, x_column, x_min, x_max):
+    """
+    Widens [x_min, x_max] to the nearest stored X values at or outside it, so that interpolation of points
+    near the ends of the range still finds both neighbouring grid rows.
+    """
+    source = _table(table_name, [x_column])
+    x = source.c[x_column]
+    with engine.connect() as connection:
+        lower = connection.execute(select(func.max(x)).where(x <= x_min)).scalar()
+        upper = connection.execute(select(func.min(x)).where(x >= x_max)).scalar()
+    return (x_min if lower is None else lower), (x_max if upper is None else upper)
+
+
+def _fetch(statement, engine, params, chunksize, table_name):
+    """
+    Runs a chunked read of `statement` on a streaming connection (see chunked_io.stream_query), recorded as
+    'sql_read' spans with fetched row and byte counts.
+    """
+    chunks = stream_query(engine, statement, params, chunksize)
+    return instrumentation.chunks('sql_read', chunks, 'fetched', table=table_name)
+
+
+def read_projected(engine, table_name, columns, x_column=None, x_values=None, interpolation='exact',
+                   chunksize=100000, batch_size=1000):
+    """
+    Streams only the requested columns of a table, and only the rows needed for the given X values.
+
+    With `interpolation='exact'` the rows are filtered with `X IN (...)`, sent in batches of `batch_size`
+    values to stay within driver parameter limits. Otherwise the rows between the neighbouring grid
+    points of the smallest and largest X are fetched. Without `x_values` every row is fetched.
+
+    Parameters:
+        engine (SQLAlchemy engine): The engine to read from.
+        table_name (str): The table to read.
+        columns (list of str): The columns to fetch, e.g. the X column and the chosen ideal functions.
+        x_column (str, optional): The X column used for filtering.
+        x_values (array-like, optional): The X values that will be looked up, e.g. the test X values.
+        interpolation (str): 'exact', 'nearest' or 'linear', as passed to XGridIndex.lookup.
+        chunksize (int): Rows per yielded DataFrame.
+        batch_size (int): X values per IN list.
+
+    Yields:
+        pd.DataFrame: Blocks of rows with the requested columns.
+    """
+    if x_values is None:
+        yield from _fetch(projected_query(table_name, columns), engine, None, chunksize, table_name)
+        return
+
+    values = np.unique(np.asarray(x_values, dtype=np.float64))
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return
+    if interpolation == 'exact':
+        statement = projected_query(table_name, columns, x_column, x_values=True)
+        for i in range(0, values.size, batch_size):
+            params = {'x_values': values[i:i + batch_size].tolist()}
+            yield from _fetch(statement, engine, params, chunksize, table_name)
+    else:
+        x_min, x_max = x_bounds(engine, table_name, x_column, float(values[0]), float(values[-1]))
+        statement = projected_query(table_name, columns, x_column, x_range=True)
+        yield from _fetch(statement, engine, {'x_min': x_min, 'x_max': x_max}, chunksize, table_name)
+
+
+def read_projected_frame(engine, table_name, columns, x_column=None, x_values=None, interpolation='exact',
+                         chunksize=100000, batch_size=1000):
+    """
+    Same as `read_projected`, concatenated into one DataFrame (empty, with the requested columns, when no row matched).
+    """
+    chunks = list(read_projected(engine, table_name, columns, x_column, x_values, interpolation, chunksize, batch_size))
+    if not chunks:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+
+class ArrayDataset:
+    """
+    A compact container for one function table (train, ideal or test): the X column as a float64 array and all
+    function columns as one 2-D NumPy block (rows = X values, columns = functions), with a name -> column index.
+    Calculations works on these blocks directly and only builds DataFrame views at its API boundary.
+
+    Storage can be float32 (`dtype=np.float32`) to halve the memory of wide ideal tables. X always stays
+    float64, so grid lookups keep matching X values exactly. The block stays float32 in memory: the kernels upcast
+    one tile of columns (or the gathered rows) at a time to float64 before differencing and accumulate in float64,
+    so the only error is the rounding of every stored value to float32
+    (relative error at most u = 2**-24, about 6e-8). For training value t and ideal value i with exact deviation
+    d = t - i, the float32 deviation is off by at most u * (|t| + |i|); an SSD over n rows is off by at most
+    2u * sum(|d| * (|t| + |i|)) + n * (u * max(|t| + |i|))**2, and a maximum deviation by at most
+    u * max(|t| + |i|). The sqrt(2)-adjusted thresholds scale the same bound by sqrt(2). Selections or test
+    assignments can only differ from float64 where two candidates are closer than these bounds.
+
+    Attributes:
+        x (np.ndarray): The X values, float64, shape (rows,).
+        values (np.ndarray): The function values, shape (rows, len(columns)), float64 or float32.
+        columns (tuple of str): The function column names.
+        x_name (str): The name of the X column ('X' or 'X (test func)').
+
+    Methods:
+        from_frame(frame, x_name='X', dtype=np.float64, sort=True): Builds a dataset from a DataFrame.
+        from_block(x, values, names, x_name='X', dtype=np.float64, sort=True): Wraps an X vector and a C-contiguous block (e.g. memory maps) without copying.
+        column(name): Returns one column as a 1-D view.
+        match(x): Returns the row positions of X values and a mask of which ones are stored.
+        insert_rows(x, values): Returns the dataset with new rows merged into the sorted X order.
+        block(names=None, rows=None): Returns the given columns (and rows) as a 2-D block (the stored block itself for all of them).
+        to_frame(): Returns a DataFrame view of the data (built once, without copying the arrays).
+    """
+    __slots__ = ('x', 'values', 'columns', 'x_name', '_positions', '_frame')
+
+    def __init__(self, x, values, columns, x_name='X'):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.values = np.asarray(values)
+        if self.values.ndim != 2 or self.values.shape != (self.x.shape[0], len(columns)):
+            raise ValueError(f"Expected values of shape ({self.x.shape[0]}, {len(columns)}), got {self.values.shape}")
+        self.columns = tuple(columns)
+        self.x_name = x_name
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._frame = None
+
+    @classmethod
+    def from_frame(cls, frame, x_name='X', dtype=np.float64, sort=True):
+        """
+        Copies a DataFrame into a dataset with one contiguous block of `dtype`, sorted by X when `sort` is set
+        and the rows are not already in increasing X order.
+        """
+        names = [col for col in frame.columns if col != x_name]
+        x = frame[x_name].to_numpy(dtype=np.float64)
+        values = frame[names].to_numpy(dtype=dtype)
+        if sort and not _is_increasing(x):
+            order = np.argsort(x, kind='stable')
+            x, values = x[order], values[order]
+        return cls(x, np.ascontiguousarray(values), names, x_name)
+
+    @classmethod
+    def from_block(cls, x, values, names, x_name='X', dtype=np.float64, sort=True):
+        """
+        Wraps an X vector and a 2-D block of function columns `names`, such as the memory-mapped files of a
+        dataset_cache entry. The block must be C-contiguous, since the kernels would otherwise copy it on every
+        call; when it already has `dtype` and X is sorted, the dataset holds the arrays themselves.
+        """
+        if not values.flags.c_contiguous:
+            raise ValueError("from_block needs a C-contiguous value block; store X separately from the function columns.")
+        x = np.asarray(x, dtype=np.float64)
+        values = values.astype(dtype, copy=False)
+        if sort and not _is_increasing(x):
+            order = np.argsort(x, kind='stable')
+            x, values = x[order], np.ascontiguousarray(values[order])
+        return cls(x, values, names, x_name)
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.values.nbytes
+
+    def astype(self, dtype):
+        """
+        Returns the dataset with `dtype` storage (itself when it already has that dtype).
+        """
+        if self.values.dtype == np.dtype(dtype):
+            return self
+        return ArrayDataset(self.x, self.values.astype(dtype), self.columns, self.x_name)
+
+    def column(self, name):
+        """
+        Returns the column `name` (the X column or a function column) as a 1-D view.
+        """
+        if name == self.x_name:
+            return self.x
+        return self.values[:, self._positions[name]]
+
+    def block(self, names=None, rows=None):
+        """
+        Returns the function columns `names` as a 2-D block: the stored block itself when `names` is None or
+        lists every column in order, otherwise a gathered copy. With `rows` (row positions), only those rows
+        are gathered.
+        """
+        values = self.values if rows is None else self.values[rows]
+        if names is None or tuple(names) == self.columns:
+            return values
+        return values[:, [self._positions[name] for name in names]]
+
+    def match(self, x):
+        """
+        Returns the row positions of the X values `x` and a boolean mask of which ones are stored, found by binary
+        search over the sorted X column (the same contract as XGridIndex.match). Positions of X values that are not
+        stored are meaningless and must be filtered with the mask.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if self.x.size == 0:
+            return np.zeros(x.shape, dtype=np.intp), np.zeros(x.shape, dtype=bool)
+        positions = np.minimum(np.searchsorted(self.x, x), self.x.size - 1)
+        return positions, self.x[positions] == x
+
+    def insert_rows(self, x, values):
+        """
+        Returns a new dataset with the rows (`x`, `values`) merged into the sorted X order. `x` must be sorted; each
+        new row is placed at its np.searchsorted position by one np.insert per array, so the stored rows are copied
+        once into the new arrays but never re-sorted, and the stored arrays themselves are left unchanged.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        positions = np.searchsorted(self.x, x, side='right')
+        values = np.asarray(values, dtype=self.values.dtype).reshape(x.shape[0], len(self.columns))
+        return ArrayDataset(np.insert(self.x, positions, x), np.insert(self.values, positions, values, axis=0),
+                            self.columns, self.x_name)
+
+    def to_frame(self):
+        """
+        Returns a DataFrame with the X column followed by the function columns. The columns are views of the
+        arrays, and the frame is built once and reused, so it must be treated as read-only.
+        """
+        if self._frame is None:
+            columns = {self.x_name: self.x}
+            columns.update((name, self.values[:, i]) for i, name in enumerate(self.columns))
+            self._frame = pd.DataFrame(columns, copy=False)
+        return self._frame
+
+
+def _is_increasing(x):
+    return x.size < 2 or bool(np.all(x[1:] >= x[:-1]))
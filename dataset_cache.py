@@ -0,0 +1,185 @@
+import hashlib
+import io
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from chunked_io import calculation_column_names
+from dataset import ArrayDataset
+
+# The data files start with a fixed-size .npy header, written once the row count is known
+_HEADER_BYTES = 128
+# Version of the entry layout; entries written with another layout are rebuilt
+_FORMAT = 3
+
+
+class DatasetCache:
+    """
+    A cache that converts each source CSV (train, ideal, test) once into a binary float64 block and opens it
+    afterwards as a memory-mapped array, so a cold start maps the data instead of parsing text.
+
+    Every cached CSV gets one directory holding a `meta.json`, the X column as a float64 `x.npy` vector and the
+    function columns as a C-contiguous row-major float64 `values.npy` block; keeping X apart lets the kernels use
+    the mapped block as is instead of copying a strided view of it. The entry is keyed by the absolute source
+    path and records the file size and modification time (plus a SHA-256 of the content when `use_hash` is
+    set); when the source changes, the entry is rebuilt automatically on the next `open`. Building streams the
+    CSV in chunks, so the source never has to fit in memory.
+
+    Attributes:
+        cache_dir (str): Directory holding the cache entries.
+        use_hash (bool): Also compare a content hash, for sources whose mtime is not reliable (e.g. copied files).
+        chunksize (int): Rows parsed at a time while building an entry.
+
+    Methods:
+        open(csv_path, kind=None): Returns the data as a DataFrame backed by a read-only memory map.
+        open_dataset(csv_path, kind, dtype=np.float64): Returns the data as a dataset.ArrayDataset over the memory map.
+        is_fresh(csv_path): Tells whether the cached entry matches the current source file.
+        invalidate(csv_path): Deletes the cached entry of a source file.
+    """
+    def __init__(self, cache_dir='dataset_cache', use_hash=False, chunksize=100000):
+        self.cache_dir = cache_dir
+        self.use_hash = use_hash
+        self.chunksize = chunksize
+
+    def _entry_dir(self, csv_path):
+        source = os.path.abspath(csv_path)
+        digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(source))[0]
+        return os.path.join(self.cache_dir, f"{name}-{digest}")
+
+    def _signature(self, csv_path):
+        stat = os.stat(csv_path)
+        signature = {'source': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        if self.use_hash:
+            sha = hashlib.sha256()
+            with open(csv_path, 'rb') as source:
+                for block in iter(lambda: source.read(1 << 20), b''):
+                    sha.update(block)
+            signature['sha256'] = sha.hexdigest()
+        return signature
+
+    def _read_meta(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, 'meta.json')) as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, csv_path):
+        """
+        Returns True when the cache entry of `csv_path` exists and was built from the current file.
+        """
+        meta = self._read_meta(self._entry_dir(csv_path))
+        return meta is not None and meta.get('format') == _FORMAT and meta['signature'] == self._signature(csv_path)
+
+    def invalidate(self, csv_path):
+        """
+        Deletes the cache entry of `csv_path`, if any.
+        """
+        shutil.rmtree(self._entry_dir(csv_path), ignore_errors=True)
+
+    def open(self, csv_path, kind=None):
+        """
+        Returns the CSV data as a DataFrame whose float64 columns are views of a read-only memory map of the
+        cache file, building (or rebuilding) the cache entry first when needed.
+
+        Parameters:
+            csv_path (str): Path to the source CSV file.
+            kind (str, optional): 'training', 'ideal' or 'test' to rename the columns to the names Calculations
+                expects; by default the CSV header is kept.
+
+        Returns:
+            pd.DataFrame: The data, without a copy of the mapped values.
+        """
+        names, x, values = self._map(csv_path, kind)
+        columns = {names[0]: x}
+        columns.update((name, values[:, i]) for i, name in enumerate(names[1:]))
+        return pd.DataFrame(columns, copy=False)
+
+    def open_dataset(self, csv_path, kind, dtype=np.float64):
+        """
+        Returns the CSV data as a dataset.ArrayDataset for Calculations. With float64 storage the X column and the
+        function block are views of the memory map; test data is kept in file order, the others sorted by X.
+
+        Parameters:
+            csv_path (str): Path to the source CSV file.
+            kind (str): 'training', 'ideal' or 'test'.
+            dtype: Storage dtype of the function columns (np.float32 converts, i.e. copies, the block).
+        """
+        names, x, values = self._map(csv_path, kind)
+        return ArrayDataset.from_block(x, values, names[1:], names[0], dtype, sort=kind != 'test')
+
+    def _map(self, csv_path, kind):
+        """
+        Returns the column names, the memory-mapped X vector and the memory-mapped (rows, functions) block of
+        `csv_path`.
+        """
+        entry_dir = self._entry_dir(csv_path)
+        signature = self._signature(csv_path)
+        meta = self._read_meta(entry_dir)
+        if meta is None or meta.get('format') != _FORMAT or meta['signature'] != signature:
+            meta = self._build(csv_path, entry_dir, signature)
+
+        names = meta['columns'] if kind is None else calculation_column_names(kind, len(meta['columns']))
+        mmap_mode = 'r' if meta['rows'] else None  # An empty array cannot be memory-mapped
+        x = np.load(os.path.join(entry_dir, 'x.npy'), mmap_mode=mmap_mode)
+        values_mode = mmap_mode if len(meta['columns']) > 1 else None
+        return names, x, np.load(os.path.join(entry_dir, 'values.npy'), mmap_mode=values_mode)
+
+    def _build(self, csv_path, entry_dir, signature):
+        """
+        Converts `csv_path` into a new cache entry, streaming it chunk by chunk into the X and values .npy files.
+        The entry is written to a temporary directory and moved into place when complete.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = f"{entry_dir}.building-{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            columns = list(pd.read_csv(csv_path, nrows=0).columns)
+            rows = self._write_rows(csv_path, staging, len(columns))
+            meta = {'format': _FORMAT, 'signature': signature, 'columns': columns, 'rows': rows}
+            with open(os.path.join(staging, 'meta.json'), 'w') as meta_file:
+                json.dump(meta, meta_file)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(staging, entry_dir)
+        print(f"Cached {rows} rows of {csv_path} in {entry_dir}")
+        return meta
+
+    def _write_rows(self, csv_path, entry_dir, n_columns):
+        """
+        Appends every chunk of the CSV to `x.npy` (first column) and `values.npy` (the other columns, row-major)
+        in `entry_dir`, and writes the .npy headers at the end. Returns the number of rows written.
+        """
+        rows = 0
+        with open(os.path.join(entry_dir, 'x.npy'), 'wb') as x_file, \
+                open(os.path.join(entry_dir, 'values.npy'), 'wb') as values_file:
+            x_file.write(b'\0' * _HEADER_BYTES)
+            values_file.write(b'\0' * _HEADER_BYTES)
+            with pd.read_csv(csv_path, chunksize=self.chunksize, dtype=np.float64) as reader:
+                for chunk in reader:
+                    block = chunk.to_numpy(dtype=np.float64)
+                    x_file.write(np.ascontiguousarray(block[:, 0]).tobytes())
+                    values_file.write(np.ascontiguousarray(block[:, 1:]).tobytes())
+                    rows += len(chunk)
+            x_file.seek(0)
+            x_file.write(_npy_header((rows,)))
+            values_file.seek(0)
+            values_file.write(_npy_header((rows, n_columns - 1)))
+        return rows
+
+
+def _npy_header(shape):
+    """
+    Returns the .npy header of a C-order float64 array of the given shape, padded to exactly _HEADER_BYTES.
+    """
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buffer, {'descr': '<f8', 'fortran_order': False, 'shape': shape})
+    header = buffer.getvalue()
+    if len(header) != _HEADER_BYTES:
+        raise ValueError(f"Unexpected .npy header size: {len(header)} bytes")
+    return header
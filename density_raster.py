@@ -0,0 +1,94 @@
+import numpy as np
+
+
+def data_extent(x, y):
+    """
+    Returns (x_min, x_max, y_min, y_max) of the points, widened by half a unit where a range is empty so that
+    every point falls inside a bin.
+    """
+    x_min, x_max = float(np.min(x)), float(np.max(x))
+    y_min, y_max = float(np.min(y)), float(np.max(y))
+    if x_max <= x_min:
+        x_min, x_max = x_min - 0.5, x_max + 0.5
+    if y_max <= y_min:
+        y_min, y_max = y_min - 0.5, y_max + 0.5
+    return x_min, x_max, y_min, y_max
+
+
+def bin_index(x, y, bins, extent):
+    """
+    Returns the flat bin (row * width + column) of every point on a `bins` = (width, height) grid over
+    `extent`; row 0 is the bottom row, as drawn by Bokeh's image glyphs. Points on the upper edges go to the
+    last bin.
+    """
+    width, height = bins
+    x_min, x_max, y_min, y_max = extent
+    column = ((x - x_min) * (width / (x_max - x_min))).astype(np.int64)
+    row = ((y - y_min) * (height / (y_max - y_min))).astype(np.int64)
+    np.clip(column, 0, width - 1, out=column)
+    np.clip(row, 0, height - 1, out=row)
+    return row * width + column
+
+
+def category_counts(flat, codes, n_codes, bins):
+    """
+    Counts the points of every category per bin with a single bincount.
+
+    Parameters:
+        flat (np.ndarray): Flat bin of each point, from `bin_index`.
+        codes (np.ndarray): Category code (0 .. n_codes - 1) of each point.
+        n_codes (int): Number of categories.
+        bins (tuple): (width, height) of the grid.
+
+    Returns:
+        np.ndarray: Counts of shape (n_codes, height, width).
+    """
+    width, height = bins
+    counts = np.bincount(codes * (width * height) + flat, minlength=n_codes * width * height)
+    return counts.reshape(n_codes, height, width)
+
+
+def binned_mean(flat, values, bins):
+    """
+    Returns the mean of `values` per bin, ignoring NaN values, as an array of shape (height, width) that is
+    NaN where a bin holds no value.
+    """
+    width, height = bins
+    valid = ~np.isnan(values)
+    sums = np.bincount(flat[valid], weights=values[valid], minlength=width * height)
+    counts = np.bincount(flat[valid], minlength=width * height)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+    return mean.reshape(height, width)
+
+
+def hex_to_rgb(palette):
+    """
+    Converts '#RRGGBB' colors to an array of shape (len(palette), 3) of uint8.
+    """
+    return np.array([[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in palette], dtype=np.uint8)
+
+
+def rgba_image(rgb, counts, min_alpha=60):
+    """
+    Packs per-bin colors into the uint32 RGBA image expected by Bokeh's `image_rgba`. Empty bins are
+    transparent; the opacity of the other bins grows with the logarithm of their count, so sparse areas stay
+    visible next to dense ones.
+
+    Parameters:
+        rgb (np.ndarray): Color of every bin, shape (height, width, 3), uint8.
+        counts (np.ndarray): Number of points in every bin, shape (height, width).
+        min_alpha (int): Opacity (0 - 255) of a bin holding a single point.
+
+    Returns:
+        np.ndarray: The image, shape (height, width), uint32.
+    """
+    height, width = counts.shape
+    image = np.zeros((height, width), dtype=np.uint32)
+    channels = image.view(dtype=np.uint8).reshape(height, width, 4)
+    channels[..., :3] = rgb
+    peak = counts.max() if counts.size else 0
+    if peak > 0:
+        scale = np.log1p(counts) / np.log1p(peak)
+        channels[..., 3] = np.where(counts > 0, min_alpha + (255 - min_alpha) * scale, 0).astype(np.uint8)
+    return image
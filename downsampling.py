@@ -0,0 +1,114 @@
+import numpy as np
+
+# Methods accepted by `downsample`
+METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Picks `n_out` points of a line series with Largest-Triangle-Three-Buckets: the first and last points are
+    kept, the points in between are split into `n_out - 2` buckets of equal count, and from each bucket the
+    point forming the largest triangle with the previously kept point and the mean of the next bucket is kept.
+    This keeps the visual shape of the line, including isolated peaks and troughs.
+
+    The bucket means come from one cumulative sum and every bucket is scored as one array operation; only the
+    walk from bucket to bucket is a Python loop, so the cost is O(len(x)) plus O(n_out) loop steps.
+
+    Parameters:
+        x (np.ndarray): X values in increasing order, float64.
+        y (np.ndarray): Y values without NaN, float64.
+        n_out (int): Number of points to keep (at least 3).
+
+    Returns:
+        np.ndarray: Increasing indices of the kept points (all indices when the series has at most `n_out` points).
+    """
+    n = x.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the points 1 .. n - 2; each holds at least one point since n_out < n
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = ends - starts
+    # The "next bucket" point of bucket i is the mean of bucket i + 1, and the last point for the final bucket
+    next_x = np.append((sum_x[ends[1:]] - sum_x[starts[1:]]) / counts[1:], x[-1])
+    next_y = np.append((sum_y[ends[1:]] - sum_y[starts[1:]]) / counts[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], ends[i]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[i] - ay))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def min_max_indices(x, y, n_out):
+    """
+    Picks at most `n_out` points of a line series by keeping the minimum and the maximum Y of each of
+    `n_out // 2` buckets of equal count (plus the first and last points). Every extreme survives, which suits
+    noisy series where the envelope matters more than the shape. Fully vectorized: the buckets are padded to
+    one rectangle and reduced with argmin / argmax along its rows.
+
+    Parameters:
+        x (np.ndarray): X values in increasing order, float64.
+        y (np.ndarray): Y values without NaN, float64.
+        n_out (int): Maximum number of points to keep (at least 4).
+
+    Returns:
+        np.ndarray: Increasing indices of the kept points (all indices when the series has at most `n_out` points).
+    """
+    n = x.shape[0]
+    buckets = (n_out - 2) // 2
+    if n_out >= n or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)  # Ceiling division; the last bucket is padded
+    low = np.full(buckets * size, np.inf)
+    high = np.full(buckets * size, -np.inf)
+    low[:n] = y
+    high[:n] = y
+    offsets = np.arange(buckets) * size
+    minima = offsets + low.reshape(buckets, size).argmin(axis=1)
+    maxima = offsets + high.reshape(buckets, size).argmax(axis=1)
+    kept = np.concatenate(([0, n - 1], minima, maxima))
+    return np.unique(kept[kept < n])
+
+
+def downsample(x, y, n_out=5000, method='lttb'):
+    """
+    Reduces a line series to at most `n_out` points before it is handed to Bokeh, so the size of the HTML
+    output stays bounded however many rows the series has. Series that already fit are returned unchanged.
+    Otherwise the points are sorted by X (when they are not already in order) and points with a NaN X or Y
+    are dropped before decimating.
+
+    Parameters:
+        x (array-like): X values.
+        y (array-like): Y values.
+        n_out (int): Point budget of the series.
+        method (str): 'lttb' (see `lttb_indices`) or 'minmax' (see `min_max_indices`).
+
+    Returns:
+        tuple: The kept (x, y) values as float64 arrays.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape[0] <= n_out:
+        return x, y
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    if not valid.all():
+        x, y = x[valid], y[valid]
+    if x.size > 1 and not np.all(x[1:] >= x[:-1]):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+
+    indices = lttb_indices(x, y, n_out) if method == 'lttb' else min_max_indices(x, y, n_out)
+    return x[indices], y[indices]
@@ -0,0 +1,158 @@
+import numpy as np
+
+
+class XGridIndex:
+    """
+    A reusable index over an X column that answers batched lookups of function values at arbitrary X values.
+
+    The index is built once over the sorted X values. Lookups use O(1) arithmetic when the grid is uniformly
+    spaced (like the 0.1 grid of `ideal.csv`) and binary search otherwise. Points that are not exactly on the
+    grid can be resolved by nearest-neighbour or linear interpolation.
+
+    Attributes:
+        x (np.ndarray): The sorted X values.
+        order (np.ndarray): Row positions of the original data in sorted order (stable, first row wins for duplicates).
+        step (float or None): The grid spacing when the grid is uniform, otherwise None.
+
+    Methods:
+        from_sorted(x, step=None): Rebuilds an index from the sorted X values and step of another index.
+        is_uniform(): Returns True when lookups can use O(1) grid arithmetic.
+        match(x): Returns the original row positions of X values and a mask of which ones are exactly on the grid.
+        positions(x): Returns the original row positions of X values that are exactly on the grid.
+        lookup(values, x, method='exact'): Returns the values at each X using 'exact', 'nearest' or 'linear' resolution.
+    """
+    METHODS = ('exact', 'nearest', 'linear')
+
+    def __init__(self, x, rtol=1e-6):
+        """
+        Builds the index over the X values. `rtol` is the relative tolerance (of the step) for uniform grid detection.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 1 or x.size == 0:
+            raise ValueError("XGridIndex needs a non-empty one-dimensional X column.")
+        self.order = np.argsort(x, kind='stable')
+        self.x = x[self.order]
+        self.step = None
+        if self.x.size > 1:
+            step = (self.x[-1] - self.x[0]) / (self.x.size - 1)
+            if step > 0 and np.allclose(np.diff(self.x), step, rtol=0, atol=rtol * step):
+                self.step = step
+
+    @classmethod
+    def from_sorted(cls, x, step=None):
+        """
+        Rebuilds an index from the sorted X values and the step of an existing index, e.g. in a worker process
+        that attached to them in shared memory, without sorting or re-detecting the grid. Row positions then
+        refer to the sorted rows, so the values looked up must be in sorted X order as well.
+        """
+        index = cls.__new__(cls)
+        index.x = np.asarray(x, dtype=np.float64)
+        index.order = np.arange(index.x.size)
+        index.step = step
+        return index
+
+    def __len__(self):
+        return self.x.size
+
+    def is_uniform(self):
+        """
+        Returns True when lookups can use O(1) grid arithmetic instead of binary search.
+        """
+        return self.step is not None
+
+    def _left(self, x):
+        """
+        Returns, for each X, the sorted position of the last grid point that is <= X (clipped to the grid).
+        """
+        if self.is_uniform():
+            left = np.floor((x - self.x[0]) / self.step).astype(np.intp)
+            left = np.clip(left, 0, self.x.size - 1)
+            # Grid arithmetic can be one step off due to rounding; correct against the stored values
+            left -= (self.x[left] > x) & (left > 0)
+            upper = np.minimum(left + 1, self.x.size - 1)
+            left = np.where(self.x[upper] <= x, upper, left)
+            return left
+        return np.clip(np.searchsorted(self.x, x, side='right') - 1, 0, self.x.size - 1)
+
+    def _exact(self, x):
+        """
+        Returns the sorted positions of exact matches and a mask of which X values were found.
+        """
+        if self.is_uniform():
+            positions = np.rint((x - self.x[0]) / self.step).astype(np.intp)
+            positions = np.clip(positions, 0, self.x.size - 1)
+            found = self.x[positions] == x
+            if found.all():
+                return positions, found
+        else:
+            positions = np.zeros(x.shape, dtype=np.intp)
+            found = np.zeros(x.shape, dtype=bool)
+        # Binary search whatever grid arithmetic could not resolve
+        pending = ~found
+        searched = np.searchsorted(self.x, x[pending], side='left')
+        clipped = np.minimum(searched, self.x.size - 1)
+        positions[pending] = clipped
+        found[pending] = (searched < self.x.size) & (self.x[clipped] == x[pending])
+        return positions, found
+
+    def match(self, x):
+        """
+        Returns the original row positions of the given X values and a boolean mask of which ones are on the grid.
+        Positions of X values that are not on the grid are meaningless and must be filtered with the mask.
+        """
+        positions, found = self._exact(np.asarray(x, dtype=np.float64))
+        return self.order[positions], found
+
+    def positions(self, x):
+        """
+        Returns the original row positions of the given X values.
+
+        Raises:
+            KeyError: If any X value is not exactly on the grid.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        positions, found = self.match(x)
+        if not found.all():
+            missing = x[~found]
+            raise KeyError(f"{missing.size} X value(s) not found in the grid, e.g. {missing[:5].tolist()}")
+        return positions
+
+    def lookup(self, values, x, method='exact'):
+        """
+        Looks up function values at each requested X.
+
+        Parameters:
+            values (array-like): Function values aligned with the X column the index was built from, shape (rows, n_funcs).
+                A float32 block is used as it is; only the gathered rows are converted to float64.
+            x (array-like): X values to look up, shape (n_points,).
+            method (str): 'exact' requires every X to be on the grid, 'nearest' takes the closest grid point
+                (ties go to the lower X), 'linear' interpolates between the neighbouring grid points.
+                Points outside the grid are clamped to the first/last grid value by 'nearest' and 'linear'.
+
+        Returns:
+            np.ndarray: The values at each X with shape (n_points, n_funcs).
+        """
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown lookup method: {method}. Use one of {self.METHODS}.")
+        values = np.asarray(values)
+        if values.dtype != np.float32:
+            values = values.astype(np.float64, copy=False)
+        if values.ndim == 1:
+            values = values.reshape(-1, 1)
+        x = np.asarray(x, dtype=np.float64)
+
+        if method == 'exact':
+            return values[self.positions(x)].astype(np.float64, copy=False)
+
+        left = self._left(x)
+        right = np.minimum(left + 1, self.x.size - 1)
+        x_left, x_right = self.x[left], self.x[right]
+
+        if method == 'nearest':
+            nearest = np.where(np.abs(x_right - x) < np.abs(x - x_left), right, left)
+            return values[self.order[nearest]].astype(np.float64, copy=False)
+
+        width = x_right - x_left
+        weight = np.divide(x - x_left, width, out=np.zeros_like(x), where=width > 0)
+        weight = np.clip(weight, 0.0, 1.0)[:, None]
+        return (1.0 - weight) * values[self.order[left]] + weight * values[self.order[right]]
@@ -0,0 +1,66 @@
+def _quote_table(preparer, table_name):
+    """
+    Quotes a (optionally schema-qualified) table name with the dialect's identifier preparer.
+    """
+    return '.'.join(preparer.quote(part) for part in table_name.split('.'))
+
+
+def matching_select_sql(preparer, test_table, ideal_table, funcs, thresholds=None, x_column='x', y_column='y',
+                        id_column='id'):
+    """
+    Builds one set-based SELECT that assigns every test point to its best matching function inside the database.
+
+    The test and ideal tables are joined on X, the chosen functions are unpivoted with UNION ALL, functions whose
+    deviation is not strictly below their threshold are dropped, and ROW_NUMBER() keeps the smallest deviation
+    per test point (ties going to the first function, like matching.assign_points). Needs window functions
+    (MySQL 8+, SQL Server, SQLite 3.25+).
+
+    Parameters:
+        preparer: The dialect's identifier preparer (engine.dialect.identifier_preparer).
+        test_table (str): Table with the test points (id, x, y).
+        ideal_table (str): Table with the ideal functions (x and one column per function).
+        funcs (list of str): The chosen ideal function columns, in tie-break order.
+        thresholds (list of float, optional): Maximum deviation per function (e.g. the sqrt(2)-adjusted
+            deviations); without thresholds every function is admissible.
+        x_column, y_column, id_column (str): Column names of the test and ideal tables.
+
+    Returns:
+        tuple: (sql, params) selecting x, y, ideal_function, deviation, to be executed with sqlalchemy.text.
+    """
+    quote = preparer.quote
+    test = _quote_table(preparer, test_table)
+    ideal = _quote_table(preparer, ideal_table)
+    x, y, test_id = quote(x_column), quote(y_column), quote(id_column)
+
+    params = {}
+    branches = []
+    for position, func in enumerate(funcs):
+        params[f'func_{position}'] = func
+        if thresholds is not None:
+            params[f'threshold_{position}'] = float(thresholds[position])
+            admissible = f"ABS(t.{y} - i.{quote(func)}) < :threshold_{position}"
+        else:
+            admissible = f"i.{quote(func)} IS NOT NULL"
+        branches.append(
+            f"SELECT t.{test_id} AS test_id, t.{x} AS x, t.{y} AS y, :func_{position} AS ideal_function, "
+            f"ABS(t.{y} - i.{quote(func)}) AS deviation, {position} AS position "
+            f"FROM {test} t JOIN {ideal} i ON i.{x} = t.{x} "
+            f"WHERE {admissible}"
+        )
+
+    sql = (
+        "SELECT x, y, ideal_function, deviation FROM ("
+        "SELECT c.x, c.y, c.ideal_function, c.deviation, "
+        "ROW_NUMBER() OVER (PARTITION BY c.test_id ORDER BY c.deviation, c.position) AS match_rank "
+        f"FROM ({' UNION ALL '.join(branches)}) c"
+        ") ranked WHERE match_rank = 1"
+    )
+    return sql, params
+
+
+def matching_insert_sql(preparer, result_table, select_sql, verb='INSERT'):
+    """
+    Wraps the matching SELECT in an INSERT ... SELECT into `result_table`; `verb` is the backend's insert keyword
+    (StorageBackend.insert_verb), e.g. 'REPLACE' to overwrite earlier runs.
+    """
+    return f"{verb} INTO {_quote_table(preparer, result_table)} (x, y, ideal_function, deviation) {select_sql}"
@@ -0,0 +1,311 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# The stage names used by the pipeline modules
+STAGES = ('csv_read', 'sql_write', 'sql_read', 'ssd', 'deviations', 'assignment', 'result_write', 'plot_render')
+
+
+class _NullSpan:
+    """
+    The span returned while instrumentation is disabled: entering and leaving it does nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    One timed stage of a run, recorded by `Instrumentation.span`.
+    """
+    __slots__ = ('owner', 'name', 'attrs', 'parent', 'start', 'seconds', 'base_bytes', 'max_bytes', 'profiler')
+
+    def __init__(self, owner, name, attrs):
+        self.owner = owner
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.start = 0.0
+        self.seconds = None
+        self.base_bytes = 0
+        self.max_bytes = 0
+        self.profiler = None
+
+    def set(self, **attrs):
+        """
+        Adds attributes to the span, e.g. a row count that is only known at the end of the stage.
+        """
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.owner._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.owner._exit(self, exc_type)
+        return False
+
+
+class Instrumentation:
+    """
+    Opt-in timing spans, counters, peak memory and profiles for the pipeline stages (see STAGES), exported as a
+    JSON trace.
+
+    While disabled (the default) `span` returns a shared no-op context manager and `count` returns at once, so
+    the hooks left in the hot paths cost one attribute check. Spans nest per thread; the trace keeps each span's
+    parent, thread, start offset, duration and attributes.
+
+    Attributes:
+        enabled (bool): Whether spans and counters are recorded.
+        memory (bool): Record the tracemalloc peak of every span, in bytes above the level at its start.
+            tracemalloc is process-wide, so spans running at the same time on other threads share the figure.
+        profile (set of str): Stage names to run under cProfile; the outermost profiled span of a thread
+            collects the profile of everything nested in it.
+        spans (list of dict): The finished spans.
+        counters (dict): Totals such as 'rows_read', 'rows_written', 'rows_fetched', 'bytes_fetched' and 'queries'.
+
+    Methods:
+        enable(memory=False, profile=(), profile_dir=None): Starts recording (clearing earlier records).
+        disable(): Stops recording.
+        span(name, **attrs): Context manager timing one stage.
+        traced(name, *arg_names): Decorator that runs a function inside a span.
+        count(name, value=1): Adds to a counter.
+        chunks(name, iterable, counter=None, **attrs): Yields DataFrame chunks, timing the production of each one.
+        enable_from_environment(environ=os.environ): Enables recording when PIPELINE_TRACE is set.
+        summary(): Returns total seconds and calls per span name.
+        export(path=None): Returns (and writes) the JSON trace.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.profile = set()
+        self.profile_dir = None
+        self.spans = []
+        self.counters = {}
+        self.profiles = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+
+    def enable(self, memory=False, profile=(), profile_dir=None):
+        """
+        Starts recording, discarding earlier spans, counters and profiles.
+
+        Parameters:
+            memory (bool): Capture per-span tracemalloc peaks (slows allocations down while on).
+            profile (iterable of str or True): Stage names to profile with cProfile, or True for every stage.
+            profile_dir (str, optional): Directory where each profile is also dumped as a .prof file.
+        """
+        self.disable()
+        self.spans = []
+        self.counters = {}
+        self.profiles = {}
+        self.memory = memory
+        self.profile = set(STAGES) if profile is True else set(profile)
+        self.profile_dir = profile_dir
+        self._origin = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stops recording; the records stay available for `summary` and `export`.
+        """
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def span(self, name, **attrs):
+        """
+        Returns a context manager that times the stage `name`; `attrs` are stored with the span.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def traced(self, name, *arg_names):
+        """
+        Decorator running the function inside a span `name`, recording the arguments `arg_names`
+        (e.g. the engine) as span attributes.
+        """
+        def decorator(function):
+            signature = inspect.signature(function)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                attrs = {}
+                if arg_names:
+                    bound = signature.bind(*args, **kwargs)
+                    bound.apply_defaults()
+                    attrs = {arg: _plain(bound.arguments[arg]) for arg in arg_names}
+                with Span(self, name, attrs):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """
+        Adds `value` to the counter `name`.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def chunks(self, name, iterable, counter=None, **attrs):
+        """
+        Yields the chunks of `iterable` (e.g. a chunked `pd.read_csv` or `pd.read_sql_query`), timing the
+        production of each chunk in a span `name`. With `counter` (e.g. 'read' or 'fetched') the rows and
+        in-memory bytes of every chunk are added to the counters 'rows_<counter>' and 'bytes_<counter>'.
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.span(name, **attrs) as span:
+                chunk = next(iterator, None)
+                if chunk is not None and self.enabled:
+                    span.set(rows=len(chunk))
+                    if counter:
+                        self.count(f'rows_{counter}', len(chunk))
+                        self.count(f'bytes_{counter}', _nbytes(chunk))
+            if chunk is None:
+                return
+            yield chunk
+
+    def enable_from_environment(self, environ=os.environ):
+        """
+        Enables recording when the PIPELINE_TRACE variable names a trace file. PIPELINE_TRACE_MEMORY=1 adds
+        peak memory, and PIPELINE_PROFILE lists the stages to profile (comma-separated, or 'all').
+
+        Returns:
+            str or None: The trace path to pass to `export` at the end of the run.
+        """
+        path = environ.get('PIPELINE_TRACE')
+        if not path:
+            return None
+        stages = environ.get('PIPELINE_PROFILE', '')
+        profile = True if stages.strip() == 'all' else [stage.strip() for stage in stages.split(',') if stage.strip()]
+        self.enable(memory=environ.get('PIPELINE_TRACE_MEMORY', '') not in ('', '0'), profile=profile)
+        return path
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, span):
+        stack = self._stack()
+        span.parent = stack[-1] if stack else None
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            for open_span in stack:
+                open_span.max_bytes = max(open_span.max_bytes, peak)
+            tracemalloc.reset_peak()
+            span.base_bytes = span.max_bytes = current
+        if span.name in self.profile and not any(open_span.profiler for open_span in stack):
+            span.profiler = cProfile.Profile()
+            span.profiler.enable()
+        stack.append(span)
+        span.start = time.perf_counter()
+
+    def _exit(self, span, exc_type):
+        span.seconds = time.perf_counter() - span.start
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        if span.profiler is not None:
+            span.profiler.disable()
+            self._store_profile(span)
+        record = {'name': span.name, 'start': span.start - self._origin, 'seconds': span.seconds,
+                  'parent': span.parent.name if span.parent else None, 'depth': len(stack),
+                  'thread': threading.current_thread().name, 'attrs': span.attrs}
+        if exc_type is not None:
+            record['error'] = exc_type.__name__
+        if self.memory and tracemalloc.is_tracing():
+            span.max_bytes = max(span.max_bytes, tracemalloc.get_traced_memory()[1])
+            if span.parent is not None:
+                span.parent.max_bytes = max(span.parent.max_bytes, span.max_bytes)
+            record['peak_bytes'] = span.max_bytes - span.base_bytes
+        with self._lock:
+            self.spans.append(record)
+
+    def _store_profile(self, span):
+        output = io.StringIO()
+        stats = pstats.Stats(span.profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(25)
+        with self._lock:
+            key = f"{span.name}#{sum(1 for name in self.profiles if name.startswith(span.name + '#')) + 1}"
+            self.profiles[key] = output.getvalue()
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stats.dump_stats(os.path.join(self.profile_dir, f"{key.replace('#', '-')}.prof"))
+
+    def summary(self):
+        """
+        Returns {span name: {'calls': n, 'seconds': total}} over the recorded spans.
+        """
+        totals = {}
+        with self._lock:
+            for record in self.spans:
+                entry = totals.setdefault(record['name'], {'calls': 0, 'seconds': 0.0})
+                entry['calls'] += 1
+                entry['seconds'] += record['seconds']
+        return totals
+
+    def export(self, path=None):
+        """
+        Returns the trace (spans in finishing order, counters, per-stage summary and profile texts) as a
+        JSON-serializable dictionary, and writes it to `path` when given.
+        """
+        with self._lock:
+            trace = {'spans': list(self.spans), 'counters': dict(self.counters), 'profiles': dict(self.profiles)}
+        trace['summary'] = self.summary()
+        if path:
+            with open(path, 'w') as output:
+                json.dump(trace, output, indent=2, default=str)
+            print(f"Instrumentation trace written to {path}")
+        return trace
+
+
+def _nbytes(chunk):
+    """
+    Returns the in-memory size of a DataFrame or array chunk in bytes.
+    """
+    if hasattr(chunk, 'memory_usage'):
+        return int(chunk.memory_usage(index=False).sum())
+    return int(getattr(chunk, 'nbytes', 0))
+
+
+def _plain(value):
+    """
+    Returns `value` when it is a JSON scalar, otherwise its string form.
+    """
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+
+# The process-wide instrumentation shared by every module of the pipeline
+instrumentation = Instrumentation()
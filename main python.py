@@ -3,6 +3,13 @@ from connection_ms_sql import CreateDatabaseTable as cdt
 from read_csv_save_data_ms_sql import ReadCsv as csv
 from calculation import Calculations as cal
 from ploting import Plot as plt
+from chunked_io import read_sql_chunks
+from data_access import read_projected_frame
+from streaming import RESULT_COLUMNS, ResultSink
+from instrumentation import instrumentation
+
+# Set PIPELINE_TRACE=trace.json to record a JSON trace of the run (see instrumentation.py)
+trace_path = instrumentation.enable_from_environment()
 
 ##Please have your Csv files and all of the project files with in the same forlder we are using Microsoft SQL Server 2022 
 
@@ -58,8 +65,9 @@ db_copy =    rcsv( server,
 db_creator.create_database()
 # Create Tables in the SQL Server database
 db_creator.create_tables()
-# Copy the data from csv files to SQL Server
-db_copy.read_csv_to_sql()
+# Copy the data from csv files to SQL Server, loading the three files at the same time
+# and keeping the small train DataFrame so it does not have to be read back from SQL
+dataframes = db_copy.read_csv_to_sql(concurrent=True, keep_frames=['train'])
 
 # Initialize the engine
 db_copy.alchemy_connection()
@@ -67,41 +75,38 @@ db_copy.alchemy_connection()
 # use db_conn.engine to perform database operations
 engine = db_copy.engine
 
-#Reading data from SQL Server into a pandas DataFrame
-df_train = pd.read_sql_query("SELECT * FROM train_table", engine)
-df_ideal = pd.read_sql_query("SELECT * FROM ideal_table", engine)
-df_test = pd.read_sql_query("SELECT * FROM test_table", engine)
+#Train data as loaded from the csv files
+df_train = dataframes['train']
+
+# Number of ideal and test rows held in memory at once while streaming the tables
+chunk_size = 100000
 
-# Create an instance of Class Calculations
-calculations = cal(df_train, df_ideal, df_test)
+# Create an instance of Class Calculations, the ideal and test data are streamed instead of loaded at once
+calculations = cal(df_train, None, None)
 
-# Calculate SSD sums and find top four ideal functions
-calculations.calculate_criteria1()
+# Calculate SSD sums, find top four ideal functions and their deviations in one streamed pass
+calculations.calculate_criteria1_streamed(read_sql_chunks(engine, 'ideal_table', chunk_size))
 
 # Access the ssd_sums and top_four_ideal_functions directly from the instance
 ssd_sums = calculations.get_ssd_sums()
 top_four_ideal_functions = calculations.get_top_four_ideal_functions()
 
-# Calculate Daviations
-calculations.deviations()
-
-#Calculate Final Results base on df_test
-calculations.results()
-
-#Access Test Resutls
-test_results = calculations.get_test_results()
-
-# Create a new DataFrame from the final results
-df_test_results = pd.DataFrame(test_results)
-df_test_results = df_test_results.sort_values(by='X (test func)')
+# Fetch only X and the chosen ideal functions
+chosen_columns = ['X'] + list(dict.fromkeys(top_four_ideal_functions))
+df_ideal = read_projected_frame(engine, 'ideal_table', chosen_columns, chunksize=chunk_size)
+calculations.set_ideal_data(df_ideal)
 
 # use db_conn.engine (initialized above) to perform database operations 
 engine = db_copy.engine
 table_name = 'test_results'
-        
-# Save the DataFrame to the SQL table
-df_test_results.to_sql(name=table_name, con=engine, if_exists='replace', index=False)
-print(f'Data Copied to {table_name} in SQL')
+
+#Calculate Final Results chunk by chunk from the test table; each batch is written to the SQL table
+#on a background thread while the next chunk is read and classified
+rows = ResultSink(db_copy.backend, table_name).consume(calculations.results_streamed(read_sql_chunks(engine, 'test_table', chunk_size)))
+print(f'Data Copied to {table_name} in SQL ({rows} rows)')
+
+# Read the results back, sorted by X, for the plots
+df_test_results = read_projected_frame(engine, table_name, RESULT_COLUMNS).sort_values(by='X (test func)')
 
 # Create an instance of Class Plot
 ssd = plt(ssd_sums,df_test_results)
@@ -112,3 +117,5 @@ ssd.dashboard()
 #ssd.scatter_plot_only()
 print(df_test_results)
 
+if trace_path:
+    instrumentation.export(trace_path)
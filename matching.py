@@ -0,0 +1,33 @@
+import numpy as np
+
+
+def assign_points(y, candidate_values, thresholds=None):
+    """
+    Picks the best matching function for every point from the candidate values at that point's X.
+
+    A function is admissible for a point when its absolute deviation is strictly below its threshold;
+    among admissible functions the one with the smallest deviation wins, ties going to the first one.
+
+    Parameters:
+        y (array-like): Y values of the points, shape (n_points,).
+        candidate_values (array-like): Function values at each point's X, shape (n_points, n_funcs).
+        thresholds (array-like, optional): Maximum allowed deviation per function, shape (n_funcs,).
+            When omitted every function is admissible.
+
+    Returns:
+        tuple: (best, deviation) where `best` holds the winning function index per point (-1 when no function
+            matched) and `deviation` the corresponding absolute deviation (inf when no function matched).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    candidate_values = np.asarray(candidate_values, dtype=np.float64)
+    deviations = np.abs(candidate_values - y[:, None])
+
+    admissible = ~np.isnan(deviations)
+    if thresholds is not None:
+        admissible &= deviations < np.asarray(thresholds, dtype=np.float64)[None, :]
+    deviations = np.where(admissible, deviations, np.inf)
+
+    best = np.argmin(deviations, axis=1) if deviations.shape[1] else np.zeros(len(y), dtype=np.intp)
+    best_deviation = deviations[np.arange(len(y)), best] if deviations.shape[1] else np.full(len(y), np.inf)
+    best = np.where(np.isfinite(best_deviation), best, -1)
+    return best, best_deviation
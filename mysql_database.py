@@ -1,11 +1,18 @@
 import mysql.connector
-import csv
+import time
 import pandas as pd
 from bokeh.plotting import figure, output_file, show
-from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
 import numpy as np
-import unittest
+from matching import assign_points
+from grid_index import XGridIndex
+from sqlalchemy import text
+from data_access import read_projected_frame
+from chunked_io import read_csv_batches
+from in_db_matching import matching_insert_sql, matching_select_sql
+from downsampling import downsample
+from storage_backend import MySQLBackend
+from instrumentation import instrumentation
 
 class DatabaseConnectionError(Exception):
     """Custom exception for database connection errors."""
@@ -21,27 +28,35 @@ class DataProcessingError(Exception):
 
 class DatabaseConnector:
     """
-    A class used to connect to a MySQL database.
+    A class used to connect to a MySQL database, or to any other storage backend.
+
+    `backend` is a storage_backend.StorageBackend (MySQL built from host, user, password and database by default;
+    e.g. SQLiteBackend('pipeline.db') runs everything in-process). Connections are checked out of the process-wide
+    pool in `connection_pool.registry`, which is shared with the SQLAlchemy engines of the other classes, and
+    `disconnect` returns them to the pool. `placeholder` is the parameter marker of the backend's DB-API driver.
     """
-    def __init__(self, host, user, password, database):
+    def __init__(self, host, user, password, database, backend=None):
         self.host = host
         self.user = user
         self.password = password
         self.database = database
+        self.backend = backend or MySQLBackend(host, user, password, database)
+        self.placeholder = self.backend.placeholder
         self.connection = None
         self.cursor = None
 
+    def url(self):
+        """
+        Returns the SQLAlchemy URL of this database, the key of its shared pool.
+        """
+        return self.backend.url()
+
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
+            self.connection = self.backend.raw_connection()
             self.cursor = self.connection.cursor()
             print("Connected to the database.")
-        except mysql.connector.Error as err:
+        except (mysql.connector.Error, SQLAlchemyError) as err:
             raise DatabaseConnectionError(f"Database connection failed: {err}")
 
     def disconnect(self):
@@ -53,34 +68,81 @@ class DatabaseConnector:
 class CSVImporter(DatabaseConnector):
     """
     A class used to import CSV data into a MySQL database table, inheriting from DatabaseConnector.
+
+    Rows are read in chunks and sent as parameterized, batched inserts.
     """
-    def __init__(self, host, user, password, database):
-        super().__init__(host, user, password, database)
 
-    def import_csv_to_db(self, csv_file_path, table_name):
+    def __init__(self, host, user, password, database, allow_local_infile=False, backend=None):
+        # allow_local_infile is required by the LOAD DATA LOCAL INFILE fast path of the default MySQL backend
+        super().__init__(host, user, password, database,
+                         backend or MySQLBackend(host, user, password, database, allow_local_infile))
+
+    def import_csv_to_db(self, csv_file_path, table_name, batch_size=10000, commit_every=100000,
+                         chunksize=100000, use_load_data=False):
+        """
+        Imports a CSV file into `table_name`, whose first column is an auto-increment id followed by the CSV columns.
+
+        Parameters:
+            csv_file_path (str): Path to the CSV file (the header row is skipped).
+            table_name (str): The target table.
+            batch_size (int): Rows per parameterized multi-row insert.
+            commit_every (int): Rows between commits, so a failure does not leave one huge open transaction.
+            chunksize (int): Rows read from the CSV at a time.
+            use_load_data (bool): Use the backend's native CSV bulk load instead of inserts (MySQL's LOAD DATA
+                LOCAL INFILE, which needs allow_local_infile, or DuckDB's CSV reader).
+
+        Returns:
+            dict: The number of 'rows' imported, the elapsed 'seconds' and the 'rows_per_second' throughput.
+        """
         try:
-            with open(csv_file_path, 'r') as csvfile:
-                csvreader = csv.reader(csvfile)
-                next(csvreader)  # Skip the header row if present
-                for row in csvreader:
-                    values = ', '.join(['"' + str(val) + '"' for val in row])
-                    query = f"INSERT INTO {table_name} VALUES (NULL, {values})"
-                    self.cursor.execute(query)
+            start = time.perf_counter()
+            if use_load_data:
+                columns = list(pd.read_csv(csv_file_path, nrows=0).columns)
+                with instrumentation.span('sql_write', table=table_name, method='load_data'):
+                    rows = self.backend.load_csv_file(self.cursor, csv_file_path, table_name, columns)
+                instrumentation.count('rows_written', rows)
+            else:
+                rows = self._insert_batches(csv_file_path, table_name, batch_size, commit_every, chunksize)
             self.connection.commit()
-            print("Data imported successfully.")
+            seconds = time.perf_counter() - start
+            rate = rows / seconds if seconds > 0 else float('inf')
+            print(f"Data imported successfully: {rows} rows into {table_name} in {seconds:.2f}s ({rate:,.0f} rows/s).")
+            return {'rows': rows, 'seconds': seconds, 'rows_per_second': rate}
         except FileNotFoundError as e:
             raise CSVImportError(f"CSV file not found: {e}")
         except mysql.connector.Error as err:
             raise CSVImportError(f"Error importing CSV to database: {err}")
+        except Exception as e:
+            raise CSVImportError(f"Error importing CSV to database: {e}")
+
+    def _insert_batches(self, csv_file_path, table_name, batch_size, commit_every, chunksize):
+        """
+        Sends the CSV rows as parameterized multi-row inserts of `batch_size` rows (see chunked_io.read_csv_batches)
+        through the backend, naming the CSV columns so the id column is filled by the database, and commits
+        every `commit_every` rows. Returns the number of rows inserted.
+        """
+        rows = 0
+        uncommitted = 0
+        for columns, batch in read_csv_batches(csv_file_path, batch_size, chunksize):
+            with instrumentation.span('sql_write', table=table_name, rows=len(batch)):
+                self.backend.insert_rows(self.cursor, table_name, columns, batch)
+            instrumentation.count('rows_written', len(batch))
+            rows += len(batch)
+            uncommitted += len(batch)
+            if uncommitted >= commit_every:
+                self.connection.commit()
+                uncommitted = 0
+        return rows
 
 class DataProcessor(DatabaseConnector):
     """
     A class used to process test data, match it with ideal functions, and save the results.
     """
-    def __init__(self, host, user, password, database):
-        super().__init__(host, user, password, database)
-        self.engine = create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}")
+    def __init__(self, host, user, password, database, backend=None):
+        super().__init__(host, user, password, database, backend)
+        self.engine = self.backend.engine()
 
+    @instrumentation.traced('ssd')
     def find_best_fit_functions(self, train_data, ideal_data):
         best_fit_funcs = {}
         for i in range(1, 5):
@@ -94,31 +156,53 @@ class DataProcessor(DatabaseConnector):
             best_fit_funcs[f'y{i}'] = best_func
         return best_fit_funcs
 
-    def process_test_data(self, test_csv_file_path, ideal_functions_table, result_table, best_fit_funcs):
+    def process_test_data(self, test_csv_file_path, ideal_functions_table, result_table, best_fit_funcs, interpolation='exact',
+                          flush_size=1000, mode='insert'):
+        """
+        Matches every test point to its best fit function and writes the matches to `result_table`.
+
+        Results are buffered and written as parameterized multi-row inserts of `flush_size` rows, each flush
+        being committed, so an error partway through only loses the current batch.
+
+        Parameters:
+            interpolation (str): 'exact', 'nearest' or 'linear' resolution of test X values against the ideal grid.
+            flush_size (int): Rows per batched insert and commit.
+            mode (str): 'insert' appends rows; 'replace' overwrites the rows of the same test points instead of
+                duplicating them when the job is re-run (needs a unique key on (x, y)). It is REPLACE INTO, or
+                INSERT ... ON DUPLICATE KEY UPDATE on MySQL, whose driver only batches statements starting with INSERT.
+        """
+        self.backend.insert_verb(mode)  # Reject unknown or unsupported modes before any work
         try:
-            test_data = pd.read_csv(test_csv_file_path)
-            ideal_data = pd.read_sql(f"SELECT * FROM {ideal_functions_table}", self.engine)
-
-            for _, row in test_data.iterrows():
-                x, y = row['x'], row['y']
-                min_deviation = float('inf')
-                chosen_function = None
-
-                for func in best_fit_funcs.values():
-                    ideal_y = ideal_data.loc[ideal_data['x'] == x, func].values[0]
-                    deviation = abs(y - ideal_y)
-                    if deviation < min_deviation:
-                        min_deviation = deviation
-                        chosen_function = func
-
-                if chosen_function:
-                    threshold = np.sqrt(2) * min_deviation
-                    if min_deviation <= threshold:
-                        result_query = f"INSERT INTO {result_table} (x, y, ideal_function, deviation) VALUES ({x}, {y}, '{chosen_function}', {min_deviation})"
-                        self.cursor.execute(result_query)
-
-            self.connection.commit()
-            print("Test data processed and results saved successfully.")
+            with instrumentation.span('csv_read', file=str(test_csv_file_path)):
+                test_data = pd.read_csv(test_csv_file_path)
+            instrumentation.count('rows_read', len(test_data))
+
+            # Only fetch x and the best fit functions, and only the rows needed for the test X values
+            funcs = list(best_fit_funcs.values())
+            ideal_data = read_projected_frame(self.engine, ideal_functions_table, ['x'] + list(dict.fromkeys(funcs)),
+                                              x_column='x', x_values=test_data['x'], interpolation=interpolation)
+
+            # Look up every test X and score all best fit functions in one batched step
+            # interpolation='nearest' or 'linear' resolves test X values that are not exactly on the ideal grid
+            with instrumentation.span('assignment', engine='python', rows=len(test_data)):
+                candidates = XGridIndex(ideal_data['x']).lookup(ideal_data[funcs].to_numpy(dtype=np.float64), test_data['x'], interpolation)
+                best, deviations = assign_points(test_data['y'], candidates)
+            instrumentation.count('rows_classified', len(test_data))
+
+            matched = best >= 0
+            records = list(zip(test_data['x'].to_numpy(dtype=np.float64)[matched].tolist(),
+                               test_data['y'].to_numpy(dtype=np.float64)[matched].tolist(),
+                               [funcs[i] for i in best[matched]],
+                               deviations[matched].tolist()))
+
+            for i in range(0, len(records), flush_size):
+                with instrumentation.span('result_write', table=result_table, rows=len(records[i:i + flush_size])):
+                    self.backend.insert_rows(self.cursor, result_table, ['x', 'y', 'ideal_function', 'deviation'],
+                                             records[i:i + flush_size], mode)
+                    self.connection.commit()
+            instrumentation.count('rows_written', len(records))
+
+            print(f"Test data processed and {len(records)} results saved successfully.")
         except FileNotFoundError as e:
             raise CSVImportError(f"CSV file not found: {e}")
         except mysql.connector.Error as err:
@@ -126,28 +210,108 @@ class DataProcessor(DatabaseConnector):
         except Exception as e:
             raise DataProcessingError(f"Unexpected error: {e}")
 
+    def process_test_data_in_db(self, test_table, ideal_functions_table, result_table, best_fit_funcs, thresholds=None,
+                                mode='insert'):
+        """
+        Set-based variant of `process_test_data` for test points already loaded into `test_table`: the whole
+        matching runs inside the database as one INSERT ... SELECT (see in_db_matching.matching_select_sql),
+        so no test or ideal rows travel to the client. Only exact X matches are supported.
+
+        Parameters:
+            thresholds (dict, optional): Maximum deviation per function, e.g. the sqrt(2)-adjusted deviations
+                keyed by function name; without thresholds every function is admissible.
+            mode (str): 'insert' or 'replace', as in `process_test_data`.
+
+        Returns:
+            int: The number of rows written.
+        """
+        try:
+            funcs = list(dict.fromkeys(best_fit_funcs.values()))
+            limits = None if thresholds is None else [thresholds[func] for func in funcs]
+            preparer = self.engine.dialect.identifier_preparer
+            select_sql, params = matching_select_sql(preparer, test_table, ideal_functions_table, funcs, limits)
+            with instrumentation.span('assignment', engine='in_db'), self.engine.begin() as connection:
+                result = connection.execute(text(matching_insert_sql(preparer, result_table, select_sql,
+                                                                     self.backend.insert_verb(mode))), params)
+                # DuckDB reports the inserted row count as a result row instead of a rowcount
+                written = result.scalar() if result.rowcount < 0 and result.returns_rows else result.rowcount
+            instrumentation.count('rows_written', written)
+            print(f"Test data processed in the database and {written} results saved successfully.")
+            return written
+        except SQLAlchemyError as err:
+            raise DataProcessingError(f"Error processing test data in the database: {err}")
+
+    def check_in_db_parity(self, test_table, ideal_functions_table, best_fit_funcs, thresholds=None, tolerance=1e-6):
+        """
+        Runs the in-database matching SELECT and the in-Python matching (XGridIndex + assign_points) on the same
+        tables and compares them point by point, e.g. against an SQLite copy of the data before switching a
+        deployment to `process_test_data_in_db`.
+
+        Returns:
+            pd.DataFrame: The test points whose function or deviation differ (empty when both engines agree).
+        """
+        funcs = list(dict.fromkeys(best_fit_funcs.values()))
+        limits = None if thresholds is None else [thresholds[func] for func in funcs]
+        select_sql, params = matching_select_sql(self.engine.dialect.identifier_preparer, test_table,
+                                                 ideal_functions_table, funcs, limits)
+        in_db = pd.read_sql_query(text(select_sql), self.engine, params=params)
+
+        test_data = read_projected_frame(self.engine, test_table, ['x', 'y'])
+        ideal_data = read_projected_frame(self.engine, ideal_functions_table, ['x'] + funcs,
+                                          x_column='x', x_values=test_data['x'])
+        candidates = XGridIndex(ideal_data['x']).lookup(ideal_data[funcs].to_numpy(dtype=np.float64), test_data['x'])
+        best, deviations = assign_points(test_data['y'], candidates, limits)
+        matched = best >= 0
+        in_python = pd.DataFrame({'x': test_data['x'][matched].to_numpy(dtype=np.float64),
+                                  'y': test_data['y'][matched].to_numpy(dtype=np.float64),
+                                  'ideal_function': [funcs[i] for i in best[matched]],
+                                  'deviation': deviations[matched]})
+
+        both = in_python.merge(in_db, on=['x', 'y'], how='outer', suffixes=('_python', '_db'), indicator=True)
+        differs = ((both['_merge'] != 'both')
+                   | (both['ideal_function_python'] != both['ideal_function_db'])
+                   | ((both['deviation_python'] - both['deviation_db']).abs() > tolerance))
+        return both[differs].drop(columns='_merge').reset_index(drop=True)
+
 class DataVisualizer(DatabaseConnector):
     """
     A class used to visualize data from a MySQL database table, inheriting from DatabaseConnector.
     """
-    def __init__(self, host, user, password, database):
-        super().__init__(host, user, password, database)
-        self.engine = create_engine(f"mysql+mysqlconnector://{user}:{password}@{host}/{database}")
+    def __init__(self, host, user, password, database, backend=None):
+        super().__init__(host, user, password, database, backend)
+        self.engine = self.backend.engine()
+
+    @instrumentation.traced('plot_render')
+    def visualize_data(self, train_table, test_table, result_table, best_fit_funcs, ideal_table=None,
+                       max_points=None, downsample_method='lttb'):
+        """
+        Plots the training functions, the best fit ideal functions (read from `ideal_table` when given),
+        the test data and the matched results. Only the plotted columns are fetched.
+
+        Parameters:
+            max_points (int, optional): Point budget per line series. Longer training and ideal series are
+                decimated with downsampling.downsample before they reach Bokeh, so the HTML output stays bounded.
+            downsample_method (str): 'lttb' (keeps the shape of the line) or 'minmax' (keeps every bucket's extremes).
+        """
+        def line_points(x, y):
+            return downsample(x, y, max_points, downsample_method) if max_points else (x, y)
 
-    def visualize_data(self, train_table, test_table, result_table, best_fit_funcs):
         try:
-            train_data = pd.read_sql(f"SELECT * FROM {train_table}", self.engine)
-            test_data = pd.read_sql(f"SELECT * FROM {test_table}", self.engine)
-            result_data = pd.read_sql(f"SELECT * FROM {result_table}", self.engine)
+            train_data = read_projected_frame(self.engine, train_table, ['x', 'y1', 'y2', 'y3', 'y4'])
+            test_data = read_projected_frame(self.engine, test_table, ['x', 'y'])
+            result_data = read_projected_frame(self.engine, result_table, ['x', 'y'])
+            funcs = list(dict.fromkeys(best_fit_funcs.values()))
+            ideal_data = read_projected_frame(self.engine, ideal_table, ['x'] + funcs) if ideal_table else None
 
             output_file("data_visualization.html")
             p = figure(title="Data Visualization", x_axis_label='X', y_axis_label='Y')
 
             for i in range(1, 5):
-                p.line(train_data['x'], train_data[f'y{i}'], legend_label=f"Train y{i}", line_width=2)
+                p.line(*line_points(train_data['x'], train_data[f'y{i}']), legend_label=f"Train y{i}", line_width=2)
 
-            for func in best_fit_funcs.values():
-                p.line(train_data['x'], train_data[func], legend_label=f"Ideal {func}", line_width=2)
+            if ideal_data is not None:
+                for func in funcs:
+                    p.line(*line_points(ideal_data['x'], ideal_data[func]), legend_label=f"Ideal {func}", line_width=2)
 
             p.circle(test_data['x'], test_data['y'], legend_label="Test Data", size=10, color='red', alpha=0.5)
             p.square(result_data['x'], result_data['y'], legend_label="Result Data", size=10, color='green', alpha=0.5)
@@ -160,6 +324,8 @@ def main():
     """
     The main function to execute the database operations and visualize data.
     """
+    # Set PIPELINE_TRACE=trace.json to record a JSON trace of the run (see instrumentation.py)
+    trace_path = instrumentation.enable_from_environment()
     try:
         host = "localhost"
         user = "root"
@@ -177,7 +343,7 @@ def main():
             "CREATE TABLE edrissa_jallow_database.train (id INT AUTO_INCREMENT PRIMARY KEY, x FLOAT, y1 FLOAT, y2 FLOAT, y3 FLOAT, y4 FLOAT)",
             "CREATE TABLE edrissa_jallow_database.test (id INT AUTO_INCREMENT PRIMARY KEY, x FLOAT, y FLOAT)",
             "CREATE TABLE edrissa_jallow_database.best_fit_func (id INT AUTO_INCREMENT PRIMARY KEY, x INT(255), y INT(255))",
-            "CREATE TABLE edrissa_jallow_database.mapping (id INT AUTO_INCREMENT PRIMARY KEY, x INT(255), y INT(255), ideal_function VARCHAR(255), deviation FLOAT)",
+            "CREATE TABLE edrissa_jallow_database.mapping (id INT AUTO_INCREMENT PRIMARY KEY, x FLOAT, y FLOAT, ideal_function VARCHAR(255), deviation FLOAT, UNIQUE KEY uq_mapping_xy (x, y))",
             "CREATE TABLE edrissa_jallow_database.ideal (id INT AUTO_INCREMENT PRIMARY KEY, x INT(255))",
             *[f"ALTER TABLE edrissa_jallow_database.ideal ADD COLUMN y{i+1} INT;" for i in range(0, 50)]
         ]
@@ -212,12 +378,17 @@ def main():
         ideal_data = pd.read_sql(f"SELECT * FROM {ideal_table_name}", processor.engine)
 
         best_fit_funcs = processor.find_best_fit_functions(train_data, ideal_data)
-        processor.process_test_data(csv_file_path, ideal_table_name, result_table_name, best_fit_funcs)
+        processor.process_test_data(csv_file_path, ideal_table_name, result_table_name, best_fit_funcs, mode='replace')
         processor.disconnect()
 
         # Visualize data
         visualizer = DataVisualizer(host, user, password, database)
         visualizer.connect()
+    except (DatabaseConnectionError, CSVImportError, DataProcessingError) as e:
+        print(f"Error: {e}")
+    finally:
+        if trace_path:
+            instrumentation.export(trace_path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,184 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from ssd_engine import as_block, ssd_and_max_deviation
+from matching import assign_points
+from grid_index import XGridIndex
+
+
+class SharedBlock:
+    """
+    A 2-D float64 (or float32) array placed once in `multiprocessing.shared_memory`, so worker processes can
+    attach to it by name instead of receiving a pickled copy.
+
+    Attributes:
+        shape (tuple): Shape of the array.
+        dtype (np.dtype): float32 for float32 input, float64 otherwise.
+        array (np.ndarray): The array view over the shared memory in the owning process.
+
+    Methods:
+        descriptor(): Returns the (name, shape, dtype) triple workers use to attach.
+        close(): Releases and unlinks the shared memory.
+    """
+    def __init__(self, values):
+        values = as_block(values, keep_float32=True)
+        self.shape = values.shape
+        self.dtype = values.dtype
+        self._shm = SharedMemory(create=True, size=max(1, values.nbytes))
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+        self.array[...] = values
+
+    def descriptor(self):
+        return self._shm.name, self.shape, self.dtype.str
+
+    def close(self):
+        self.array = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _attach(descriptor):
+    """
+    Attaches to a SharedBlock from a worker process. The owning process is responsible for unlinking it.
+    """
+    name, shape, dtype = descriptor
+    # Workers share the owner's resource tracker (its fd is inherited), so attaching only re-registers the name
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _ssd_shard(train_descriptor, ideal_descriptor, start, stop):
+    """
+    Worker: fused SSD and max deviation of every pair over the rows [start, stop), a contiguous slice of both
+    C-ordered shared blocks, so the kernel reads the shared memory without copying it.
+    """
+    train_shm, train = _attach(train_descriptor)
+    ideal_shm, ideal = _attach(ideal_descriptor)
+    try:
+        return ssd_and_max_deviation(train[start:stop], ideal[start:stop])
+    finally:
+        del train, ideal
+        train_shm.close()
+        ideal_shm.close()
+
+
+def _assign_shard(grid_descriptor, values_descriptor, step, test_descriptor, thresholds, method, start, stop):
+    """
+    Worker: best match for the test rows [start, stop). The grid block holds the sorted X values of the parent's
+    XGridIndex and the values block the chosen functions in the same order; column 0 of the test block is X and
+    column 1 is Y.
+    """
+    grid_shm, grid = _attach(grid_descriptor)
+    values_shm, values = _attach(values_descriptor)
+    test_shm, test = _attach(test_descriptor)
+    try:
+        candidates = XGridIndex.from_sorted(grid[:, 0], step).lookup(values, test[start:stop, 0], method)
+        return assign_points(test[start:stop, 1], candidates, thresholds)
+    finally:
+        del grid, values, test
+        grid_shm.close()
+        values_shm.close()
+        test_shm.close()
+
+
+def _shards(size, workers, per_worker=4):
+    """
+    Splits range(size) into contiguous, ordered (start, stop) shards, a few per worker for load balancing.
+    """
+    count = max(1, min(size, workers * per_worker))
+    bounds = np.linspace(0, size, count + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def default_workers():
+    """
+    Returns the default worker count: the number of CPUs available to this process.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parallel_ssd_and_max_deviation(train, ideal, workers=None):
+    """
+    Process-pool version of `ssd_engine.ssd_and_max_deviation`, sharded over contiguous ranges of rows.
+
+    The training and ideal matrices are placed once in shared memory (a float32 ideal block stays float32). Every
+    worker scans a contiguous row slice of both blocks, so nothing is copied per worker, and returns the SSD and
+    maximum deviation of every pair over its rows. The per-shard SSDs are summed in shard order and the maxima
+    combined, so the maximum deviations equal the single-process kernel's and the SSDs match it up to the
+    rounding of the partial sums (a few ULPs). On platforms that spawn worker processes (Windows, macOS) the
+    calling script must guard its entry point with `if __name__ == '__main__':`.
+
+    Parameters:
+        train (array-like): Training values with shape (rows, n_train).
+        ideal (array-like): Ideal values with shape (rows, n_ideal), aligned with `train`.
+        workers (int, optional): Number of worker processes (defaults to the available CPUs).
+
+    Returns:
+        tuple: (ssd, max_deviation), both with shape (n_train, n_ideal).
+    """
+    workers = workers or default_workers()
+    with SharedBlock(train) as train_block, SharedBlock(ideal) as ideal_block:
+        if train_block.shape[0] != ideal_block.shape[0]:
+            raise ValueError(f"Training data has {train_block.shape[0]} rows but ideal data has "
+                             f"{ideal_block.shape[0]}; both must share the same X grid.")
+        shards = _shards(ideal_block.shape[0], workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_ssd_shard,
+                                  [train_block.descriptor()] * len(shards),
+                                  [ideal_block.descriptor()] * len(shards),
+                                  *zip(*shards)))
+    if not parts:
+        shape = (train_block.shape[1], ideal_block.shape[1])
+        return np.zeros(shape), np.zeros(shape)
+    return np.add.reduce([ssd for ssd, _ in parts]), np.maximum.reduce([max_dev for _, max_dev in parts])
+
+
+def parallel_assign_points(ideal_x, ideal_values, test_x, test_y, thresholds=None, method='exact', workers=None):
+    """
+    Process-pool version of the batched test assignment (`XGridIndex.lookup` + `matching.assign_points`),
+    sharded over the test points. The XGridIndex is built once in this process; its sorted X values, the chosen
+    functions in the same order and the test data are placed once in shared memory, and the shard results are
+    concatenated in test order.
+
+    Parameters:
+        ideal_x (array-like): X column of the ideal data, shape (rows,).
+        ideal_values (array-like): Chosen ideal functions, shape (rows, n_funcs).
+        test_x (array-like): Test X values, shape (n_points,).
+        test_y (array-like): Test Y values, shape (n_points,).
+        thresholds (array-like, optional): Maximum allowed deviation per function.
+        method (str): 'exact', 'nearest' or 'linear' X resolution.
+        workers (int, optional): Number of worker processes (defaults to the available CPUs).
+
+    Returns:
+        tuple: (best, deviation) as returned by `matching.assign_points`.
+    """
+    workers = workers or default_workers()
+    # The grid index is built once here; workers get its sorted X values and the values in the same row order
+    index = XGridIndex(ideal_x)
+    values = as_block(ideal_values, keep_float32=True)[index.order]
+    test = np.column_stack([np.asarray(test_x, dtype=np.float64), np.asarray(test_y, dtype=np.float64)])
+    thresholds = None if thresholds is None else np.asarray(thresholds, dtype=np.float64)
+    with SharedBlock(index.x) as grid_block, SharedBlock(values) as values_block, SharedBlock(test) as test_block:
+        shards = _shards(test_block.shape[0], workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_assign_shard,
+                                  [grid_block.descriptor()] * len(shards),
+                                  [values_block.descriptor()] * len(shards),
+                                  [index.step] * len(shards),
+                                  [test_block.descriptor()] * len(shards),
+                                  [thresholds] * len(shards),
+                                  [method] * len(shards),
+                                  *zip(*shards)))
+    if not parts:
+        return np.empty(0, dtype=np.intp), np.empty(0)
+    return np.concatenate([best for best, _ in parts]), np.concatenate([dev for _, dev in parts])
@@ -1,8 +1,15 @@
+import hashlib
+import json
+import os
 from bokeh.plotting import figure, show, output_file, save
-from bokeh.models import ColumnDataSource, HoverTool
-from bokeh.layouts import gridplot
+from bokeh.util.browser import view
+from bokeh.models import ColorBar, ColumnDataSource, HoverTool, LinearColorMapper
+from bokeh.palettes import Category10, Viridis256
 import numpy as np
+import pandas as pd
 from bokeh.layouts import column, row
+from instrumentation import instrumentation
+from density_raster import bin_index, binned_mean, category_counts, data_extent, hex_to_rgb, rgba_image
 
 class Plot:
         """
@@ -11,21 +18,32 @@ class Plot:
         Attributes:
             ssd_sums (dict): A dictionary containing the sums of squared differences (SSD) for each training function against ideal functions.
             test_results (DataFrame): A pandas DataFrame containing test results with columns for 'X (test func)', 'Y (test func)', 'Delta Y (test func)', and 'No. of ideal func'.
+            density_threshold (int): Number of test points above which the scatter plot is drawn as a density image.
+            density_bins (tuple): (width, height) in bins of the density image.
+            panel_stats (dict): Number of panels rebuilt and taken from the panel cache by the last dashboard call.
+            The fingerprints of the panels saved by `dashboard` are kept in a `<filename>.panels.json` file next to the output.
         
         Methods:
             ssd_plot(ssd_sums, title): Creates a bar plot for SSD values with the minimum SSD highlighted.
-            scatter_test_results(df_test_results): Generates a scatter plot for test results, showing ideal function number and Delta Y on hover.
-            dashboard(): Creates a comprehensive layout with SSD bar plots and a scatter plot of test results, then saves and displays it.
+            scatter_test_results(df_test_results, mode='auto', color_by='function'): Generates a scatter plot for test results, showing ideal function number and Delta Y on hover, or a density image for large results.
+            density_plot(df_test_results, color_by='function'): Draws the test results as a 2-D histogram image with per-bin counts on hover.
+            ssd_panels(): Returns the SSD bar plots of all training functions, rebuilding only those whose SSD sums changed.
+            scatter_panel(): Returns the scatter plot of the test results, rebuilt only when the results changed.
+            dashboard(show_plot=True, filename="dahboard.html"): Creates a comprehensive layout with SSD bar plots and a scatter plot of test results, then saves and (optionally) displays it.
             ssd_plot_only(): Displays only the SSD bar plots for each training function in a layout.
             scatter_plot_only(): Displays only the scatter plot of test results in a layout.
         """
     
-        def __init__(self, ssd_sums, test_results):
+        def __init__(self, ssd_sums, test_results, density_threshold=100000, density_bins=(400, 200)):
             """
             Initializes the Plot class with SSD sums and test results data.
             """
             self.ssd_sums = ssd_sums
             self.test_results = test_results
+            self.density_threshold = density_threshold
+            self.density_bins = density_bins
+            self.panel_stats = {'rebuilt': 0, 'cached': 0}
+            self._panels = {}  # Panel key -> (input digest, figure)
         
         def ssd_plot(self,ssd_sums, title):
             """
@@ -72,21 +90,33 @@ class Plot:
             return p
 
     
-        def scatter_test_results(self, df_test_results):
+        def scatter_test_results(self, df_test_results, mode='auto', color_by='function'):
 
             """
             Creates a scatter plot of test results, showing the relationship between 'X (test func)' and 'Y (test func)' and displaying the ideal function number and Delta Y on hover.
 
             Parameters:
                 df_test_results (DataFrame): A DataFrame containing test results.
+                mode (str): 'points' draws one glyph per test point; 'density' draws a 2-D histogram image (see `density_plot`);
+                    'auto' uses 'density' when there are more than `density_threshold` test points.
+                color_by (str): Coloring of the density image, 'function' or 'delta' (see `density_plot`).
 
             Returns:
                 Bokeh figure: A scatter plot visualizing the test results.
             """
+            if mode == 'auto':
+                mode = 'density' if len(df_test_results) > self.density_threshold else 'points'
+            if mode == 'density':
+                return self.density_plot(df_test_results, color_by)
+            if mode != 'points':
+                raise ValueError(f"Unknown scatter mode: {mode}")
 
-            # Generate a random color for each data point
+            # Generate a random color for each data point, drawing all hex digits as one array
             np.random.seed(42)  # For reproducibility
-            colors = ['#' + ''.join([np.random.choice(list('0123456789ABCDEF')) for j in range(6)]) for i in range(len(df_test_results))]
+            digits = np.empty((len(df_test_results), 7), dtype='<U1')
+            digits[:, 0] = '#'
+            digits[:, 1:] = np.array(list('0123456789ABCDEF'))[np.random.randint(0, 16, size=(len(df_test_results), 6))]
+            colors = digits.view('<U7').ravel().tolist()
 
             # Prepare the data
             source = ColumnDataSource(data={
@@ -119,93 +149,256 @@ class Plot:
             # Show the result
             # Return the plot object
             return p
+
+        def density_plot(self, df_test_results, color_by='function'):
+            """
+            Draws the test results as a 2-D histogram image of `density_bins` bins with `image_rgba`, so the size of the plot
+            does not depend on the number of test points. The points are binned with NumPy in one pass, and the opacity
+            of a bin grows with the logarithm of its count. Hovering a bin shows its count.
+
+            Parameters:
+                df_test_results (DataFrame): A DataFrame containing test results.
+                color_by (str): 'function' colors each bin by its most frequent ideal function (unmatched points in grey)
+                    and shows the count per function on hover; 'delta' colors each bin by its mean Delta Y.
+
+            Returns:
+                Bokeh figure: The density plot (a points plot when no test point has finite coordinates).
+            """
+            if color_by not in ('function', 'delta'):
+                raise ValueError(f"Unknown density coloring: {color_by}")
+            x = df_test_results['X (test func)'].to_numpy(dtype=np.float64)
+            y = df_test_results['Y (test func)'].to_numpy(dtype=np.float64)
+            valid = np.isfinite(x) & np.isfinite(y)
+            if not valid.any():
+                return self.scatter_test_results(df_test_results, mode='points')
+            x, y = x[valid], y[valid]
+
+            bins = tuple(self.density_bins)
+            extent = data_extent(x, y)
+            flat = bin_index(x, y, bins, extent)
+
+            # Unmatched points (no ideal function) form the last category
+            codes, names = pd.factorize(df_test_results['No. of ideal func'].to_numpy()[valid])
+            names = [str(name) for name in names] + ['No match']
+            codes = np.where(codes < 0, len(names) - 1, codes)
+            counts = category_counts(flat, codes, len(names), bins)
+            total = counts.sum(axis=0)
+            data = {'count': [total.astype(np.int32)]}
+            tooltips = [("Points in bin", "@count")]
+
+            if color_by == 'function':
+                palette = [Category10[10][i % 10] for i in range(len(names) - 1)] + ['#9E9E9E']
+                rgb = hex_to_rgb(palette)[counts.argmax(axis=0)]
+                for i, name in enumerate(names):
+                    data[f'count_{i}'] = [counts[i].astype(np.int32)]
+                    tooltips.append((name, f"@count_{i}"))
+            else:
+                delta = df_test_results['Delta Y (test func)'].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+                mean_delta = binned_mean(flat, delta, bins)
+                low, high = (np.nanmin(mean_delta), np.nanmax(mean_delta)) if np.isfinite(mean_delta).any() else (0.0, 1.0)
+                step = np.nan_to_num((mean_delta - low) / ((high - low) or 1.0) * 255)
+                rgb = hex_to_rgb(Viridis256)[step.astype(np.int64)]
+                rgb[np.isnan(mean_delta)] = hex_to_rgb(['#9E9E9E'])[0]
+                data['mean_delta'] = [mean_delta]
+                tooltips.append(("Mean Delta Y", "@mean_delta"))
+            data['image'] = [rgba_image(rgb, total)]
+
+            x_min, x_max, y_min, y_max = extent
+            p = figure(width=1400, height=600, title=f"Test Results Density ({int(valid.sum())} points)",
+                    x_axis_label='X (test func)', y_axis_label='Y (test func)',
+                    x_range=(x_min, x_max), y_range=(y_min, y_max),
+                    tools="pan,wheel_zoom,box_zoom,reset,save")
+            image = p.image_rgba(image='image', x=x_min, y=y_min, dw=x_max - x_min, dh=y_max - y_min,
+                                 source=ColumnDataSource(data=data))
+
+            if color_by == 'function':
+                # Empty renderers give the legend one entry per category
+                for name, color in zip(names, palette):
+                    p.scatter([], [], marker='square', color=color, legend_label=name)
+            else:
+                mapper = LinearColorMapper(palette=Viridis256, low=low, high=high)
+                p.add_layout(ColorBar(color_mapper=mapper, title='Mean Delta Y'), 'right')
+
+            p.add_tools(HoverTool(renderers=[image], tooltips=tooltips))
+            return p
     
-        def dashboard(self):
+        def _digest(self, *parts):
             """
-            Combines SSD bar plots for each training function and a scatter plot of test results into a single dashboard layout and saves/shows it as an HTML file.
+            Returns a hash of the input data of a panel: bytes are hashed as they are, other parts in their JSON form.
+            """
+            digest = hashlib.blake2b(digest_size=16)
+            for part in parts:
+                digest.update(part if isinstance(part, bytes) else json.dumps(part, default=str).encode('utf-8'))
+            return digest.hexdigest()
+
+        def _panel(self, key, digest, build):
+            """
+            Returns the cached figure of panel `key` when it was built from input data with the same `digest`, otherwise
+            builds it with `build()` and caches it, counting the panel in `panel_stats`.
+            """
+            cached = self._panels.get(key)
+            if cached is not None and cached[0] == digest:
+                self.panel_stats['cached'] += 1
+                return cached[1]
+            panel = build()
+            self._panels[key] = (digest, panel)
+            self.panel_stats['rebuilt'] += 1
+            return panel
+
+        @staticmethod
+        def _detach(panels):
+            """
+            Releases cached figures from the document of the layout they were last saved or shown in, since a Bokeh model
+            can only belong to one document.
+            """
+            for panel in panels:
+                if panel.document is not None:
+                    panel.document.clear()
+
+        def _ssd_inputs(self):
+            """
+            Returns (key, digest, build) of the SSD panel of every training function in `ssd_sums`, in order.
+            """
+            inputs = []
+            for train_func, sums in self.ssd_sums.items():
+                digest = self._digest(train_func, list(sums.keys()), np.asarray(list(sums.values()), dtype=np.float64).tobytes())
+
+                def build(train_func=train_func, sums=sums):
+                    lowest_ssd = min(sums, key=sums.get)
+                    return self.ssd_plot(sums, f'SSD for {train_func}-Log Sclae & The Function selected is {lowest_ssd} @Value {sums[lowest_ssd]}')
+                inputs.append((('ssd', train_func), digest, build))
+            return inputs
+
+        def _scatter_inputs(self):
+            """
+            Returns (key, digest, build) of the scatter panel of `test_results`.
             """
             df_test_results = self.test_results
-            ssd_sums= self.ssd_sums
-            
-            ssd_sums_y1 = ssd_sums['Y1 (training func)']
-            ssd_sums_y2 = ssd_sums['Y2 (training func)']
-            ssd_sums_y3 = ssd_sums['Y3 (training func)']
-            ssd_sums_y4 = ssd_sums['Y4 (training func)']
-
-            # Example usage: Print the ideal function with the lowest SSD for Y1 (training func)
-            lowest_ssd_y1 = min(ssd_sums_y1, key=ssd_sums_y1.get)
-            lowest_ssd_y2 = min(ssd_sums_y2, key=ssd_sums_y2.get)
-            lowest_ssd_y3 = min(ssd_sums_y3, key=ssd_sums_y3.get)
-            lowest_ssd_y4 = min(ssd_sums_y4, key=ssd_sums_y4.get)
-            # Create a plot for each set of SSD sums
-            p1 = self.ssd_plot(ssd_sums['Y1 (training func)'], f'SSD for Y1 (training func)-Log Sclae & The Function selected is {lowest_ssd_y1} @Value {ssd_sums_y1[lowest_ssd_y1]}')
-            p2 = self.ssd_plot(ssd_sums['Y2 (training func)'], f'SSD for Y2 (training func)-Log Sclae & The Function selected is {lowest_ssd_y2} @Value {ssd_sums_y2[lowest_ssd_y2]}')
-            p3 = self.ssd_plot(ssd_sums['Y3 (training func)'], f'SSD for Y3 (training func)-Log Sclae & The Function selected is {lowest_ssd_y3} @Value {ssd_sums_y3[lowest_ssd_y3]}')
-            p4 = self.ssd_plot(ssd_sums['Y4 (training func)'], f'SSD for Y4 (training func)-Log Sclae & The Function selected is {lowest_ssd_y4} @Value {ssd_sums_y4[lowest_ssd_y4]}')
-            p5 = self.scatter_test_results(df_test_results)
-
-           # Combine p1 and p2 in one row, and p3 and p4 in another row
-            top_row = row(p1, p2)
-            middle_row = row(p3, p4)
+            digest = self._digest(list(df_test_results.columns),
+                                  pd.util.hash_pandas_object(df_test_results, index=False).to_numpy().tobytes(),
+                                  [self.density_threshold, list(self.density_bins)])
+            return ('scatter',), digest, lambda: self.scatter_test_results(df_test_results)
 
-            # Stack the two rows and the scatter plot vertically
-            layout = column(top_row, middle_row, p5)
-            
-            # Specify the output file path
-            output_file("dahboard.html")
+        def _forget_missing_ssd_panels(self):
+            """
+            Drops the cached panels of training functions that are no longer in `ssd_sums`.
+            """
+            for key in [key for key in self._panels if key[0] == 'ssd' and key[1] not in self.ssd_sums]:
+                del self._panels[key]
 
-            # Save the layout
-            save(layout)
+        def ssd_panels(self):
+            """
+            Returns the SSD bar plot of every training function in `ssd_sums`, in order, reusing the cached plot of each
+            training function whose SSD sums did not change.
+            """
+            panels = [self._panel(*inputs) for inputs in self._ssd_inputs()]
+            self._forget_missing_ssd_panels()
+            return panels
+
+        def scatter_panel(self):
+            """
+            Returns the scatter plot of `test_results`, reusing the cached plot while the results and the density settings
+            are unchanged.
+            """
+            return self._panel(*self._scatter_inputs())
+
+        @staticmethod
+        def fingerprint_file(filename):
+            """
+            Returns the path of the JSON file holding the panel fingerprints of the dashboard saved as `filename`.
+            """
+            return f"{filename}.panels.json"
+
+        @staticmethod
+        def _read_fingerprints(path):
+            """
+            Returns the panel fingerprints stored in `path`, or None when the file is missing or unreadable.
+            """
+            try:
+                with open(path) as fingerprint_file:
+                    return json.load(fingerprint_file)
+            except (OSError, ValueError):
+                return None
+
+        @staticmethod
+        def _grid(panels):
+            """
+            Arranges the SSD panels two per row.
+            """
+            return [row(*panels[i:i + 2]) for i in range(0, len(panels), 2)]
+
+        @instrumentation.traced('plot_render')
+        def dashboard(self, show_plot=True, filename="dahboard.html"):
+            """
+            Combines SSD bar plots for each training function and a scatter plot of test results into a single dashboard layout and saves/shows it as an HTML file.
+            With `show_plot=False` the file is only saved, e.g. for benchmarks or headless runs.
+
+            Panels are cached under a hash of their input data, so a repeated call only rebuilds the panels whose `ssd_sums` entry
+            or test results changed. The hashes of the saved panels are written to `fingerprint_file(filename)`; when they match
+            the current inputs and the file still exists, nothing is rebuilt or written, also in a new process. The figures
+            themselves are only cached in memory: when some panel changed, a new process rebuilds every panel.
+
+            Returns:
+                dict: The number of panels 'rebuilt' and taken from the cache ('cached'), and whether the file was 'saved'.
+            """
+            self.panel_stats = {'rebuilt': 0, 'cached': 0}
+            inputs = self._ssd_inputs() + [self._scatter_inputs()]
+            fingerprints = [[list(key), digest] for key, digest, _ in inputs]
+
+            saved = not (os.path.exists(filename) and self._read_fingerprints(self.fingerprint_file(filename)) == fingerprints)
+            if saved:
+                panels = [self._panel(*panel_inputs) for panel_inputs in inputs]
+                self._forget_missing_ssd_panels()
+                ssd_panels, scatter = panels[:-1], panels[-1]
+                self._detach(panels)
+
+                # Stack the rows of SSD plots and the scatter plot vertically
+                layout = column(*self._grid(ssd_panels), scatter)
+
+                # Specify the output file path
+                output_file(filename)
+
+                # Save the layout and the fingerprints of its panels
+                save(layout)
+                with open(self.fingerprint_file(filename), 'w') as fingerprint_file:
+                    json.dump(fingerprints, fingerprint_file)
+
+                # Show the layout
+                if show_plot:
+                    show(layout)
+            else:
+                self.panel_stats['cached'] = len(inputs)
+                if show_plot:
+                    view(filename)
+
+            print(f"Dashboard panels: {self.panel_stats['rebuilt']} rebuilt, {self.panel_stats['cached']} from cache"
+                  + ("" if saved else f", {filename} unchanged"))
+            return dict(self.panel_stats, saved=saved)
 
-            # Show the layout
-            show(layout)
-        
         def ssd_plot_only(self):
             """
             Creates and shows a layout consisting only of SSD bar plots for each training function.
             """
-            ssd_sums= self.ssd_sums
-            
-            ssd_sums_y1 = ssd_sums['Y1 (training func)']
-            ssd_sums_y2 = ssd_sums['Y2 (training func)']
-            ssd_sums_y3 = ssd_sums['Y3 (training func)']
-            ssd_sums_y4 = ssd_sums['Y4 (training func)']
-
-            # Example usage: Print the ideal function with the lowest SSD for Y1 (training func)
-            lowest_ssd_y1 = min(ssd_sums_y1, key=ssd_sums_y1.get)
-            lowest_ssd_y2 = min(ssd_sums_y2, key=ssd_sums_y2.get)
-            lowest_ssd_y3 = min(ssd_sums_y3, key=ssd_sums_y3.get)
-            lowest_ssd_y4 = min(ssd_sums_y4, key=ssd_sums_y4.get)
-            # Create a plot for each set of SSD sums
-            p1 = self.ssd_plot(ssd_sums['Y1 (training func)'], f'SSD for Y1 (training func)-Log Sclae & The Function selected is {lowest_ssd_y1} @Value {ssd_sums_y1[lowest_ssd_y1]}')
-            p2 = self.ssd_plot(ssd_sums['Y2 (training func)'], f'SSD for Y1 (training func)-Log Sclae & The Function selected is {lowest_ssd_y2} @Value {ssd_sums_y2[lowest_ssd_y2]}')
-            p3 = self.ssd_plot(ssd_sums['Y3 (training func)'], f'SSD for Y1 (training func)-Log Sclae & The Function selected is {lowest_ssd_y3} @Value {ssd_sums_y2[lowest_ssd_y3]}')
-            p4 = self.ssd_plot(ssd_sums['Y4 (training func)'], f'SSD for Y1 (training func)-Log Sclae & The Function selected is {lowest_ssd_y4} @Value {ssd_sums_y2[lowest_ssd_y4]}')
-            
+            self.panel_stats = {'rebuilt': 0, 'cached': 0}
+            ssd_panels = self.ssd_panels()
+            self._detach(ssd_panels)
 
-           # Combine p1 and p2 in one row, and p3 and p4 in another row
-            top_row = row(p1, p2)
-            middle_row = row(p3, p4)
-
-            # Stack the two rows and the scatter plot vertically
-            layout = column(top_row, middle_row)
+            # Combine the SSD plots two per row
+            layout = column(*self._grid(ssd_panels))
 
             # Show the layout
             show(layout)
-            
+
         def scatter_plot_only(self):
             """
             Creates and shows a layout consisting only of the scatter plot of test results.
             """
-            df_test_results = self.test_results
-            
-            
-            p5 = self.scatter_test_results(df_test_results)
+            self.panel_stats = {'rebuilt': 0, 'cached': 0}
+            p5 = self.scatter_panel()
+            self._detach([p5])
 
             # Stack the two rows and the scatter plot vertically
             layout = column(p5)
 
             # Show the layout
             show(layout)
-    
-    
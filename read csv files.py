@@ -1,5 +1,9 @@
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+from sqlalchemy.types import Float
+from storage_backend import MSSQLBackend
+from instrumentation import instrumentation
 class ReadCsv:
     """
     A class that reads the CSV files and loading the input data to their contents into database server that creates tables(rows and columns) 
@@ -18,18 +22,22 @@ class ReadCsv:
         file_names (list of str): Names of CSV files to be processed.
         tabels (dict): Dictionary mapping table names to their schema (column names and data types).
         file_to_table_map (dict): Dictionary mapping file names to corresponding SQL table names.
+        backend (StorageBackend): The storage the tables are written to; SQL Server through pyodbc by default,
+            or e.g. storage_backend.SQLiteBackend('pipeline.db') to run the pipeline locally with no network hops.
         engine (SQLAlchemy engine, optional): SQLAlchemy engine instance for database connections.
 
     Methods:
         alchemy_connection():
-            Connects the database using SQLAlchemy.
+            Connects the database using SQLAlchemy, through the backend and the shared engine registry in connection_pool.
 
-        read_csv_to_sql():
+        read_csv_to_sql(concurrent=False, max_workers=None, chunksize=100000, keep_frames=None):
             Reads CSV files, maps their columns to SQL table columns as per `tabels` attribute,
             and inserts the data into the corresponding tables. It dynamically adjusts to the number
-            of columns in each CSV file and the schema of the target SQL table.
+            of columns in each CSV file and the schema of the target SQL table. Files are streamed in chunks
+            with float columns and multi-row inserts, optionally all at the same time on a thread pool, and
+            the loaded DataFrames are returned.
     """
-    def __init__(self, server, database_name, username, password, driver, port, dataset_path,file_names, tabels,file_to_table_map):
+    def __init__(self, server, database_name, username, password, driver, port, dataset_path,file_names, tabels,file_to_table_map, backend=None):
         self.server = server
         self.database_name = database_name
         self.username = username
@@ -40,16 +48,30 @@ class ReadCsv:
         self.dataset_path = dataset_path.replace('\\','/')  #convert the path to unicode to avoid error
         self.file_names = file_names
         self.file_to_table_map = file_to_table_map
+        self.backend = backend or MSSQLBackend(server, database_name, username, password, driver)
         self.engine = None  # Placeholder for the engine
 
 
     def alchemy_connection(self):
-        ### Insert the data into SQL Server
-        # Your connection string to insert data line by line using sqlalchemy
-        connection_string_alchemy = f'mssql+pyodbc://{self.username}:{self.password}@{self.server}/{self.database_name}?driver={self.driver.replace(" ", "+")}&TrustServerCertificate=yes'
-        self.engine = create_engine(connection_string_alchemy)
+        ### Insert the data into SQL Server (or the configured backend)
+        # Reuse the shared pooled engine for this server instead of creating a new one on every call
+        self.engine = self.backend.engine()
 
-    def read_csv_to_sql(self):
+    def read_csv_to_sql(self, concurrent=False, max_workers=None, chunksize=100000, keep_frames=None):
+        """
+        Loads every CSV file into its SQL table and returns the loaded DataFrames keyed by file name without '.csv'.
+
+        Parameters:
+            concurrent (bool): Load the files at the same time on a thread pool; each thread uses its own
+                pooled connection.
+            max_workers (int, optional): Threads used when `concurrent` (defaults to one per file).
+            chunksize (int): Rows read from a CSV and written to SQL at a time.
+            keep_frames (list of str, optional): Keys of the DataFrames to keep and return (default: all),
+                so large files such as the ideal data can be loaded without being held in memory.
+
+        Returns:
+            dict: The loaded DataFrames, e.g. {'train': df_train, 'test': df_test, 'ideal': df_ideal}.
+        """
         self.alchemy_connection()
         if self.engine is None:
             print("Engine has not been initialized. Call alchemy_connection first.")
@@ -68,40 +90,50 @@ class ReadCsv:
                 table_columns = [col[0] for col in columns_info]
                 column_names[file_name] = table_columns
 
+        def load(file_name):
+            # Removing '.csv' from file_name to use as dictionary key
+            name_key = file_name.replace('.csv', '')
+            keep = keep_frames is None or name_key in keep_frames
+            return name_key, self._load_csv(file_name, column_names[file_name], chunksize, keep)
+
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=max_workers or len(self.file_names) or 1) as pool:
+                loaded = list(pool.map(load, self.file_names))
+        else:
+            loaded = [load(file_name) for file_name in self.file_names]
 
         # Dictionary to store each DataFrame, using a modified file name as the key
-        dataframes = {}
+        dataframes = {name_key: df for name_key, df in loaded if df is not None}
+        return dataframes
 
-        for file_name in self.file_names:
-            # Path to the current CSV file
-            csv_path = f'{self.dataset_path}/{file_name}'
-            
-            # Read the first row to determine the number of columns in the CSV
-            with open(csv_path, 'r') as csvfile:
-                first_line = csvfile.readline()
-                num_columns_in_csv = len(first_line.split(','))
-            
-            # Determine the column names to use based on the number of columns in the CSV
-            if num_columns_in_csv <= len(column_names[file_name]):
-                cols_to_use = column_names[file_name][:num_columns_in_csv]
-            else:
-                # If the CSV has more columns than expected, you could handle this case as needed.
-                # For simplicity, this example will still use the defined columns up to the length of `column_names[file_name]`
-                cols_to_use = column_names[file_name]
-            
-            # Now, read the CSV with the dynamically determined columns
-            df = pd.read_csv(csv_path, names=cols_to_use, header=0)
-            table_name = self.file_to_table_map[file_name]
-            # Save the DataFrame to the SQL table
-            df.to_sql(name=table_name, con=self.engine, if_exists='replace', index=False)
-            print(f'Data Copied to {table_name} in SQL')
-            
-            # Removing '.csv' from file_name to use as dictionary key
-            name_key = file_name.replace('.csv', '')
-            
-            # Storing the DataFrame in the dictionary
-            dataframes[name_key] = df
-           
-        
+    def _load_csv(self, file_name, table_columns, chunksize, keep):
+        """
+        Streams one CSV file into its SQL table chunk by chunk and returns the DataFrame when `keep` is set.
+        """
+        # Path to the current CSV file
+        csv_path = f'{self.dataset_path}/{file_name}'
+        table_name = self.file_to_table_map[file_name]
+        chunks = []
+        if_exists = 'replace'
+
+        with pd.read_csv(csv_path, header=0, chunksize=chunksize, dtype=np.float64) as reader:
+            for chunk in instrumentation.chunks('csv_read', reader, 'read', file=file_name):
+                # Determine the column names to use based on the number of columns in the CSV header; if the
+                # CSV has more columns than the table, only the first len(table_columns) columns are used
+                num_columns = min(chunk.shape[1], len(table_columns))
+                chunk = chunk.iloc[:, :num_columns]
+                chunk.columns = table_columns[:num_columns]
 
+                # Bulk write through the backend (multi-row inserts within SQL Server's 2100 parameters per statement)
+                with instrumentation.span('sql_write', table=table_name, rows=len(chunk)):
+                    self.backend.write_frame(chunk, table_name, if_exists=if_exists,
+                                             dtype={col: Float() for col in chunk.columns})
+                instrumentation.count('rows_written', len(chunk))
+                if_exists = 'append'
+                if keep:
+                    chunks.append(chunk)
 
+        print(f'Data Copied to {table_name} in SQL')
+        if not keep:
+            return None
+        return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=table_columns, dtype=np.float64)
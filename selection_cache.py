@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+from dataset import ArrayDataset
+
+
+class SelectionCache:
+    """
+    An on-disk memo of the selection outputs of Calculations (`ssd_sums`, `top_four_ideal_functions` and
+    `adjusted_deviations`), keyed by a fingerprint of the training and ideal data and of the settings that
+    change the outputs, so a run that only brings a new test file skips the SSD scan entirely.
+
+    Each entry is one JSON file. Reading an entry refreshes its modification time, and the least recently used
+    entries are evicted once there are more than `max_entries` of them or they take more than `max_bytes`.
+
+    Attributes:
+        cache_dir (str): Directory holding the entries.
+        max_entries (int): Maximum number of entries kept.
+        max_bytes (int, optional): Maximum total size of the entries in bytes.
+        hits (int): Lookups answered from the cache by this object.
+        misses (int): Lookups that found no entry.
+
+    Methods:
+        fingerprint(frames, settings=None): Returns the key of a set of ArrayDatasets / DataFrames / arrays and settings.
+        get(key): Returns the stored outputs, or None.
+        put(key, outputs): Stores the outputs and evicts old entries.
+        stats(): Returns the hit / miss counters and the current size of the cache.
+        clear(): Deletes every entry.
+    """
+    def __init__(self, cache_dir='selection_cache', max_entries=32, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(frames, settings=None):
+        """
+        Returns a hex digest over `frames` and the JSON form of `settings`. ArrayDatasets and arrays are hashed
+        through a memoryview of their buffers, together with their column names, dtype and shape, so even a
+        memory-mapped dataset is read in place without a copy. DataFrames are hashed through their float64 values.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        for frame in frames:
+            if isinstance(frame, ArrayDataset):
+                parts = [([frame.x_name], frame.x), (list(frame.columns), frame.values)]
+            elif hasattr(frame, 'columns'):
+                parts = [(list(frame.columns), frame.to_numpy(dtype=np.float64))]
+            else:
+                parts = [([None], np.asarray(frame))]
+            for columns, values in parts:
+                digest.update(json.dumps([columns, values.dtype.str, list(values.shape)]).encode('utf-8'))
+                digest.update(memoryview(values if values.flags.c_contiguous else np.ascontiguousarray(values)))
+        digest.update(json.dumps(settings or {}, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the outputs stored under `key` (a dictionary), or None, counting a hit or a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as entry:
+                outputs = json.load(entry)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return outputs
+
+    def put(self, key, outputs):
+        """
+        Stores `outputs` (a JSON-serializable dictionary) under `key`, then evicts least recently used entries.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(staging, 'w') as entry:
+            json.dump(outputs, entry)
+        os.replace(staging, path)
+        self._evict()
+
+    def _entries(self):
+        """
+        Returns (mtime, size, path) of every entry, least recently used first.
+        """
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or (self.max_bytes is not None and total > self.max_bytes)):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        """
+        Returns a dictionary with the 'hits' and 'misses' of this object and the number of 'entries' and
+        total 'bytes' on disk.
+        """
+        entries = self._entries()
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+    def clear(self):
+        """
+        Deletes every entry.
+        """
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,161 @@
+import numpy as np
+from ssd_engine import as_block, ssd_matrix
+
+
+class IdealSketchIndex:
+    """
+    An approximate candidate index over the ideal functions, used to shortlist ideal functions before
+    computing exact SSDs on the shortlist only.
+
+    Every ideal curve (one value per X row) is reduced to a low-dimensional sketch, either with a Gaussian
+    random projection (distances between sketches approximate the SSD, Johnson-Lindenstrauss) or with a
+    truncated PCA of the ideal library (distances are the SSD restricted to the principal subspace).
+    Querying a training curve ranks all ideal functions by sketch distance, which costs O(n_ideal * dims)
+    instead of O(n_ideal * rows).
+
+    Attributes:
+        method (str): 'random_projection' or 'pca'.
+        projection (np.ndarray): Projection matrix with shape (rows, dims).
+        mean (np.ndarray): Curve subtracted before projecting, shape (rows,) (zeros for random projections).
+        sketches (np.ndarray): Sketch of every ideal function, shape (n_ideal, dims).
+        ideal_columns (list of str): Names of the ideal functions, in sketch order.
+        x (np.ndarray): The X grid the index was built on.
+
+    Methods:
+        from_frame(df_ideal, dims=32, method='random_projection', seed=42): Builds the index from an ideal DataFrame.
+        shortlist(train, candidates=32, x=None): Returns the positions of the `candidates` closest ideal functions per training function.
+        recall(train, ideal, candidates=32, k=1): Fraction of the exhaustive top-k that the shortlist contains.
+        save(path): Persists the index to a .npz file.
+        load(path): Loads an index saved with `save`.
+    """
+    METHODS = ('random_projection', 'pca')
+
+    def __init__(self, method, projection, mean, sketches, ideal_columns, x):
+        self.method = method
+        self.projection = projection
+        self.mean = mean
+        self.sketches = sketches
+        self.ideal_columns = list(ideal_columns)
+        self.x = x
+
+    @classmethod
+    def from_frame(cls, df_ideal, dims=32, method='random_projection', seed=42):
+        """
+        Builds the index from an ideal DataFrame ('X' plus one column per ideal function).
+
+        Parameters:
+            df_ideal (pd.DataFrame): The ideal data, e.g. read from `ideal.csv` or `ideal_table`.
+            dims (int): Sketch dimension; larger sketches are more accurate but slower to query.
+            method (str): 'random_projection' or 'pca'.
+            seed (int): Seed of the random generator, so a rebuilt index is identical.
+
+        Returns:
+            IdealSketchIndex: The built index.
+        """
+        df_ideal = df_ideal.sort_values(by='X')
+        ideal_columns = [col for col in df_ideal.columns if col != 'X']
+        return cls.build(df_ideal['X'].to_numpy(dtype=np.float64), as_block(df_ideal[ideal_columns]),
+                         ideal_columns, dims, method, seed)
+
+    @classmethod
+    def build(cls, x, ideal, ideal_columns, dims=32, method='random_projection', seed=42):
+        """
+        Builds the index from an ideal block with shape (rows, n_ideal) on the X grid `x`.
+        """
+        if method not in cls.METHODS:
+            raise ValueError(f"Unknown sketch method: {method}. Use one of {cls.METHODS}.")
+        ideal = as_block(ideal)
+        n_rows, n_ideal = ideal.shape
+        dims = max(1, min(int(dims), n_rows))
+        rng = np.random.default_rng(seed)
+
+        if method == 'random_projection':
+            mean = np.zeros(n_rows)
+            projection = rng.standard_normal((n_rows, dims)) / np.sqrt(dims)
+        else:
+            # Truncated PCA of the ideal curves via a randomized SVD (two power iterations)
+            mean = ideal.mean(axis=1)
+            centered = ideal - mean[:, None]
+            width = min(n_rows, dims + 8)
+            basis = centered @ rng.standard_normal((n_ideal, width))
+            for _ in range(2):
+                basis, _ = np.linalg.qr(basis)
+                basis = centered @ (centered.T @ basis)
+            basis, _ = np.linalg.qr(basis)
+            small_u, _, _ = np.linalg.svd(basis.T @ centered, full_matrices=False)
+            projection = np.ascontiguousarray(basis @ small_u[:, :dims])
+
+        # (ideal - mean)^T P without materialising the centered copy
+        sketches = np.ascontiguousarray(ideal.T @ projection - mean @ projection)
+        return cls(method, projection, mean, sketches, ideal_columns, np.asarray(x, dtype=np.float64))
+
+    def shortlist(self, train, candidates=32, x=None):
+        """
+        Returns the positions (into `ideal_columns`) of the `candidates` ideal functions whose sketches are
+        closest to each training function. `candidates` is the recall-versus-speed knob.
+
+        Parameters:
+            train (array-like): Training values with shape (rows, n_train) on the index X grid.
+            candidates (int): Shortlist length per training function.
+            x (array-like, optional): The X grid of `train`; a ValueError is raised if it is not the grid the
+                index was built on, since sketches of curves sampled on another grid are not comparable.
+
+        Returns:
+            np.ndarray: Shortlisted positions with shape (n_train, candidates), closest first.
+        """
+        if x is not None:
+            x = np.asarray(x, dtype=np.float64)
+            if x.shape != self.x.shape or not np.array_equal(x, self.x):
+                raise ValueError("The training X grid differs from the X grid the sketch index was built on.")
+        train = as_block(train)
+        if train.shape[0] != self.projection.shape[0]:
+            raise ValueError(f"Training data has {train.shape[0]} rows but the index was built on "
+                             f"{self.projection.shape[0]}.")
+        candidates = max(1, min(int(candidates), len(self.ideal_columns)))
+        queries = train.T @ self.projection - self.mean @ self.projection
+        distances = (np.einsum('ij,ij->i', self.sketches, self.sketches)[None, :]
+                     - 2.0 * queries @ self.sketches.T
+                     + np.einsum('ij,ij->i', queries, queries)[:, None])
+        if candidates < distances.shape[1]:
+            shortlist = np.argpartition(distances, candidates - 1, axis=1)[:, :candidates]
+        else:
+            shortlist = np.tile(np.arange(distances.shape[1]), (distances.shape[0], 1))
+        order = np.argsort(np.take_along_axis(distances, shortlist, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(shortlist, order, axis=1)
+
+    def recall(self, train, ideal, candidates=32, k=1):
+        """
+        Checks the index against the exhaustive search: the fraction of the exact top-k ideal functions
+        (over all training functions) that appear in the shortlist of length `candidates`.
+
+        Parameters:
+            train (array-like): Training values with shape (rows, n_train).
+            ideal (array-like): The ideal block the index was built from, shape (rows, n_ideal).
+            candidates (int): Shortlist length per training function.
+            k (int): How many exact winners per training function must be recalled.
+
+        Returns:
+            float: Recall between 0 and 1.
+        """
+        ssd = ssd_matrix(train, ideal)
+        k = max(1, min(int(k), ssd.shape[1]))
+        exact = np.argsort(ssd, axis=1, kind='stable')[:, :k]
+        shortlist = self.shortlist(train, candidates)
+        hits = sum(np.isin(row_exact, row_short).sum() for row_exact, row_short in zip(exact, shortlist))
+        return hits / exact.size
+
+    def save(self, path):
+        """
+        Persists the index to a .npz file so it can be reloaded without rebuilding.
+        """
+        np.savez(path, method=np.array(self.method), projection=self.projection, mean=self.mean,
+                 sketches=self.sketches, ideal_columns=np.array(self.ideal_columns), x=self.x)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads an index saved with `save`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data['method']), data['projection'], data['mean'], data['sketches'],
+                       data['ideal_columns'].tolist(), data['x'])
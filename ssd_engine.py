@@ -0,0 +1,293 @@
+import numpy as np
+
+# Upper bound (in bytes) for the scratch buffer used while differencing a block of ideal columns
+DEFAULT_BLOCK_BYTES = 32 * 1024 * 1024
+
+
+def as_block(values, keep_float32=False):
+    """
+    Converts a 2-D array-like (rows = X values, columns = functions) into a C-contiguous float64 block.
+
+    Parameters:
+        values (array-like or DataFrame): The data to convert.
+        keep_float32 (bool): Leave float32 data as float32, so a C-contiguous float32 block (e.g. a memory map)
+            is returned without a copy. The kernels that accept it upcast one tile of columns at a time.
+
+    Returns:
+        np.ndarray: A contiguous 2-D float64 (or float32) array.
+    """
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy(dtype=np.float64)
+    dtype = np.float64
+    if keep_float32 and np.asarray(values).dtype == np.float32:
+        dtype = np.float32
+    block = np.ascontiguousarray(values, dtype=dtype)
+    if block.ndim == 1:
+        block = block.reshape(-1, 1)
+    return block
+
+
+def block_columns(n_rows, block_bytes=DEFAULT_BLOCK_BYTES, itemsize=8):
+    """
+    Returns how many ideal columns fit into one scratch buffer of `block_bytes` for `n_rows` rows.
+    """
+    return max(1, int(block_bytes // max(1, n_rows * itemsize)))
+
+
+def ssd_matrix(train, ideal, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Computes the sum of squared differences (SSD) between every training function and every ideal function.
+
+    The ideal columns are processed in blocks so that the scratch memory stays bounded by `block_bytes`
+    regardless of how many ideal functions there are. A float32 `ideal` block is not converted as a whole:
+    each block of columns is upcast to float64 into a reused tile buffer just before it is differenced.
+
+    Parameters:
+        train (array-like): Training values with shape (rows, n_train), rows aligned on the same X grid as `ideal`.
+        ideal (array-like): Ideal values with shape (rows, n_ideal).
+        block_bytes (int): Size limit for the scratch buffer.
+
+    Returns:
+        np.ndarray: SSD matrix with shape (n_train, n_ideal).
+    """
+    ssd, _ = _scan(train, ideal, block_bytes, max_deviation=False)
+    return ssd
+
+
+def ssd_and_max_deviation(train, ideal, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Fused single pass that computes the SSD and the maximum absolute deviation for every
+    (training, ideal) pair while each block of ideal data is read only once. Like `ssd_matrix`, it accepts a
+    float32 `ideal` block and upcasts it one block of columns at a time.
+
+    Parameters:
+        train (array-like): Training values with shape (rows, n_train), rows aligned on the same X grid as `ideal`.
+        ideal (array-like): Ideal values with shape (rows, n_ideal).
+        block_bytes (int): Size limit for the scratch buffer, which is reused for every pair.
+
+    Returns:
+        tuple: (ssd, max_deviation), both with shape (n_train, n_ideal).
+    """
+    return _scan(train, ideal, block_bytes, max_deviation=True)
+
+
+def adjusted_deviations(max_deviation, ideal_columns, chosen_functions, factor=np.sqrt(2)):
+    """
+    Builds the `adjusted_deviations` dictionary from a (n_train, n_ideal) max deviation matrix: for every chosen
+    ideal function, the largest deviation against any training function multiplied by `factor`.
+    """
+    positions = {name: i for i, name in enumerate(ideal_columns)}
+    return {func: max_deviation[:, positions[func]].max() * factor for func in chosen_functions}
+
+
+def _scan(train, ideal, block_bytes, max_deviation):
+    """
+    Shared block loop behind `ssd_matrix` and `ssd_and_max_deviation`.
+    """
+    train = as_block(train)
+    ideal = as_block(ideal, keep_float32=True)
+    if train.shape[0] != ideal.shape[0]:
+        raise ValueError(f"Training data has {train.shape[0]} rows but ideal data has {ideal.shape[0]}; "
+                         "both must share the same X grid.")
+
+    n_rows, n_ideal = ideal.shape
+    n_train = train.shape[1]
+    ssd = np.empty((n_train, n_ideal), dtype=np.float64)
+    max_dev = np.empty((n_train, n_ideal), dtype=np.float64) if max_deviation else None
+    upcast = ideal.dtype != np.float64
+    # A float32 block needs a second buffer for the upcast tile, so both share the scratch budget
+    step = block_columns(n_rows, block_bytes // 2 if upcast else block_bytes)
+    buffer = np.empty((n_rows, min(step, n_ideal)), dtype=np.float64)
+    tile_buffer = np.empty_like(buffer) if upcast else None
+
+    for start in range(0, n_ideal, step):
+        stop = min(start + step, n_ideal)
+        scratch = buffer[:, :stop - start]
+        if upcast:
+            ideal_block = tile_buffer[:, :stop - start]
+            np.copyto(ideal_block, ideal[:, start:stop])
+        else:
+            ideal_block = ideal[:, start:stop]
+        for j in range(n_train):
+            # Difference, (abs and max,) square and reduce in place so no temporaries are created per pair
+            np.subtract(ideal_block, train[:, j:j + 1], out=scratch)
+            if max_deviation:
+                np.abs(scratch, out=scratch)
+                if n_rows:
+                    scratch.max(axis=0, out=max_dev[j, start:stop])
+                else:
+                    max_dev[j, start:stop] = 0.0
+            np.square(scratch, out=scratch)
+            scratch.sum(axis=0, out=ssd[j, start:stop])
+    return ssd, max_dev
+
+
+def top_k_search(train, ideal, k=1, block_rows=None, batch_columns=256):
+    """
+    Early-abandoning search for the k ideal functions with the lowest SSD for every training function.
+
+    The bound is seeded with the k candidates that look best on a strided sample of the rows. The other
+    candidates are then evaluated in batches of columns, accumulating their SSD one block of rows at a time.
+    Because partial SSDs can only grow, a candidate is abandoned as soon as its partial SSD exceeds the k-th
+    best complete SSD found so far. The survivors of each batch are merged into the running best-k with a
+    partial selection instead of a full sort. The winners are the same as the exhaustive search (ties go to the
+    lower column index, like a stable sort).
+
+    Parameters:
+        train (array-like): Training values with shape (rows, n_train).
+        ideal (array-like): Ideal values with shape (rows, n_ideal), aligned with `train`.
+        k (int): Number of best ideal functions to keep per training function.
+        block_rows (int, optional): Rows accumulated between pruning checks (defaults to about 1/16 of the rows).
+        batch_columns (int): Number of candidate columns evaluated together.
+
+    Returns:
+        tuple: (best, best_ssd, stats) where `best` and `best_ssd` have shape (n_train, k) ordered from best to
+            worst, and `stats` counts candidates, completed candidates, candidates pruned early and the
+            (row, candidate) values that were actually accumulated versus the exhaustive total.
+    """
+    train = as_block(train)
+    ideal = as_block(ideal, keep_float32=True)  # Every gathered block of rows is differenced in float64
+    if train.shape[0] != ideal.shape[0]:
+        raise ValueError(f"Training data has {train.shape[0]} rows but ideal data has {ideal.shape[0]}; "
+                         "both must share the same X grid.")
+    n_rows, n_ideal = ideal.shape
+    n_train = train.shape[1]
+    k = max(1, min(int(k), n_ideal))
+    block_rows = block_rows or max(1, -(-n_rows // 16))
+
+    best = np.empty((n_train, k), dtype=np.intp)
+    best_ssd = np.empty((n_train, k), dtype=np.float64)
+    stats = {'candidates': n_train * n_ideal, 'completed': 0, 'pruned': 0,
+             'values_accumulated': 0, 'values_total': n_train * n_ideal * n_rows}
+
+    def accumulate(target, active, bound):
+        # Accumulates the SSD of the `active` candidates block by block, abandoning those that exceed `bound`
+        partial = np.zeros(active.size, dtype=np.float64)
+        for row_start in range(0, n_rows, block_rows):
+            rows = slice(row_start, row_start + block_rows)
+            diff = ideal[rows, active] - target[rows]
+            partial += np.einsum('ij,ij->j', diff, diff)
+            stats['values_accumulated'] += diff.size
+            alive = partial <= bound
+            if not alive.all():
+                stats['pruned'] += int(active.size - alive.sum())
+                active, partial = active[alive], partial[alive]
+                if active.size == 0:
+                    break
+        stats['completed'] += int(active.size)
+        return active, partial
+
+    stride = max(1, n_rows // 16)
+    for j in range(n_train):
+        target = train[:, j:j + 1]
+
+        # Seed the bound with the k candidates that look best on a strided sample of the rows,
+        # so pruning is effective from the first batch on
+        sample = ideal[::stride] - target[::stride]
+        estimate = np.einsum('ij,ij->j', sample, sample)
+        stats['values_accumulated'] += sample.size
+        seeds = np.sort(np.argpartition(estimate, k - 1)[:k])
+        kept_index, kept_ssd = accumulate(target, seeds, np.inf)
+        bound = kept_ssd.max()
+        remaining = np.setdiff1d(np.arange(n_ideal), seeds, assume_unique=True)
+
+        for start in range(0, remaining.size, batch_columns):
+            active, partial = accumulate(target, remaining[start:start + batch_columns], bound)
+            kept_index = np.concatenate([kept_index, active])
+            kept_ssd = np.concatenate([kept_ssd, partial])
+            if kept_ssd.size > k:
+                # Partial selection of the best k, then a lexicographic tie-break on the column index
+                cut = np.argpartition(kept_ssd, k - 1)[:k]
+                threshold = kept_ssd[cut].max()
+                tied = np.flatnonzero(kept_ssd <= threshold)
+                order = np.lexsort((kept_index[tied], kept_ssd[tied]))[:k]
+                kept_index, kept_ssd = kept_index[tied][order], kept_ssd[tied][order]
+            bound = kept_ssd.max()
+
+        order = np.lexsort((kept_index, kept_ssd))
+        best[j], best_ssd[j] = kept_index[order], kept_ssd[order]
+    return best, best_ssd, stats
+
+
+class SSDAccumulator:
+    """
+    Running SSD and maximum absolute deviation for every (training, ideal) pair, updated one block of
+    X rows at a time so that peak memory is bounded by the block size rather than by the table size.
+
+    Attributes:
+        training_columns (list of str): Names of the training functions (rows of the matrices).
+        ideal_columns (list of str): Names of the ideal functions (columns of the matrices).
+        ssd (np.ndarray): Accumulated SSD with shape (n_train, n_ideal).
+        max_deviation (np.ndarray): Accumulated maximum absolute deviation with shape (n_train, n_ideal).
+        rows (int): Number of X rows folded in so far.
+        folded_x (np.ndarray): The sorted, distinct X values folded in so far.
+
+    Methods:
+        update(train_rows, ideal_rows, x=None): Folds a block of aligned training and ideal rows into the accumulators.
+        covers(x): Returns a mask of the X values that were already folded in.
+        save(path): Persists the accumulators to a .npz file.
+        load(path): Loads accumulators saved with `save`.
+    """
+    def __init__(self, training_columns, ideal_columns):
+        self.training_columns = list(training_columns)
+        self.ideal_columns = list(ideal_columns)
+        self.ssd = np.zeros((len(self.training_columns), len(self.ideal_columns)), dtype=np.float64)
+        self.max_deviation = np.zeros_like(self.ssd)
+        self.rows = 0
+        self.folded_x = np.empty(0, dtype=np.float64)
+
+    def update(self, train_rows, ideal_rows, x=None, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Folds a block of training rows and the ideal rows at the same X values into the accumulators.
+
+        Parameters:
+            train_rows (array-like): Training values with shape (rows, n_train).
+            ideal_rows (array-like): Ideal values with shape (rows, n_ideal), aligned with `train_rows`.
+            x (array-like, optional): The X values of the block, recorded in `folded_x`.
+            block_bytes (int): Size limit for the scratch buffer.
+        """
+        ideal_rows = as_block(ideal_rows, keep_float32=True)
+        if ideal_rows.shape[1] != len(self.ideal_columns):
+            raise ValueError(f"Expected {len(self.ideal_columns)} ideal columns, got {ideal_rows.shape[1]}.")
+        if ideal_rows.shape[0] == 0:
+            return
+        ssd, max_dev = ssd_and_max_deviation(train_rows, ideal_rows, block_bytes)
+        self.ssd += ssd
+        np.maximum(self.max_deviation, max_dev, out=self.max_deviation)
+        self.rows += ideal_rows.shape[0]
+        if x is not None and len(x):
+            self.folded_x = np.union1d(self.folded_x, np.asarray(x, dtype=np.float64))
+
+    def covers(self, x):
+        """
+        Returns a boolean mask of the X values that were already folded in. Only exact X values count: an X
+        that lies between folded values (e.g. a row filling a gap in the grid) is not covered.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if self.folded_x.size == 0:
+            return np.zeros(x.shape, dtype=bool)
+        positions = np.minimum(np.searchsorted(self.folded_x, x), self.folded_x.size - 1)
+        return self.folded_x[positions] == x
+
+    def save(self, path):
+        """
+        Persists the accumulators to a .npz file so the next run can fold in only the new rows.
+        """
+        np.savez(path, training_columns=np.array(self.training_columns), ideal_columns=np.array(self.ideal_columns),
+                 ssd=self.ssd, max_deviation=self.max_deviation,
+                 rows=np.array(self.rows), folded_x=self.folded_x)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads accumulators saved with `save`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            accumulator = cls(data['training_columns'].tolist(), data['ideal_columns'].tolist())
+            accumulator.ssd = data['ssd']
+            accumulator.max_deviation = data['max_deviation']
+            accumulator.rows = int(data['rows'])
+            if 'folded_x' not in data:
+                raise ValueError(f"{path} only records the folded X range, not the folded X values; rebuild the accumulators.")
+            accumulator.folded_x = data['folded_x']
+        return accumulator
@@ -0,0 +1,254 @@
+import threading
+import pandas as pd
+from sqlalchemy.engine import URL
+from connection_pool import mysql_url, registry
+from instrumentation import instrumentation
+
+
+class StorageBackend:
+    """
+    The storage a pipeline class talks to: how to reach the database, which parameter marker its DB-API driver
+    uses, and how to bulk load rows into it.
+
+    ReadCsv, CSVImporter, DataProcessor and DataVisualizer all go through a backend, so the same pipeline runs
+    against a remote MySQL or SQL Server database or against an embedded SQLite (or DuckDB) file with no
+    network round trips. Engines are shared through `connection_pool.registry`.
+
+    Attributes:
+        name (str): Short backend name.
+        placeholder (str): Parameter marker of the DB-API driver.
+        max_parameters (int): Bound parameters allowed per statement, which sizes multi-row inserts.
+        connect_args (dict): Extra DB-API connect arguments.
+
+    Methods:
+        url(): Returns the SQLAlchemy URL.
+        engine(): Returns the shared pooled engine.
+        raw_connection(): Checks a DB-API connection out of the shared pool.
+        insert_verb(mode): Returns the INSERT/REPLACE keyword for a result write mode.
+        insert_statement(table_name, columns, mode='insert'): Returns the parameterized single-row insert statement.
+        insert_rows(cursor, table_name, columns, records, mode='insert'): Parameterized bulk insert on a DB-API cursor.
+        write_frame(frame, table_name, if_exists='append', dtype=None): Creates or appends a table from a DataFrame.
+        load_csv_file(cursor, csv_file_path, table_name, columns): Native bulk load of a CSV file, where supported.
+    """
+    name = None
+    placeholder = '?'
+    max_parameters = 2000
+
+    def __init__(self, connect_args=None):
+        self.connect_args = dict(connect_args or {})
+
+    def url(self):
+        raise NotImplementedError
+
+    def engine(self):
+        return registry.engine(self.url(), self.connect_args)
+
+    def raw_connection(self):
+        return registry.raw_connection(self.url(), self.connect_args)
+
+    def insert_verb(self, mode):
+        """
+        Returns the statement keyword for `mode`: 'insert' appends rows, 'replace' overwrites rows with the same
+        unique key.
+        """
+        if mode == 'insert':
+            return 'INSERT'
+        if mode == 'replace':
+            return 'REPLACE'
+        raise ValueError(f"Unknown result write mode: {mode}")
+
+    def insert_statement(self, table_name, columns, mode='insert'):
+        """
+        Returns the parameterized statement that inserts one row into `columns` of `table_name` in `mode`.
+        """
+        placeholders = ', '.join([self.placeholder] * len(columns))
+        return f"{self.insert_verb(mode)} INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def insert_rows(self, cursor, table_name, columns, records, mode='insert'):
+        """
+        Inserts `records` (a list of row tuples) into `columns` of `table_name` with one executemany call.
+        """
+        cursor.executemany(self.insert_statement(table_name, columns, mode), records)
+        instrumentation.count('queries')  # Raw DB-API cursors bypass the engine's query counter
+
+    def write_frame(self, frame, table_name, if_exists='append', dtype=None):
+        """
+        Writes a DataFrame to `table_name` (optionally 'schema.table'), creating the table when needed, with
+        multi-row inserts sized to the backend's parameter limit.
+        """
+        schema, _, name = table_name.rpartition('.')
+        rows_per_insert = max(1, self.max_parameters // max(1, frame.shape[1]))
+        frame.to_sql(name=name, schema=schema or None, con=self.engine(), if_exists=if_exists, index=False,
+                     method='multi', chunksize=rows_per_insert, dtype=dtype)
+
+    def load_csv_file(self, cursor, csv_file_path, table_name, columns):
+        raise NotImplementedError(f"The {self.name} backend has no native CSV bulk load")
+
+
+class MySQLBackend(StorageBackend):
+    """
+    A MySQL server reached through mysql.connector. `allow_local_infile` enables LOAD DATA LOCAL INFILE. Bulk
+    inserts with mode='replace' are written as INSERT ... ON DUPLICATE KEY UPDATE, which the driver batches.
+    """
+    name = 'mysql'
+    placeholder = '%s'
+    max_parameters = 60000
+
+    def __init__(self, host, user, password, database, allow_local_infile=False):
+        super().__init__({'allow_local_infile': True} if allow_local_infile else None)
+        self.host = host
+        self.user = user
+        self.password = password
+        self.database = database
+
+    def url(self):
+        return mysql_url(self.host, self.user, self.password, self.database)
+
+    def insert_statement(self, table_name, columns, mode='insert'):
+        # mysql.connector only rewrites executemany into one multi-row VALUES list for statements that start with
+        # INSERT; REPLACE INTO would be sent one row per round trip, so replace mode is an upsert instead
+        statement = super().insert_statement(table_name, columns, 'insert' if mode == 'replace' else mode)
+        if mode == 'replace':
+            statement += ' ON DUPLICATE KEY UPDATE ' + ', '.join(f"{column} = VALUES({column})" for column in columns)
+        return statement
+
+    def load_csv_file(self, cursor, csv_file_path, table_name, columns):
+        # Forward slashes avoid backslash escapes; quotes are doubled as in any SQL string literal
+        path = str(csv_file_path).replace('\\', '/').replace("'", "''")
+        query = (f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table_name} "
+                 f"FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n' IGNORE 1 LINES ({', '.join(columns)})")
+        cursor.execute(query)
+        instrumentation.count('queries')
+        return cursor.rowcount
+
+
+class MSSQLBackend(StorageBackend):
+    """
+    A Microsoft SQL Server reached through pyodbc. Statements are limited to 2100 parameters, and there is
+    no REPLACE INTO, so only mode='insert' is supported for result writes.
+    """
+    name = 'mssql'
+    placeholder = '?'
+    max_parameters = 2000
+
+    def __init__(self, server, database, username, password, driver):
+        super().__init__()
+        self.server = server
+        self.database = database
+        self.username = username
+        self.password = password
+        self.driver = driver
+
+    def url(self):
+        return (f'mssql+pyodbc://{self.username}:{self.password}@{self.server}/{self.database}'
+                f'?driver={self.driver.replace(" ", "+")}&TrustServerCertificate=yes')
+
+    def insert_verb(self, mode):
+        if mode == 'replace':
+            raise ValueError("SQL Server has no REPLACE INTO; use mode='insert'")
+        return super().insert_verb(mode)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    An embedded SQLite database file, running in-process with no network hops.
+
+    Writers are serialized by SQLite; `timeout` is how long a connection waits for another writer (e.g. a
+    concurrent ReadCsv load) before failing. Use a file path rather than ':memory:', since every pooled
+    connection to ':memory:' opens its own empty database.
+    """
+    name = 'sqlite'
+    placeholder = '?'
+    max_parameters = 32000
+
+    def __init__(self, path, timeout=30):
+        super().__init__({'timeout': timeout})
+        self.path = str(path)
+
+    def url(self):
+        return URL.create('sqlite', database=self.path)
+
+    def write_frame(self, frame, table_name, if_exists='append', dtype=None):
+        # sqlite3 executes one prepared statement over all rows, which is faster here than multi-row VALUES lists
+        schema, _, name = table_name.rpartition('.')
+        frame.to_sql(name=name, schema=schema or None, con=self.engine(), if_exists=if_exists, index=False, dtype=dtype)
+
+
+class DuckDBBackend(StorageBackend):
+    """
+    An embedded DuckDB database file with columnar bulk loads: DataFrames are registered with DuckDB and copied
+    with one INSERT ... SELECT, and CSV files are read by DuckDB's own CSV reader.
+
+    DuckDB has a single writer, so bulk writes from several threads (e.g. a concurrent ReadCsv load) are
+    serialized by the backend. Requires the optional `duckdb` and `duckdb_engine` packages.
+    """
+    name = 'duckdb'
+    placeholder = '?'
+    max_parameters = 60000
+
+    def __init__(self, path):
+        super().__init__()
+        try:
+            import duckdb_engine  # noqa: F401  (registers the 'duckdb' SQLAlchemy dialect)
+        except ImportError as e:
+            raise ImportError("The DuckDB backend needs the 'duckdb' and 'duckdb_engine' packages") from e
+        self.path = str(path)
+        self._write_lock = threading.Lock()
+
+    def url(self):
+        return URL.create('duckdb', database=self.path)
+
+    def insert_verb(self, mode):
+        if mode == 'replace':
+            return 'INSERT OR REPLACE'
+        return super().insert_verb(mode)
+
+    def _quote(self, table_name):
+        preparer = self.engine().dialect.identifier_preparer
+        return '.'.join(preparer.quote(part) for part in table_name.split('.'))
+
+    def insert_rows(self, cursor, table_name, columns, records, mode='insert'):
+        frame = pd.DataFrame.from_records(records, columns=list(columns))
+        column_list = ', '.join(columns)
+        with self._write_lock:
+            cursor.register('bulk_rows', frame)
+            try:
+                cursor.execute(f"{self.insert_verb(mode)} INTO {table_name} ({column_list}) "
+                               f"SELECT {column_list} FROM bulk_rows")
+                instrumentation.count('queries')
+            finally:
+                cursor.unregister('bulk_rows')
+
+    def write_frame(self, frame, table_name, if_exists='append', dtype=None):
+        if if_exists not in ('append', 'replace', 'fail'):
+            raise ValueError(f"Unknown if_exists mode: {if_exists}")
+        table = self._quote(table_name)
+        with self._write_lock:
+            connection = self.raw_connection()
+            try:
+                duck = connection.driver_connection
+                duck.register('bulk_frame', frame)
+                try:
+                    if if_exists == 'replace':
+                        duck.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM bulk_frame")
+                    else:
+                        if if_exists == 'append':
+                            duck.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM bulk_frame LIMIT 0")
+                        else:
+                            duck.execute(f"CREATE TABLE {table} AS SELECT * FROM bulk_frame LIMIT 0")
+                        duck.execute(f"INSERT INTO {table} BY NAME SELECT * FROM bulk_frame")
+                    instrumentation.count('queries')
+                finally:
+                    duck.unregister('bulk_frame')
+                connection.commit()
+            finally:
+                connection.close()
+
+    def load_csv_file(self, cursor, csv_file_path, table_name, columns):
+        path = str(csv_file_path).replace('\\', '/').replace("'", "''")
+        column_list = ', '.join(columns)
+        cursor.execute(f"INSERT INTO {table_name} ({column_list}) "
+                       f"SELECT {column_list} FROM read_csv('{path}', header = true)")
+        instrumentation.count('queries')
+        # DuckDB returns the inserted row count as the statement's result
+        return cursor.fetchone()[0]
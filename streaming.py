@@ -0,0 +1,155 @@
+import queue
+import threading
+import numpy as np
+import pandas as pd
+from instrumentation import instrumentation
+
+# Column names of the result table, as produced by Calculations.results
+RESULT_COLUMNS = ['X (test func)', 'Y (test func)', 'Delta Y (test func)', 'No. of ideal func']
+
+
+class ResultBatch:
+    """
+    The classification of one chunk of test points, held as typed arrays instead of one dictionary per point.
+
+    Attributes:
+        x (np.ndarray): Test X values, float64.
+        y (np.ndarray): Test Y values, float64.
+        delta (np.ndarray): Absolute deviation from the matched function, float64 (NaN when nothing matched).
+        function (np.ndarray): Index of the matched function in `functions`, int32 (-1 when nothing matched).
+        functions (tuple of str): The chosen ideal functions the indices refer to.
+
+    Methods:
+        function_names(): Returns the matched function name per point (None when nothing matched).
+        to_frame(): Returns the batch as a DataFrame with the columns of the result table.
+    """
+    __slots__ = ('x', 'y', 'delta', 'function', 'functions')
+
+    def __init__(self, x, y, delta, function, functions):
+        self.x = x
+        self.y = y
+        self.delta = delta
+        self.function = function
+        self.functions = tuple(functions)
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    def function_names(self):
+        names = np.array(list(self.functions) + [None], dtype=object)
+        return names[self.function]  # Index -1 picks the trailing None
+
+    def to_frame(self):
+        return pd.DataFrame({RESULT_COLUMNS[0]: self.x, RESULT_COLUMNS[1]: self.y,
+                             RESULT_COLUMNS[2]: self.delta, RESULT_COLUMNS[3]: self.function_names()})
+
+
+class ResultSink:
+    """
+    Writes result batches to a table on a background thread, so the next test chunk is read and classified
+    while the previous batch is being written.
+
+    At most `queue_size` batches wait for the writer; `write` blocks when the queue is full, which keeps peak
+    memory bounded by the chunk size however long the input is. A write error is raised again from the next
+    `write` or from `close`.
+
+    Attributes:
+        target: A storage_backend.StorageBackend (written through `write_frame`) or a SQLAlchemy engine
+            (written with `DataFrame.to_sql`).
+        table_name (str): The result table.
+        if_exists (str): What the first batch does when the table exists ('replace' or 'append'); later batches append.
+        rows (int): Rows written so far.
+
+    Methods:
+        write(batch): Queues one ResultBatch for writing.
+        consume(batches): Writes every batch of an iterable and closes the sink; returns the number of rows.
+        close(): Waits for the queued batches to be written and stops the writer.
+    """
+    def __init__(self, target, table_name, if_exists='replace', queue_size=2):
+        self.target = target
+        self.table_name = table_name
+        self.if_exists = if_exists
+        self.rows = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"ResultSink({table_name})", daemon=True)
+        self._thread.start()
+
+    def _write_frame(self, frame, if_exists):
+        with instrumentation.span('result_write', table=self.table_name, rows=len(frame)):
+            self._write_to_target(frame, if_exists)
+        instrumentation.count('rows_written', len(frame))
+
+    def _write_to_target(self, frame, if_exists):
+        if hasattr(self.target, 'write_frame'):
+            self.target.write_frame(frame, self.table_name, if_exists=if_exists)
+        else:
+            frame.to_sql(name=self.table_name, con=self.target, if_exists=if_exists, index=False)
+
+    def _run(self):
+        if_exists = self.if_exists
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                continue  # Drain the queue after a failure so producers are not blocked
+            try:
+                self._write_frame(batch.to_frame(), if_exists)
+                if_exists = 'append'
+                self.rows += len(batch)
+            except Exception as e:
+                self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, batch):
+        """
+        Queues `batch` for writing, blocking while `queue_size` batches are already waiting.
+        """
+        if self._closed:
+            raise ValueError("The result sink is closed.")
+        self._raise_error()
+        self._queue.put(batch)
+
+    def close(self):
+        """
+        Waits until every queued batch is written, stops the writer thread and raises any write error.
+
+        Returns:
+            int: The number of rows written.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+        return self.rows
+
+    def consume(self, batches):
+        """
+        Writes every batch of `batches` (e.g. `Calculations.results_streamed(...)`) and closes the sink.
+
+        Returns:
+            int: The number of rows written.
+        """
+        try:
+            for batch in batches:
+                self.write(batch)
+        finally:
+            rows = self.close()
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
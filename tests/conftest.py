@@ -0,0 +1,31 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+# The project modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Column name templates of the tables Calculations works on
+COLUMN_TEMPLATES = {'training': 'Y{} (training func)', 'ideal': 'Y{} (ideal func)'}
+
+
+def load_frame(file_name, kind):
+    """
+    Reads one of the project CSV files with the column names Calculations expects.
+    """
+    frame = pd.read_csv(os.path.join(ROOT, file_name))
+    if kind == 'test':
+        frame.columns = ['X (test func)', 'Y (test func)']
+    else:
+        frame.columns = ['X'] + [COLUMN_TEMPLATES[kind].format(i) for i in range(1, frame.shape[1])]
+    return frame
+
+
+@pytest.fixture(scope='session')
+def frames():
+    """
+    The project training, ideal and test data as (df_train, df_ideal, df_test).
+    """
+    return load_frame('train.csv', 'training'), load_frame('ideal.csv', 'ideal'), load_frame('test.csv', 'test')
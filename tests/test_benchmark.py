@@ -0,0 +1,21 @@
+import json
+from benchmark import main, make_dataset
+
+
+def test_make_dataset_shapes():
+    df_train, df_ideal, df_test, chosen = make_dataset(120, 9, 30)
+    assert df_train.shape == (120, 5) and df_ideal.shape == (120, 10) and df_test.shape == (30, 2)
+    assert len(chosen) == 4 and set(chosen) <= set(df_ideal.columns[1:])
+
+
+def test_small_run_reports_every_stage(tmp_path):
+    output = tmp_path / 'bench.json'
+
+    document = main(['--rows', '80', '--ideal', '6', '--test', '20', '--engines', 'vectorized', 'fused',
+                     '--result-engines', 'vectorized', '--repeat', '1', '--no-dashboard', '--output', str(output)])
+
+    with open(output) as report:
+        assert json.load(report)['results'] == document['results']
+    stages = {(result['stage'], result['variant']) for result in document['results']}
+    assert {('calculate_criteria1', 'vectorized'), ('calculate_criteria1', 'fused'),
+            ('process_test_data', 'python'), ('process_test_data', 'in_db')} <= stages
@@ -0,0 +1,21 @@
+import pytest
+from calculation import Calculations
+
+
+@pytest.mark.parametrize('n_train', [2, 4, 6])
+def test_deviations_match_fused_engine(frames, n_train):
+    df_train, df_ideal, _ = frames
+    df_train = df_train.copy()
+    # Extra training functions beyond the four of the project data
+    for i in range(5, n_train + 1):
+        df_train[f'Y{i} (training func)'] = df_train[f'Y{i - 4} (training func)'] * 3.0
+    df_train = df_train[['X'] + [f'Y{i} (training func)' for i in range(1, n_train + 1)]]
+
+    fused = Calculations(df_train, df_ideal, None)
+    fused.calculate_criteria1(engine='fused')
+    separate = Calculations(df_train, df_ideal, None)
+    separate.calculate_criteria1(engine='vectorized')
+    separate.deviations()
+
+    assert separate.top_four_ideal_functions == fused.top_four_ideal_functions
+    assert separate.adjusted_deviations == pytest.approx(fused.adjusted_deviations, rel=1e-12)
@@ -0,0 +1,20 @@
+import pandas as pd
+from sqlalchemy import create_engine, event
+from chunked_io import read_sql_chunks
+
+
+def test_read_sql_chunks_streams_in_blocks(frames, tmp_path):
+    df_train = frames[0]
+    engine = create_engine(f"sqlite:///{tmp_path / 'chunks.db'}")
+    df_train.to_sql('train', engine, index=False)
+    options = []
+    event.listen(engine, 'before_execute',
+                 lambda conn, clause, multiparams, params, execution_options: options.append(
+                     conn.get_execution_options().get('stream_results')))
+
+    chunks = list(read_sql_chunks(engine, 'train', chunksize=150))
+
+    assert [len(chunk) for chunk in chunks] == [150, 150, 100]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df_train)
+    assert options == [True]
+    engine.dispose()
@@ -0,0 +1,61 @@
+import threading
+import time
+from sqlalchemy import text
+from connection_pool import EngineRegistry, _TimedQueuePool
+
+
+def test_same_url_shares_one_engine(tmp_path):
+    registry = EngineRegistry()
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+
+    engine = registry.engine(url)
+    assert registry.engine(url) is engine
+
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    stats = registry.stats()[url]
+    assert stats['checkouts'] == 3
+    assert stats['connects'] == 1 and stats['reuses'] == 2
+    other = registry.engine(url, {'timeout': 5})
+    assert other is not engine
+    with other.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    # Engines that differ only in connect arguments are reported under their shared URL
+    assert registry.stats()[url]['checkouts'] == 4
+
+    registry.dispose_all()
+    assert registry.stats() == {}
+    assert registry.engine(url) is not engine
+    registry.dispose_all()
+
+
+def test_saturated_sqlite_pool_records_waits(tmp_path):
+    registry = EngineRegistry(pool_size=1, max_overflow=0, pool_timeout=5)
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = registry.engine(url)
+    assert isinstance(engine.pool, _TimedQueuePool)
+
+    held = engine.connect()
+    waiter = threading.Thread(target=lambda: engine.connect().close())
+    waiter.start()
+    time.sleep(0.2)
+    held.close()
+    waiter.join()
+
+    stats = registry.stats()[url]
+    assert stats['checkouts'] == 2 and stats['connects'] == 1
+    assert stats['waits'] == 1 and stats['wait_seconds'] >= 0.1
+    registry.dispose_all()
+
+
+def test_unknown_settings_are_rejected():
+    registry = EngineRegistry()
+    registry.configure(pool_size=2)
+    assert registry.pool_size == 2
+    try:
+        registry.configure(pool_sise=2)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("configure accepted an unknown setting")
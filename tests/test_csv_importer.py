@@ -0,0 +1,60 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from chunked_io import read_csv_batches
+from mysql_database import CSVImporter
+from storage_backend import SQLiteBackend
+
+TABLE_DDL = "CREATE TABLE points (id INTEGER PRIMARY KEY AUTOINCREMENT, x FLOAT, y FLOAT)"
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    frame = pd.DataFrame({'x': np.arange(250) * 0.5, 'y': np.arange(250) * 2.0})
+    frame.loc[[3, 120], 'y'] = np.nan
+    path = tmp_path / 'points.csv'
+    frame.to_csv(path, index=False)
+    return path, frame
+
+
+@pytest.fixture
+def importer(tmp_path):
+    backend = SQLiteBackend(tmp_path / 'import.db')
+    with backend.engine().begin() as connection:
+        connection.exec_driver_sql(TABLE_DDL)
+    importer = CSVImporter(None, None, None, None, backend=backend)
+    importer.connect()
+    yield importer
+    importer.disconnect()
+
+
+def test_batches_carry_rows_across_chunks(csv_file):
+    path, _ = csv_file
+    batches = list(read_csv_batches(path, batch_size=40, chunksize=64))
+
+    assert [len(records) for _, records in batches] == [40] * 6 + [10]
+    assert all(columns == ['x', 'y'] for columns, _ in batches)
+    assert batches[0][1][3] == (1.5, None)
+
+
+def test_import_fills_the_id_column_in_batches(importer, csv_file, monkeypatch):
+    path, frame = csv_file
+    insert_rows = importer.backend.insert_rows
+    batch_sizes = []
+
+    def recording_insert(cursor, table_name, columns, records, mode='insert'):
+        batch_sizes.append(len(records))
+        insert_rows(cursor, table_name, columns, records, mode)
+
+    monkeypatch.setattr(importer.backend, 'insert_rows', recording_insert)
+    result = importer.import_csv_to_db(path, 'points', batch_size=100, commit_every=150, chunksize=64)
+
+    assert result['rows'] == 250
+    assert batch_sizes == [100, 100, 50]
+    with sqlite3.connect(importer.backend.path) as reader:
+        rows = reader.execute("SELECT id, x, y FROM points ORDER BY id").fetchall()
+    assert len(rows) == 250
+    assert [row[0] for row in rows] == list(range(1, 251))
+    assert [row[1] for row in rows] == frame['x'].tolist()
+    assert [i for i, row in enumerate(rows) if row[2] is None] == [3, 120]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event
+from data_access import read_projected_frame
+
+
+@pytest.fixture
+def engine(frames, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ideal.db'}")
+    frames[1].to_sql('ideal', engine, index=False)
+    yield engine
+    engine.dispose()
+
+
+def record_stream_options(engine):
+    options = []
+    event.listen(engine, 'before_execute',
+                 lambda conn, clause, multiparams, params, execution_options: options.append(
+                     conn.get_execution_options().get('stream_results')))
+    return options
+
+
+def test_read_projected_fetches_only_requested_rows(frames, engine):
+    df_ideal = frames[1]
+    options = record_stream_options(engine)
+    x_values = df_ideal['X'].to_numpy()[::7]
+
+    frame = read_projected_frame(engine, 'ideal', ['X', 'Y42 (ideal func)'], x_column='X', x_values=x_values,
+                                 batch_size=20)
+
+    assert list(frame.columns) == ['X', 'Y42 (ideal func)']
+    np.testing.assert_array_equal(np.sort(frame['X'].to_numpy()), np.sort(x_values))
+    expected = df_ideal.set_index('X').loc[frame['X'], 'Y42 (ideal func)'].to_numpy()
+    np.testing.assert_array_equal(frame['Y42 (ideal func)'].to_numpy(), expected)
+    assert options and all(options)
+
+
+def test_read_projected_range_keeps_the_neighbouring_rows(frames, engine):
+    x = frames[1]['X'].to_numpy()
+
+    frame = read_projected_frame(engine, 'ideal', ['X'], x_column='X', x_values=[x[10] + 0.05, x[20] - 0.05],
+                                 interpolation='linear')
+
+    np.testing.assert_array_equal(np.sort(frame['X'].to_numpy()), x[10:21])
+    assert len(read_projected_frame(engine, 'ideal', ['X', 'Y1 (ideal func)'])) == len(x)
+    assert read_projected_frame(engine, 'ideal', ['X'], x_column='X', x_values=[1e9]).empty
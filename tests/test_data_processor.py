@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import pandas as pd
+import pytest
+from conftest import ROOT
+from mysql_database import DataProcessor
+from storage_backend import SQLiteBackend
+
+FUNCS = {'y1': 'y42', 'y2': 'y41', 'y3': 'y11', 'y4': 'y48'}
+MAPPING_DDL = ("CREATE TABLE mapping (id INTEGER PRIMARY KEY, x FLOAT, y FLOAT, ideal_function VARCHAR(255), "
+               "deviation FLOAT, UNIQUE (x, y))")
+
+
+class CommitRecorder:
+    """
+    Wraps the processor's DB-API connection and records the committed row count of the result table at
+    every commit, read through a separate connection.
+    """
+    def __init__(self, connection, path):
+        self._connection = connection
+        self._path = path
+        self.committed_rows = []
+
+    def commit(self):
+        self._connection.commit()
+        with sqlite3.connect(self._path) as reader:
+            self.committed_rows.append(reader.execute("SELECT COUNT(*) FROM mapping").fetchone()[0])
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    path = str(tmp_path / 'results.db')
+    backend = SQLiteBackend(path)
+    pd.read_csv(os.path.join(ROOT, 'ideal.csv')).to_sql('ideal', backend.engine(), index=False)
+    with backend.engine().begin() as connection:
+        connection.exec_driver_sql(MAPPING_DDL)
+    processor = DataProcessor('localhost', 'user', 'password', 'db', backend=backend)
+    processor.connect()
+    processor.connection = CommitRecorder(processor.connection, path)
+    batches = []
+    insert_rows = backend.insert_rows
+    monkeypatch.setattr(backend, 'insert_rows', lambda cursor, table, columns, records, mode='insert': (
+        batches.append((len(records), mode)), insert_rows(cursor, table, columns, records, mode)))
+    processor.batches = batches
+    yield processor
+    processor.connection = processor.connection._connection
+    processor.disconnect()
+    backend.engine().dispose()
+
+
+def test_results_are_written_and_committed_per_flush(processor):
+    processor.process_test_data(os.path.join(ROOT, 'test.csv'), 'ideal', 'mapping', FUNCS, flush_size=30)
+
+    assert processor.batches == [(30, 'insert'), (30, 'insert'), (30, 'insert'), (10, 'insert')]
+    assert processor.connection.committed_rows == [30, 60, 90, 100]
+    stored = pd.read_sql_query("SELECT * FROM mapping", processor.engine)
+    assert len(stored) == 100 and stored['ideal_function'].isin(FUNCS.values()).all()
+
+
+def test_replace_mode_overwrites_a_previous_run(processor):
+    test_csv = os.path.join(ROOT, 'test.csv')
+    processor.process_test_data(test_csv, 'ideal', 'mapping', FUNCS, flush_size=64)
+    processor.process_test_data(test_csv, 'ideal', 'mapping', FUNCS, flush_size=64, mode='replace')
+
+    assert processor.batches == [(64, 'insert'), (36, 'insert'), (64, 'replace'), (36, 'replace')]
+    assert processor.connection.committed_rows == [64, 100, 100, 100]
+    assert pd.read_sql_query("SELECT COUNT(*) AS n FROM mapping", processor.engine)['n'][0] == 100
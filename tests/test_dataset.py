@@ -0,0 +1,70 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+import pytest
+from calculation import Calculations
+from dataset import ArrayDataset
+from ssd_engine import as_block, ssd_and_max_deviation
+
+
+def test_from_frame_sorts_and_indexes_columns(frames):
+    df_ideal = frames[1]
+    shuffled = df_ideal.sample(frac=1.0, random_state=3)
+
+    dataset = ArrayDataset.from_frame(shuffled)
+
+    np.testing.assert_array_equal(dataset.x, df_ideal['X'].to_numpy())
+    assert dataset.values.flags.c_contiguous and dataset.values.shape == (400, 50)
+    np.testing.assert_array_equal(dataset.column('Y7 (ideal func)'), df_ideal['Y7 (ideal func)'].to_numpy())
+    assert dataset.block() is dataset.values
+    np.testing.assert_array_equal(dataset.block(['Y2 (ideal func)', 'Y1 (ideal func)']),
+                                  df_ideal[['Y2 (ideal func)', 'Y1 (ideal func)']].to_numpy())
+    pd.testing.assert_frame_equal(dataset.to_frame(), df_ideal)
+    with pytest.raises(ValueError):
+        ArrayDataset(dataset.x[:-1], dataset.values, dataset.columns)
+
+
+def test_float32_storage_halves_memory_and_keeps_the_selection(frames):
+    single = Calculations(*frames, dtype=np.float32)
+    double = Calculations(*frames)
+    assert single.ideal.values.dtype == np.float32
+    assert single.ideal.values.nbytes * 2 == double.ideal.values.nbytes
+
+    for calculations in (single, double):
+        calculations.calculate_criteria1(engine='fused')
+        calculations.results()
+
+    assert single.top_four_ideal_functions == double.top_four_ideal_functions
+    for func, value in double.adjusted_deviations.items():
+        assert single.adjusted_deviations[func] == pytest.approx(value, rel=1e-6)
+    single_results, double_results = pd.DataFrame(single.test_results), pd.DataFrame(double.test_results)
+    assert single_results['No. of ideal func'].tolist() == double_results['No. of ideal func'].tolist()
+
+
+def traced_peak(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_float32_kernels_upcast_one_tile_at_a_time(tmp_path):
+    rng = np.random.default_rng(11)
+    train = rng.normal(size=(2000, 4))
+    ideal = rng.normal(size=(2000, 1000)).astype(np.float32)
+    np.save(tmp_path / 'ideal.npy', ideal)
+    mapped = np.load(tmp_path / 'ideal.npy', mmap_mode='r')
+    block_bytes = 1024 * 1024
+
+    assert np.shares_memory(as_block(mapped, keep_float32=True), mapped)
+    single_peak = traced_peak(ssd_and_max_deviation, train, mapped, block_bytes)
+    double_peak = traced_peak(ssd_and_max_deviation, train, ideal.astype(np.float64), block_bytes)
+
+    # A whole-block upcast would need ideal.nbytes * 2 (16 MB); the float32 scan only holds the tile buffers
+    assert single_peak < block_bytes + ideal.nbytes // 8
+    assert single_peak <= double_peak
+    for single, double in zip(ssd_and_max_deviation(train, mapped, block_bytes),
+                              ssd_and_max_deviation(train, ideal.astype(np.float64))):
+        np.testing.assert_array_equal(single, double)
@@ -0,0 +1,91 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from calculation import Calculations
+from conftest import ROOT
+from dataset import ArrayDataset
+from dataset_cache import DatasetCache
+from ssd_engine import as_block
+
+
+def copy_source(tmp_path, name='train.csv'):
+    path = tmp_path / name
+    shutil.copy(os.path.join(ROOT, name), path)
+    return str(path)
+
+
+def test_open_returns_the_csv_data(tmp_path):
+    source = copy_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / 'cache'))
+
+    frame = cache.open(source)
+
+    pd.testing.assert_frame_equal(frame, pd.read_csv(source, dtype=np.float64))
+    assert cache.is_fresh(source)
+    assert list(cache.open(source, kind='training').columns)[:2] == ['X', 'Y1 (training func)']
+
+
+def test_changed_source_is_rebuilt(tmp_path):
+    source = copy_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    cache.open(source)
+
+    pd.read_csv(source).iloc[:10].to_csv(source, index=False)
+    os.utime(source, ns=(0, 0))
+
+    assert not cache.is_fresh(source)
+    assert len(cache.open(source)) == 10
+    assert cache.is_fresh(source)
+
+
+def test_invalidate_and_empty_source(tmp_path):
+    source = copy_source(tmp_path)
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    cache.open(source)
+    cache.invalidate(source)
+    assert not cache.is_fresh(source)
+
+    pd.read_csv(source).iloc[:0].to_csv(source, index=False)
+    frame = cache.open(source)
+    assert len(frame) == 0 and list(frame.columns) == ['x', 'y1', 'y2', 'y3', 'y4']
+
+
+def test_from_cache_matches_in_memory_frames(tmp_path, frames):
+    cache = DatasetCache(str(tmp_path / 'cache'))
+    paths = [os.path.join(ROOT, name) for name in ('train.csv', 'ideal.csv', 'test.csv')]
+
+    cached = Calculations.from_cache(cache, *paths)
+    cached.calculate_criteria1(engine='fused')
+    cached.results()
+    in_memory = Calculations(*frames)
+    in_memory.calculate_criteria1(engine='fused')
+    in_memory.results()
+
+    assert cached.top_four_ideal_functions == in_memory.top_four_ideal_functions
+    assert cached.adjusted_deviations == in_memory.adjusted_deviations
+    assert pd.DataFrame(cached.test_results).equals(pd.DataFrame(in_memory.test_results))
+
+
+def test_open_dataset_maps_a_contiguous_block(tmp_path):
+    source = copy_source(tmp_path, 'ideal.csv')
+    cache = DatasetCache(str(tmp_path / 'cache'))
+
+    dataset = cache.open_dataset(source, 'ideal')
+
+    assert dataset.values.flags.c_contiguous
+    assert isinstance(dataset.values.base, np.memmap)
+    assert as_block(dataset.values) is dataset.values
+    expected = pd.read_csv(source, dtype=np.float64).to_numpy()
+    np.testing.assert_array_equal(dataset.x, expected[:, 0])
+    np.testing.assert_array_equal(dataset.values, expected[:, 1:])
+
+    single = cache.open_dataset(source, 'ideal', dtype=np.float32)
+    assert single.values.dtype == np.float32 and single.values.flags.c_contiguous
+
+
+def test_from_block_rejects_strided_blocks():
+    block = np.arange(12, dtype=np.float64).reshape(4, 3)
+    with pytest.raises(ValueError):
+        ArrayDataset.from_block(block[:, 0], block[:, 1:], ['Y1', 'Y2'])
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bokeh.models import ImageRGBA, Scatter
+from density_raster import bin_index, category_counts, data_extent
+from ploting import Plot
+
+
+def make_results(n=1000, seed=5):
+    rng = np.random.default_rng(seed)
+    functions = np.array(['Y42', 'Y41', 'Y11', None], dtype=object)
+    return pd.DataFrame({
+        'X (test func)': rng.uniform(-20.0, 20.0, n),
+        'Y (test func)': rng.normal(0.0, 5.0, n),
+        'Delta Y (test func)': rng.uniform(0.0, 1.0, n),
+        'No. of ideal func': functions[rng.integers(0, 4, n)],
+    })
+
+
+def glyph_types(figure):
+    return [type(renderer.glyph) for renderer in figure.renderers]
+
+
+def test_bin_index_puts_edge_points_in_the_last_bin():
+    x = np.array([0.0, 10.0, 5.0, 10.0, 0.0])
+    y = np.array([0.0, 4.0, 2.0, 0.0, 4.0])
+    extent = data_extent(x, y)
+
+    flat = bin_index(x, y, (5, 2), extent)
+
+    assert extent == (0.0, 10.0, 0.0, 4.0)
+    assert flat.tolist() == [0, 9, 7, 4, 5]
+
+
+def test_data_extent_widens_empty_ranges():
+    assert data_extent(np.array([3.0, 3.0]), np.array([1.0, 2.0])) == (2.5, 3.5, 1.0, 2.0)
+
+
+def test_category_counts_total_the_points():
+    results = make_results()
+    x, y = results['X (test func)'].to_numpy(), results['Y (test func)'].to_numpy()
+    bins = (40, 20)
+    flat = bin_index(x, y, bins, data_extent(x, y))
+    codes = np.random.default_rng(0).integers(0, 3, len(results))
+
+    counts = category_counts(flat, codes, 3, bins)
+
+    assert counts.shape == (3, 20, 40)
+    assert counts.sum() == len(results)
+    assert counts.sum(axis=(1, 2)).tolist() == np.bincount(codes, minlength=3).tolist()
+    assert counts.sum(axis=0).ravel().tolist() == np.bincount(flat, minlength=800).tolist()
+
+
+def test_unmatched_points_land_in_no_match():
+    results = make_results()
+    plot = Plot({}, results, density_bins=(30, 10))
+
+    p = plot.density_plot(results)
+
+    data = p.renderers[0].data_source.data
+    tooltips = dict(p.tools[-1].tooltips)
+    names = [name for name in tooltips if name != 'Points in bin']
+    assert names[-1] == 'No match'
+    no_match = data[f'count_{len(names) - 1}'][0]
+    assert no_match.sum() == results['No. of ideal func'].isna().sum()
+    assert data['count'][0].sum() == len(results)
+    assert sum(data[f'count_{i}'][0].sum() for i in range(len(names))) == len(results)
+
+
+def test_auto_mode_switches_at_the_density_threshold():
+    results = make_results(200)
+
+    assert glyph_types(Plot({}, results, density_threshold=200).scatter_test_results(results)) == [Scatter]
+    assert glyph_types(Plot({}, results, density_threshold=199).scatter_test_results(results))[0] is ImageRGBA
+    assert glyph_types(Plot({}, results).scatter_test_results(results, mode='density'))[0] is ImageRGBA
+    with pytest.raises(ValueError):
+        Plot({}, results).scatter_test_results(results, mode='hexbin')
+
+
+def test_delta_coloring_uses_the_mean_delta():
+    results = make_results()
+    p = Plot({}, results, density_bins=(1, 1)).density_plot(results, color_by='delta')
+
+    mean_delta = p.renderers[0].data_source.data['mean_delta'][0]
+
+    assert mean_delta.shape == (1, 1)
+    assert mean_delta[0, 0] == pytest.approx(results['Delta Y (test func)'].mean())
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from downsampling import downsample, lttb_indices, min_max_indices
+
+
+def noisy_series(n=10000, seed=3):
+    rng = np.random.default_rng(seed)
+    x = np.linspace(-20.0, 20.0, n)
+    y = np.sin(x) + rng.normal(0.0, 0.2, n)
+    y[n // 8], y[7 * n // 8] = 9.0, -9.0  # Isolated spikes that must survive
+    return x, y
+
+
+@pytest.mark.parametrize('n_out', [0, 1, 2, 3])
+def test_small_budgets_keep_every_point(n_out):
+    x, y = noisy_series(50)
+
+    assert np.array_equal(min_max_indices(x, y, n_out), np.arange(50))
+    if n_out < 3:
+        assert np.array_equal(lttb_indices(x, y, n_out), np.arange(50))
+    else:
+        assert len(lttb_indices(x, y, n_out)) == 3
+
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+@pytest.mark.parametrize('n_out', [4, 101, 1000])
+def test_point_budget_endpoints_and_extremes(method, n_out):
+    x, y = noisy_series()
+
+    kept_x, kept_y = downsample(x, y, n_out=n_out, method=method)
+
+    assert len(kept_x) <= n_out
+    assert kept_x[0] == x[0] and kept_y[0] == y[0]
+    assert kept_x[-1] == x[-1] and kept_y[-1] == y[-1]
+    assert np.all(np.diff(kept_x) > 0)
+    if method == 'minmax' or n_out > 4:
+        assert kept_y.max() == y.max() and kept_y.min() == y.min()
+    if method == 'lttb':
+        assert len(kept_x) == n_out
+
+
+def test_minmax_pads_the_last_bucket():
+    # 10 points in 3 buckets of 4: the last bucket holds 2 real points and 2 padding slots
+    x = np.arange(10.0)
+    y = np.array([5.0, 1.0, 7.0, 3.0, 2.0, 8.0, 0.0, 4.0, 9.0, 6.0])
+
+    kept = min_max_indices(x, y, 8)
+
+    assert kept.max() < 10
+    assert np.array_equal(kept, [0, 1, 2, 5, 6, 8, 9])
+
+
+def test_nan_points_are_dropped_and_unsorted_x_is_sorted():
+    x, y = noisy_series(5000)
+    order = np.random.default_rng(0).permutation(len(x))
+    x, y = x[order].copy(), y[order].copy()
+    x[:10] = np.nan
+    y[10:20] = np.nan
+
+    for method in ('lttb', 'minmax'):
+        kept_x, kept_y = downsample(x, y, n_out=500, method=method)
+        assert not np.isnan(kept_x).any() and not np.isnan(kept_y).any()
+        assert np.all(np.diff(kept_x) > 0)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        assert kept_x[0] == x[valid].min() and kept_x[-1] == x[valid].max()
+
+
+def test_short_series_and_unknown_method():
+    x, y = noisy_series(100)
+
+    kept_x, kept_y = downsample(x, y, n_out=100)
+
+    assert np.array_equal(kept_x, x) and np.array_equal(kept_y, y)
+    with pytest.raises(ValueError):
+        downsample(x, y, method='every_nth')
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+from calculation import Calculations
+from chunked_io import read_csv_chunks
+from conftest import ROOT
+from sketch_index import IdealSketchIndex
+
+EXPECTED = ['Y42 (ideal func)', 'Y41 (ideal func)', 'Y11 (ideal func)', 'Y48 (ideal func)']
+
+
+@pytest.fixture(scope='module')
+def reference(frames):
+    """
+    The original per-pair pandas computation ('loop' engines), which every faster engine must reproduce.
+    """
+    calculations = Calculations(*frames)
+    calculations.calculate_criteria1(engine='loop')
+    calculations.deviations()
+    calculations.results(engine='loop')
+    return calculations
+
+
+def assert_same_ssd(actual, expected):
+    for train_func, sums in actual.ssd_sums.items():
+        for ideal_func, value in sums.items():
+            assert value == pytest.approx(expected.ssd_sums[train_func][ideal_func], rel=1e-9)
+
+
+def test_reference_selection(reference):
+    assert reference.top_four_ideal_functions == EXPECTED
+    assert len(reference.test_results) == 100
+
+
+@pytest.mark.parametrize('engine', ['vectorized', 'fused', 'parallel'])
+def test_ssd_engines_match_reference(frames, reference, engine):
+    calculations = Calculations(*frames)
+    calculations.calculate_criteria1(engine=engine, workers=2)
+    if engine == 'vectorized':
+        calculations.deviations()
+
+    assert calculations.top_four_ideal_functions == EXPECTED
+    assert_same_ssd(calculations, reference)
+    assert calculations.adjusted_deviations == pytest.approx(reference.adjusted_deviations, rel=1e-12)
+
+
+def test_streamed_ssd_matches_reference(frames, reference):
+    calculations = Calculations(frames[0], None, None)
+    calculations.calculate_criteria1_streamed(read_csv_chunks(f'{ROOT}/ideal.csv', 'ideal', chunksize=64))
+
+    assert calculations.top_four_ideal_functions == EXPECTED
+    assert_same_ssd(calculations, reference)
+    assert calculations.adjusted_deviations == pytest.approx(reference.adjusted_deviations, rel=1e-12)
+
+
+def test_top_k_search_matches_reference(frames, reference):
+    calculations = Calculations(*frames)
+    top_k = calculations.select_top_k(k=3, block_rows=50, batch_columns=8)
+
+    for train_func, names in top_k.items():
+        sums = reference.ssd_sums[train_func]
+        assert names == sorted(sums, key=sums.get)[:3]
+    assert_same_ssd(calculations, reference)
+    stats = calculations.search_stats
+    assert stats['pruned'] > 0 and stats['completed'] + stats['pruned'] == stats['candidates']
+
+
+def test_sketch_shortlist_keeps_winners(frames, reference):
+    calculations = Calculations(*frames)
+    index = IdealSketchIndex.from_frame(calculations.df_ideal, dims=16)
+    calculations.calculate_criteria1(engine='sketch', sketch_index=index, candidates=12)
+
+    assert calculations.top_four_ideal_functions == EXPECTED
+    assert_same_ssd(calculations, reference)
+
+    shifted = calculations.df_ideal.assign(X=calculations.df_ideal['X'] + 0.05)
+    with pytest.raises(ValueError):
+        calculations.calculate_criteria1(engine='sketch', sketch_index=IdealSketchIndex.from_frame(shifted, dims=16))
+
+
+@pytest.mark.parametrize('engine', ['vectorized', 'parallel'])
+def test_assignment_engines_match_reference(frames, reference, engine):
+    calculations = Calculations(*frames)
+    calculations.calculate_criteria1(engine='fused')
+    calculations.results(engine=engine, workers=2)
+
+    actual = pd.DataFrame(calculations.test_results)
+    expected = pd.DataFrame(reference.test_results)
+    assert actual['No. of ideal func'].tolist() == expected['No. of ideal func'].tolist()
+    np.testing.assert_allclose(actual['Delta Y (test func)'].astype(float), expected['Delta Y (test func)'].astype(float))
+
+
+def test_streamed_results_match_reference(frames, reference):
+    calculations = Calculations(*frames)
+    calculations.calculate_criteria1(engine='fused')
+    batches = list(calculations.results_streamed(read_csv_chunks(f'{ROOT}/test.csv', 'test', chunksize=30)))
+
+    actual = pd.concat([batch.to_frame() for batch in batches], ignore_index=True)
+    expected = pd.DataFrame(reference.test_results)
+    assert [len(batch) for batch in batches] == [30, 30, 30, 10]
+    assert actual['No. of ideal func'].tolist() == expected['No. of ideal func'].tolist()
+    np.testing.assert_allclose(actual['Delta Y (test func)'], expected['Delta Y (test func)'].astype(float))
+
+def test_nearest_interpolation_snaps_to_grid(frames, reference):
+    df_train, df_ideal, df_test = frames
+    # The ideal grid step is 0.1, so a shift of 0.01 keeps every point closest to its original grid X
+    shifted = df_test.assign(**{'X (test func)': df_test['X (test func)'] + 0.01})
+    calculations = Calculations(df_train, df_ideal, shifted, interpolation='nearest')
+    calculations.calculate_criteria1()
+    calculations.deviations()
+    calculations.results()
+
+    actual = pd.DataFrame(calculations.test_results)
+    expected = pd.DataFrame(reference.test_results)
+    assert actual['No. of ideal func'].tolist() == expected['No. of ideal func'].tolist()
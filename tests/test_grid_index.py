@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from grid_index import XGridIndex
+
+
+@pytest.mark.parametrize('x', [np.array([0.3, 0.0, 0.2, 0.1, 0.4]),       # Uniform, unsorted
+                               np.array([0.0, 0.1, 0.25, 0.7, 1.0])])     # Not uniform
+def test_lookup_methods(x):
+    index = XGridIndex(x)
+    values = np.column_stack([x * 10.0, -x])
+    sorted_x = np.sort(x)
+
+    np.testing.assert_array_equal(index.lookup(values, sorted_x), np.column_stack([sorted_x * 10.0, -sorted_x]))
+
+    queries = np.array([-1.0, sorted_x[1] + 0.01, sorted_x[-1] + 1.0])
+    nearest = index.lookup(values, queries, method='nearest')
+    np.testing.assert_allclose(nearest[:, 0], [sorted_x[0] * 10.0, sorted_x[1] * 10.0, sorted_x[-1] * 10.0])
+
+    midpoint = (sorted_x[1] + sorted_x[2]) / 2
+    linear = index.lookup(values, np.array([midpoint]), method='linear')
+    np.testing.assert_allclose(linear, [[midpoint * 10.0, -midpoint]])
+
+
+def test_uniform_grid_detection_and_missing_values():
+    assert XGridIndex(np.arange(400) * 0.1 - 20.0).is_uniform()
+    assert not XGridIndex(np.array([0.0, 0.1, 0.3])).is_uniform()
+
+    index = XGridIndex(np.array([0.0, 0.1, 0.2]))
+    np.testing.assert_array_equal(index.positions(np.array([0.2, 0.0])), [2, 0])
+    with pytest.raises(KeyError):
+        index.positions(np.array([0.15]))
+    with pytest.raises(ValueError):
+        index.lookup(np.zeros(3), np.array([0.0]), method='cubic')
@@ -0,0 +1,99 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from calculation import Calculations
+from conftest import ROOT
+from mysql_database import DataProcessor
+from storage_backend import SQLiteBackend
+
+FUNCS = {'y1': 'y42', 'y2': 'y41', 'y3': 'y11', 'y4': 'y48'}
+MAPPING_DDL = ("CREATE TABLE {} (id INTEGER PRIMARY KEY, x FLOAT, y FLOAT, ideal_function VARCHAR(255), "
+               "deviation FLOAT, UNIQUE (x, y))")
+
+
+@pytest.fixture
+def processor(tmp_path):
+    """
+    A DataProcessor on an SQLite file holding the project's ideal and test data and two empty result tables.
+    """
+    backend = SQLiteBackend(str(tmp_path / 'matching.db'))
+    engine = backend.engine()
+    for name in ('ideal', 'test'):
+        pd.read_csv(os.path.join(ROOT, f'{name}.csv')).to_sql(name, engine, index=True, index_label='id')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(MAPPING_DDL.format('mapping_python'))
+        connection.exec_driver_sql(MAPPING_DDL.format('mapping_db'))
+    processor = DataProcessor('localhost', 'user', 'password', 'db', backend=backend)
+    processor.connect()
+    yield processor
+    processor.disconnect()
+    engine.dispose()
+
+
+def pandas_matching(thresholds=None):
+    """
+    Reference matching written directly in pandas: the admissible function with the smallest deviation per test point.
+    """
+    test = pd.read_csv(os.path.join(ROOT, 'test.csv'))
+    ideal = pd.read_csv(os.path.join(ROOT, 'ideal.csv'))
+    funcs = list(FUNCS.values())
+    merged = test.merge(ideal[['x'] + funcs], on='x')
+    deviations = merged[funcs].sub(merged['y'], axis=0).abs()
+    if thresholds is not None:
+        deviations = deviations.where(deviations < pd.Series(thresholds)[funcs], np.inf)
+    best = deviations.to_numpy().argmin(axis=1)
+    smallest = deviations.to_numpy()[np.arange(len(merged)), best]
+    matched = np.isfinite(smallest)
+    return pd.DataFrame({'x': merged['x'][matched], 'y': merged['y'][matched],
+                         'ideal_function': np.array(funcs)[best[matched]], 'deviation': smallest[matched]})
+
+
+def read_results(processor, table):
+    frame = pd.read_sql_query(f"SELECT x, y, ideal_function, deviation FROM {table}", processor.engine)
+    return frame.sort_values(['x', 'y']).reset_index(drop=True)
+
+
+def assert_same_results(actual, expected):
+    expected = expected.sort_values(['x', 'y']).reset_index(drop=True)
+    assert len(actual) == len(expected)
+    np.testing.assert_allclose(actual[['x', 'y']].to_numpy(), expected[['x', 'y']].to_numpy())
+    assert actual['ideal_function'].tolist() == expected['ideal_function'].tolist()
+    np.testing.assert_allclose(actual['deviation'].to_numpy(), expected['deviation'].to_numpy(), atol=1e-9)
+
+
+def test_in_db_matches_python_path(processor):
+    processor.process_test_data(os.path.join(ROOT, 'test.csv'), 'ideal', 'mapping_python', FUNCS)
+    written = processor.process_test_data_in_db('test', 'ideal', 'mapping_db', FUNCS)
+
+    in_db = read_results(processor, 'mapping_db')
+    assert written == len(in_db) == 100
+    assert_same_results(in_db, read_results(processor, 'mapping_python'))
+    assert_same_results(in_db, pandas_matching())
+    assert processor.check_in_db_parity('test', 'ideal', FUNCS).empty
+
+
+@pytest.mark.parametrize('scale', [1.0, 0.25])
+def test_in_db_matches_pandas_with_thresholds(processor, frames, scale):
+    df_train, df_ideal, _ = frames
+    calculations = Calculations(df_train, df_ideal, None)
+    calculations.calculate_criteria1(engine='fused')
+    thresholds = {func.split(' ')[0].lower(): value * scale
+                  for func, value in calculations.adjusted_deviations.items()}
+
+    written = processor.process_test_data_in_db('test', 'ideal', 'mapping_db', FUNCS, thresholds)
+
+    expected = pandas_matching(thresholds)
+    in_db = read_results(processor, 'mapping_db')
+    assert written == len(expected)
+    assert_same_results(in_db, expected)
+    assert processor.check_in_db_parity('test', 'ideal', FUNCS, thresholds).empty
+    if scale < 1:
+        assert len(expected) < 100  # The tighter thresholds leave some points unmatched
+
+
+def test_replace_mode_does_not_duplicate_rows(processor):
+    processor.process_test_data_in_db('test', 'ideal', 'mapping_db', FUNCS, mode='replace')
+    processor.process_test_data_in_db('test', 'ideal', 'mapping_db', FUNCS, mode='replace')
+
+    assert len(read_results(processor, 'mapping_db')) == 100
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from calculation import Calculations
+from dataset import ArrayDataset
+from ssd_engine import SSDAccumulator
+
+
+def full_recompute(df_train, df_ideal):
+    calculations = Calculations(df_train, df_ideal, None)
+    calculations.calculate_criteria1(engine='fused')
+    return calculations
+
+
+def assert_same_selection(incremental, full):
+    assert incremental.top_four_ideal_functions == full.top_four_ideal_functions
+    for train_func, sums in full.ssd_sums.items():
+        for ideal_func, value in sums.items():
+            assert incremental.ssd_sums[train_func][ideal_func] == pytest.approx(value, rel=1e-9, abs=1e-9)
+    for func, value in full.adjusted_deviations.items():
+        assert incremental.adjusted_deviations[func] == pytest.approx(value, rel=1e-12)
+
+
+def test_appended_rows_match_a_full_recompute(frames):
+    df_train, df_ideal, _ = frames
+    calculations = Calculations(df_train.iloc[:250], df_ideal.iloc[:250], None)
+    calculations.update_incremental()
+
+    report = calculations.update_incremental(df_train.iloc[250:], df_ideal.iloc[250:])
+
+    assert report['rows_folded'] == 150
+    assert calculations.accumulator.rows == len(df_train)
+    assert_same_selection(calculations, full_recompute(df_train, df_ideal))
+
+
+@pytest.mark.parametrize('append', ['both', 'training', 'ideal'])
+def test_interleaved_rows_are_folded(frames, append):
+    df_train, df_ideal, _ = frames
+    train_seed = df_train.iloc[::2] if append in ('both', 'training') else df_train
+    ideal_seed = df_ideal.iloc[::2] if append in ('both', 'ideal') else df_ideal
+    calculations = Calculations(train_seed, ideal_seed, None)
+    calculations.update_incremental()
+
+    report = calculations.update_incremental(df_train.iloc[1::2] if train_seed is not df_train else None,
+                                             df_ideal.iloc[1::2] if ideal_seed is not df_ideal else None)
+
+    assert report['rows_skipped'] == 0
+    assert calculations.accumulator.rows == len(df_train)
+    assert_same_selection(calculations, full_recompute(df_train, df_ideal))
+
+
+def test_rows_already_folded_are_skipped(frames):
+    df_train, df_ideal, _ = frames
+    calculations = Calculations(df_train, df_ideal, None)
+    calculations.update_incremental()
+
+    report = calculations.update_incremental(df_train_new=df_train.iloc[:10], df_ideal_new=df_ideal.iloc[:10])
+
+    assert report['rows_folded'] == 0
+    assert report['selection_changed'] is False
+    assert_same_selection(calculations, full_recompute(df_train, df_ideal))
+
+
+def test_saved_accumulator_resumes_the_update(frames, tmp_path):
+    df_train, df_ideal, _ = frames
+    calculations = Calculations(df_train.iloc[:300], df_ideal, None)
+    calculations.update_incremental()
+    path = tmp_path / 'accumulator.npz'
+    calculations.save_accumulator(path)
+
+    restored = Calculations(df_train.iloc[:300], df_ideal, None)
+    restored.load_accumulator(path)
+    restored.update_incremental(df_train_new=df_train.iloc[300:])
+
+    assert_same_selection(restored, full_recompute(df_train, df_ideal))
+
+
+def test_saved_accumulator_keeps_folded_x(frames, tmp_path):
+    df_train, df_ideal, _ = frames
+    calculations = Calculations(df_train.iloc[::2], df_ideal, None)
+    calculations.update_incremental()
+    path = tmp_path / 'accumulator.npz'
+    calculations.save_accumulator(path)
+
+    restored = Calculations(df_train.iloc[::2], df_ideal, None)
+    restored.load_accumulator(path)
+    np.testing.assert_array_equal(restored.accumulator.folded_x, calculations.accumulator.folded_x)
+    restored.update_incremental(df_train_new=df_train.iloc[1::2])
+
+    assert_same_selection(restored, full_recompute(df_train, df_ideal))
+
+
+def test_update_reads_only_the_new_rows(frames, monkeypatch):
+    df_train, df_ideal, _ = frames
+    full = full_recompute(df_train, df_ideal)
+    calculations = Calculations(df_train.iloc[::2], df_ideal.iloc[::2], None)
+    calculations.update_incremental()
+    stored_train, stored_ideal = calculations.train, calculations.ideal
+    train_before, ideal_before = stored_train.values.copy(), stored_ideal.values.copy()
+    folded_blocks = []
+    update = SSDAccumulator.update
+    monkeypatch.setattr(SSDAccumulator, 'update', lambda self, train_rows, ideal_rows, x=None: (
+        folded_blocks.append(np.asarray(x)), update(self, train_rows, ideal_rows, x)))
+    monkeypatch.setattr(ArrayDataset, 'from_frame', None)  # No full rebuild of a dataset
+
+    report = calculations.update_incremental(df_train.iloc[1::2], df_ideal.iloc[1::2])
+
+    new_x = np.sort(df_train['X'].to_numpy()[1::2])
+    assert len(folded_blocks) == 1
+    np.testing.assert_array_equal(folded_blocks[0], new_x)
+    assert report['rows_folded'] == len(new_x) and report['rows_skipped'] == 0
+    # The stored rows are left alone; the new rows are merged into sorted copies
+    np.testing.assert_array_equal(stored_train.values, train_before)
+    np.testing.assert_array_equal(stored_ideal.values, ideal_before)
+    np.testing.assert_array_equal(calculations.train.x, df_train['X'].to_numpy())
+    np.testing.assert_array_equal(calculations.ideal.values, df_ideal.drop(columns='X').to_numpy())
+    assert_same_selection(calculations, full)
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+import pandas as pd
+from instrumentation import STAGES, Instrumentation, _NULL_SPAN
+
+
+def test_disabled_instrumentation_records_nothing():
+    recorder = Instrumentation()
+
+    with recorder.span('ssd', engine='fused') as span:
+        span.set(rows=10)
+    recorder.count('rows_read', 5)
+    chunks = list(recorder.chunks('csv_read', [pd.DataFrame({'x': [1.0]})], 'read'))
+
+    assert recorder.span('ssd') is _NULL_SPAN
+    assert len(chunks) == 1
+    assert recorder.spans == [] and recorder.counters == {}
+    assert recorder.export() == {'spans': [], 'counters': {}, 'profiles': {}, 'summary': {}}
+
+
+def test_spans_nest_per_thread_and_time_their_stage():
+    recorder = Instrumentation()
+    recorder.enable()
+
+    with recorder.span('ssd', engine='fused') as outer:
+        with recorder.span('deviations'):
+            time.sleep(0.02)
+        outer.set(rows=400)
+    worker = threading.Thread(target=lambda: recorder.span('result_write').__enter__().__exit__(None, None, None),
+                              name='writer')
+    worker.start()
+    worker.join()
+
+    by_name = {record['name']: record for record in recorder.spans}
+    assert [record['name'] for record in recorder.spans] == ['deviations', 'ssd', 'result_write']
+    assert by_name['deviations']['parent'] == 'ssd' and by_name['deviations']['depth'] == 1
+    assert by_name['ssd']['parent'] is None and by_name['ssd']['attrs'] == {'engine': 'fused', 'rows': 400}
+    assert by_name['result_write']['parent'] is None and by_name['result_write']['thread'] == 'writer'
+    assert by_name['deviations']['seconds'] >= 0.02
+    assert by_name['ssd']['seconds'] >= by_name['deviations']['seconds']
+    assert by_name['ssd']['start'] <= by_name['deviations']['start']
+
+
+def test_counters_chunks_and_traced_functions():
+    recorder = Instrumentation()
+    recorder.enable()
+
+    @recorder.traced('assignment', 'engine')
+    def assign(points, engine='vectorized'):
+        return points * 2
+
+    frames = [pd.DataFrame({'x': [1.0, 2.0]}), pd.DataFrame({'x': [3.0]})]
+    assert sum(len(chunk) for chunk in recorder.chunks('sql_read', frames, 'fetched', table='ideal')) == 3
+    assert assign(21, engine='parallel') == 42
+    recorder.count('queries')
+    recorder.count('queries', 2)
+
+    assert recorder.counters == {'rows_fetched': 3, 'bytes_fetched': 24, 'queries': 3}
+    assert [record['attrs'] for record in recorder.spans if record['name'] == 'sql_read'] == [
+        {'table': 'ideal', 'rows': 2}, {'table': 'ideal', 'rows': 1}, {'table': 'ideal'}]
+    assert recorder.spans[-1]['attrs'] == {'engine': 'parallel'}
+    assert recorder.summary()['sql_read']['calls'] == 3
+
+
+def test_export_writes_the_json_trace(tmp_path):
+    recorder = Instrumentation()
+    recorder.enable(memory=True, profile=['ssd'])
+    with recorder.span('ssd'):
+        sum(range(1000))
+    recorder.count('rows_read', 7)
+    recorder.disable()
+    path = tmp_path / 'trace.json'
+
+    trace = recorder.export(str(path))
+
+    with open(path) as trace_file:
+        written = json.load(trace_file)
+    assert written == json.loads(json.dumps(trace))
+    assert set(written) == {'spans', 'counters', 'profiles', 'summary'}
+    span = written['spans'][0]
+    assert set(span) == {'name', 'start', 'seconds', 'parent', 'depth', 'thread', 'attrs', 'peak_bytes'}
+    assert written['counters'] == {'rows_read': 7}
+    assert list(written['profiles']) == ['ssd#1'] and 'function calls' in written['profiles']['ssd#1']
+    assert written['summary']['ssd']['calls'] == 1
+
+
+def test_enable_from_environment():
+    recorder = Instrumentation()
+    assert recorder.enable_from_environment({}) is None and not recorder.enabled
+
+    path = recorder.enable_from_environment({'PIPELINE_TRACE': 'trace.json', 'PIPELINE_PROFILE': 'all'})
+
+    assert path == 'trace.json' and recorder.enabled and recorder.profile == set(STAGES)
+    recorder.disable()
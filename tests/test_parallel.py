@@ -0,0 +1,77 @@
+import tracemalloc
+import numpy as np
+import pytest
+from grid_index import XGridIndex
+from matching import assign_points
+from parallel import SharedBlock, _assign_shard, _ssd_shard, parallel_assign_points, parallel_ssd_and_max_deviation
+from ssd_engine import ssd_and_max_deviation
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(7)
+    x = np.arange(300) * 0.1
+    train = rng.standard_normal((300, 3))
+    ideal = rng.standard_normal((300, 23))
+    test_x = rng.choice(x, 97) + rng.uniform(-0.04, 0.04, 97)
+    test_y = rng.standard_normal(97)
+    return x, train, ideal, test_x, test_y
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parallel_ssd_matches_the_kernel(data, workers):
+    _, train, ideal, _, _ = data
+    ssd, max_deviation = parallel_ssd_and_max_deviation(train, ideal, workers)
+
+    expected_ssd, expected_max = ssd_and_max_deviation(train, ideal)
+    np.testing.assert_allclose(ssd, expected_ssd, rtol=1e-12)
+    np.testing.assert_array_equal(max_deviation, expected_max)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parallel_assignment_keeps_test_order(data, workers):
+    x, _, ideal, test_x, test_y = data
+    thresholds = np.full(4, 1.5)
+    best, deviation = parallel_assign_points(x, ideal[:, :4], test_x, test_y, thresholds, 'nearest', workers)
+
+    candidates = XGridIndex(x).lookup(ideal[:, :4], test_x, 'nearest')
+    expected_best, expected_deviation = assign_points(test_y, candidates, thresholds)
+    np.testing.assert_array_equal(best, expected_best)
+    np.testing.assert_array_equal(deviation, expected_deviation)
+
+
+def test_ssd_shards_read_contiguous_rows_without_copying():
+    rng = np.random.default_rng(3)
+    train = rng.standard_normal((4000, 4))
+    ideal = rng.standard_normal((4000, 500))
+    with SharedBlock(train) as train_block, SharedBlock(ideal) as ideal_block:
+        tracemalloc.start()
+        try:
+            ssd, max_deviation = _ssd_shard(train_block.descriptor(), ideal_block.descriptor(), 1000, 3000)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    # The 2000-row slice fits one 8 MB scratch buffer; copying the slice as well would double the peak
+    assert peak < ideal[1000:3000].nbytes * 3 // 2
+    expected_ssd, expected_max = ssd_and_max_deviation(train[1000:3000], ideal[1000:3000])
+    np.testing.assert_array_equal(ssd, expected_ssd)
+    np.testing.assert_array_equal(max_deviation, expected_max)
+
+
+def test_assignment_workers_reuse_the_parent_grid_index(data, monkeypatch):
+    x, _, ideal, test_x, test_y = data
+    shuffled = np.random.default_rng(5).permutation(x.size)
+    index = XGridIndex(x[shuffled])
+    values = ideal[shuffled, :4].astype(np.float32)[index.order]
+    test = np.column_stack([test_x, test_y])
+    monkeypatch.setattr(XGridIndex, '__init__', None)  # Workers must not build (sort) an index of their own
+    with SharedBlock(index.x) as grid_block, SharedBlock(values) as values_block, SharedBlock(test) as test_block:
+        assert values_block.dtype == np.float32
+        best, deviation = _assign_shard(grid_block.descriptor(), values_block.descriptor(), index.step,
+                                        test_block.descriptor(), None, 'linear', 10, 60)
+
+    candidates = index.lookup(ideal[shuffled, :4].astype(np.float32), test_x[10:60], 'linear')
+    expected_best, expected_deviation = assign_points(test_y[10:60], candidates)
+    np.testing.assert_array_equal(best, expected_best)
+    np.testing.assert_array_equal(deviation, expected_deviation)
@@ -0,0 +1,107 @@
+import json
+import os
+import pandas as pd
+import pytest
+import ploting
+from calculation import Calculations
+from ploting import Plot
+
+
+@pytest.fixture(scope='module')
+def inputs(frames):
+    df_train, df_ideal, df_test = frames
+    calculations = Calculations(df_train, df_ideal, df_test)
+    calculations.calculate_criteria1()
+    calculations.deviations()
+    calculations.results()
+    return calculations.get_ssd_sums(), pd.DataFrame(calculations.get_test_results())
+
+
+@pytest.fixture(autouse=True)
+def no_browser(monkeypatch):
+    monkeypatch.setattr(ploting, 'show', lambda layout: None)
+    monkeypatch.setattr(ploting, 'view', lambda filename: None)
+
+
+def test_repeated_dashboard_reuses_panels_and_file(tmp_path, inputs):
+    ssd_sums, test_results = inputs
+    filename = str(tmp_path / 'dashboard.html')
+    plot = Plot(ssd_sums, test_results)
+
+    assert plot.dashboard(show_plot=False, filename=filename) == {'rebuilt': 5, 'cached': 0, 'saved': True}
+    panels = plot.ssd_panels()
+    mtime = os.stat(filename).st_mtime_ns
+
+    assert plot.dashboard(show_plot=True, filename=filename) == {'rebuilt': 0, 'cached': 5, 'saved': False}
+    assert os.stat(filename).st_mtime_ns == mtime
+    assert all(a is b for a, b in zip(plot.ssd_panels(), panels))
+
+
+def test_only_changed_panels_are_rebuilt(tmp_path, inputs):
+    ssd_sums, test_results = inputs
+    filename = str(tmp_path / 'dashboard.html')
+    plot = Plot(ssd_sums, test_results)
+    plot.dashboard(show_plot=False, filename=filename)
+
+    changed = {train_func: dict(sums) for train_func, sums in ssd_sums.items()}
+    first_func = next(iter(changed))
+    changed[first_func][next(iter(changed[first_func]))] *= 2.0
+    plot.ssd_sums = changed
+    assert plot.dashboard(show_plot=False, filename=filename) == {'rebuilt': 1, 'cached': 4, 'saved': True}
+
+    plot.test_results = test_results.iloc[:50]
+    assert plot.dashboard(show_plot=False, filename=filename) == {'rebuilt': 1, 'cached': 4, 'saved': True}
+
+    os.remove(filename)
+    assert plot.dashboard(show_plot=False, filename=filename) == {'rebuilt': 0, 'cached': 5, 'saved': True}
+    assert os.path.exists(filename)
+
+
+def test_panels_cover_every_training_function(inputs):
+    ssd_sums, test_results = inputs
+    extra = dict(ssd_sums, Y5=dict(next(iter(ssd_sums.values()))))
+    plot = Plot(extra, test_results)
+
+    titles = [panel.title.text for panel in plot.ssd_panels()]
+
+    assert len(titles) == 5
+    assert [title.split('-')[0] for title in titles] == [f'SSD for {name}' for name in extra]
+    plot.ssd_sums = ssd_sums
+    plot.ssd_panels()
+    assert ('ssd', 'Y5') not in plot._panels
+
+
+def test_unchanged_dashboard_is_skipped_in_a_new_plot(tmp_path, inputs):
+    ssd_sums, test_results = inputs
+    filename = str(tmp_path / 'dashboard.html')
+
+    first = Plot(ssd_sums, test_results).dashboard(show_plot=False, filename=filename)
+    assert first == {'rebuilt': 5, 'cached': 0, 'saved': True}
+    with open(Plot.fingerprint_file(filename)) as fingerprint_file:
+        assert len(json.load(fingerprint_file)) == 5
+
+    # A new Plot stands for a new process: only the fingerprint file is shared
+    mtime = os.stat(filename).st_mtime_ns
+    second = Plot(ssd_sums, test_results).dashboard(show_plot=False, filename=filename)
+    assert second == {'rebuilt': 0, 'cached': 5, 'saved': False}
+    assert os.stat(filename).st_mtime_ns == mtime
+
+
+def test_changed_inputs_or_missing_file_are_saved_again(tmp_path, inputs):
+    ssd_sums, test_results = inputs
+    filename = str(tmp_path / 'dashboard.html')
+    plot = Plot(ssd_sums, test_results)
+    plot.dashboard(show_plot=False, filename=filename)
+
+    changed = {train_func: dict(sums) for train_func, sums in ssd_sums.items()}
+    first_func = next(iter(changed))
+    changed[first_func][next(iter(changed[first_func]))] *= 2.0
+    plot.ssd_sums = changed
+    assert plot.dashboard(show_plot=False, filename=filename) == {'rebuilt': 1, 'cached': 4, 'saved': True}
+    assert Plot(changed, test_results).dashboard(show_plot=False, filename=filename)['saved'] is False
+
+    os.remove(filename)
+    assert Plot(changed, test_results).dashboard(show_plot=False, filename=filename) == {'rebuilt': 5, 'cached': 0, 'saved': True}
+
+    smaller = Plot(changed, test_results.iloc[:50]).dashboard(show_plot=False, filename=filename)
+    assert smaller['saved'] is True
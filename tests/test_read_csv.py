@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import pandas as pd
+import pytest
+from conftest import ROOT
+from connection_pool import registry
+from storage_backend import SQLiteBackend
+
+# The module file name has spaces, so it is loaded from its path
+_spec = importlib.util.spec_from_file_location('read_csv_files', os.path.join(ROOT, 'read csv files.py'))
+read_csv_files = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(read_csv_files)
+
+FILE_NAMES = ['train.csv', 'test.csv', 'ideal.csv']
+FILE_TO_TABLE = {'train.csv': 'train_table', 'test.csv': 'test_table', 'ideal.csv': 'ideal_table'}
+TABLES = {
+    'train_table': [('x', 'FLOAT')] + [(f'y{i}', 'FLOAT') for i in range(1, 5)],
+    'test_table': [('x', 'FLOAT'), ('y', 'FLOAT')],
+    'ideal_table': [('x', 'FLOAT')] + [(f'y{i}', 'FLOAT') for i in range(1, 51)],
+}
+
+
+def sqlite_read_csv(database_path):
+    """
+    A ReadCsv writing to an SQLite file instead of SQL Server.
+    """
+    return read_csv_files.ReadCsv('localhost', 'db', 'user', 'password', 'driver', None, ROOT, FILE_NAMES, TABLES,
+                                  FILE_TO_TABLE, backend=SQLiteBackend(database_path))
+
+
+@pytest.fixture(autouse=True)
+def dispose_engines():
+    yield
+    registry.dispose_all()
+
+
+def read_tables(engine):
+    return {table: pd.read_sql_query(f"SELECT * FROM {table}", engine) for table in TABLES}
+
+
+def test_concurrent_chunked_load_matches_sequential_load(tmp_path):
+    sequential = sqlite_read_csv(str(tmp_path / 'sequential.db'))
+    frames = sequential.read_csv_to_sql()
+    concurrent = sqlite_read_csv(str(tmp_path / 'concurrent.db'))
+    kept = concurrent.read_csv_to_sql(concurrent=True, max_workers=3, chunksize=64, keep_frames=['train', 'test'])
+
+    expected, actual = read_tables(sequential.engine), read_tables(concurrent.engine)
+    for table in TABLES:
+        assert list(actual[table].columns) == [column for column, _ in TABLES[table]]
+        pd.testing.assert_frame_equal(actual[table], expected[table])
+    assert len(actual['ideal_table']) == 400
+
+    assert sorted(frames) == ['ideal', 'test', 'train']
+    assert sorted(kept) == ['test', 'train']
+    pd.testing.assert_frame_equal(kept['train'], frames['train'])
+    pd.testing.assert_frame_equal(kept['train'], expected['train_table'])
@@ -0,0 +1,72 @@
+import os
+import tracemalloc
+import numpy as np
+from calculation import Calculations
+from dataset import ArrayDataset
+from selection_cache import SelectionCache
+
+
+def test_second_run_is_answered_from_the_cache(frames, tmp_path):
+    cache = SelectionCache(str(tmp_path / 'selection'))
+    first = Calculations(*frames)
+    assert first.calculate_criteria1_cached(cache) is False
+
+    second = Calculations(*frames)
+    assert second.calculate_criteria1_cached(cache) is True
+
+    assert second.top_four_ideal_functions == first.top_four_ideal_functions
+    assert second.adjusted_deviations == first.adjusted_deviations
+    assert second.ssd_sums == {train_func: {ideal_func: float(value) for ideal_func, value in sums.items()}
+                               for train_func, sums in first.ssd_sums.items()}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_changed_data_or_settings_miss(frames, tmp_path):
+    df_train, df_ideal, _ = frames
+    key = SelectionCache.fingerprint([df_train, df_ideal], {'engine': 'fused'})
+
+    assert SelectionCache.fingerprint([df_train, df_ideal], {'engine': 'fused'}) == key
+    assert SelectionCache.fingerprint([df_train, df_ideal], {'engine': 'vectorized'}) != key
+    changed = df_train.copy()
+    changed.iloc[0, 1] += 1e-9
+    assert SelectionCache.fingerprint([changed, df_ideal], {'engine': 'fused'}) != key
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SelectionCache(str(tmp_path / 'selection'), max_entries=2)
+    for key in ('a', 'b'):
+        cache.put(key, {'value': key})
+    os.utime(cache._path('a'), ns=(1, 1))
+    os.utime(cache._path('b'), ns=(2, 2))
+    cache.get('a')  # Refreshes 'a', so 'b' is now the least recently used
+
+    cache.put('c', {'value': 'c'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'value': 'a'} and cache.get('c') == {'value': 'c'}
+    assert cache.stats()['entries'] == 2
+
+
+def test_dataset_fingerprint_hashes_the_buffers_in_place(tmp_path):
+    rng = np.random.default_rng(2)
+    x = np.arange(20000) * 0.1
+    names = [f'Y{i} (ideal func)' for i in range(1, 51)]
+    dataset = ArrayDataset(x, rng.standard_normal((20000, 50)), names)
+    np.save(tmp_path / 'values.npy', dataset.values)
+    mapped = ArrayDataset.from_block(x, np.load(tmp_path / 'values.npy', mmap_mode='r'), names)
+
+    tracemalloc.start()
+    try:
+        key = SelectionCache.fingerprint([dataset], {'engine': 'fused'})
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < dataset.values.nbytes // 100
+    assert SelectionCache.fingerprint([mapped], {'engine': 'fused'}) == key
+    assert SelectionCache.fingerprint([dataset.astype(np.float32)], {'engine': 'fused'}) != key
+    renamed = ArrayDataset(x, dataset.values, names[::-1])
+    assert SelectionCache.fingerprint([renamed], {'engine': 'fused'}) != key
+    changed = ArrayDataset(x, dataset.values.copy(), names)
+    changed.values[123, 4] += 1e-12
+    assert SelectionCache.fingerprint([changed], {'engine': 'fused'}) != key
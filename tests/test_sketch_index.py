@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sketch_index import IdealSketchIndex
+from ssd_engine import as_block
+
+
+@pytest.fixture(scope='module')
+def blocks(frames):
+    df_train, df_ideal, _ = frames
+    df_train, df_ideal = df_train.sort_values(by='X'), df_ideal.sort_values(by='X')
+    train = as_block(df_train[[col for col in df_train.columns if col != 'X']])
+    ideal = as_block(df_ideal[[col for col in df_ideal.columns if col != 'X']])
+    return df_ideal, train, ideal
+
+
+@pytest.mark.parametrize('method', IdealSketchIndex.METHODS)
+def test_shortlist_recalls_the_exact_winners(blocks, method):
+    df_ideal, train, ideal = blocks
+    index = IdealSketchIndex.from_frame(df_ideal, dims=16, method=method)
+
+    assert index.recall(train, ideal, candidates=12, k=1) == 1.0
+    assert index.recall(train, ideal, candidates=ideal.shape[1], k=5) == 1.0
+    shortlist = index.shortlist(train, candidates=12)
+    assert shortlist.shape == (train.shape[1], 12)
+    assert all(len(set(row)) == 12 for row in shortlist)
+
+
+def test_saved_index_gives_the_same_shortlist(blocks, tmp_path):
+    df_ideal, train, _ = blocks
+    index = IdealSketchIndex.from_frame(df_ideal, dims=16, method='pca')
+    path = tmp_path / 'sketch.npz'
+    index.save(path)
+
+    loaded = IdealSketchIndex.load(path)
+
+    assert loaded.method == 'pca' and loaded.ideal_columns == index.ideal_columns
+    np.testing.assert_array_equal(loaded.x, index.x)
+    np.testing.assert_array_equal(loaded.shortlist(train, 12), index.shortlist(train, 12))
+
+
+def test_invalid_queries_are_rejected(blocks):
+    df_ideal, train, _ = blocks
+    with pytest.raises(ValueError):
+        IdealSketchIndex.from_frame(df_ideal, method='lsh')
+    index = IdealSketchIndex.from_frame(df_ideal, dims=8)
+    with pytest.raises(ValueError):
+        index.shortlist(train[:-1])
+
+
+def test_shortlist_rejects_a_different_x_grid(blocks):
+    df_ideal, train, _ = blocks
+    index = IdealSketchIndex.from_frame(df_ideal, dims=8)
+    x = df_ideal['X'].to_numpy()
+
+    np.testing.assert_array_equal(index.shortlist(train, 8, x=x), index.shortlist(train, 8))
+    with pytest.raises(ValueError):
+        index.shortlist(train, 8, x=x + 0.05)
+    with pytest.raises(ValueError):
+        index.shortlist(train[:-1], 8, x=x[:-1])
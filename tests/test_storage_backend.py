@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from connection_pool import registry
+from storage_backend import DuckDBBackend, MSSQLBackend, MySQLBackend, SQLiteBackend
+
+RESULT_DDL = "CREATE TABLE results (x DOUBLE, y DOUBLE, ideal_function VARCHAR, UNIQUE (x, y))"
+
+
+def make_backend(name, tmp_path):
+    if name == 'duckdb':
+        pytest.importorskip('duckdb_engine')
+        return DuckDBBackend(str(tmp_path / 'store.duckdb'))
+    return SQLiteBackend(str(tmp_path / 'store.db'))
+
+
+@pytest.fixture(autouse=True)
+def dispose_engines():
+    yield
+    registry.dispose_all()
+
+
+@pytest.mark.parametrize('name', ['sqlite', 'duckdb'])
+def test_write_frame_replaces_and_appends(name, tmp_path, frames):
+    backend = make_backend(name, tmp_path)
+    df_test = frames[2].set_axis(['x', 'y'], axis=1)
+
+    backend.write_frame(df_test, 'test', if_exists='replace')
+    backend.write_frame(df_test.iloc[:10], 'test', if_exists='append')
+    assert len(pd.read_sql_query("SELECT * FROM test", backend.engine())) == 110
+
+    backend.write_frame(df_test.iloc[:10], 'test', if_exists='replace')
+    stored = pd.read_sql_query("SELECT * FROM test", backend.engine())
+    pd.testing.assert_frame_equal(stored, df_test.iloc[:10])
+
+
+@pytest.mark.parametrize('name', ['sqlite', 'duckdb'])
+def test_insert_rows_with_replace_mode(name, tmp_path):
+    backend = make_backend(name, tmp_path)
+    connection = backend.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(RESULT_DDL)
+        columns = ['x', 'y', 'ideal_function']
+        backend.insert_rows(cursor, 'results', columns, [(1.0, 2.0, 'y1'), (2.0, 3.0, 'y2')])
+        backend.insert_rows(cursor, 'results', columns, [(1.0, 2.0, 'y3')], mode='replace')
+        connection.commit()
+        cursor.execute("SELECT x, y, ideal_function FROM results ORDER BY x")
+        assert [tuple(row) for row in cursor.fetchall()] == [(1.0, 2.0, 'y3'), (2.0, 3.0, 'y2')]
+    finally:
+        connection.close()
+
+
+def test_sql_server_has_no_replace_mode():
+    backend = MSSQLBackend('server', 'db', 'user', 'password', 'ODBC Driver 18 for SQL Server')
+    assert backend.insert_verb('insert') == 'INSERT'
+    with pytest.raises(ValueError):
+        backend.insert_verb('replace')
+
+
+class RecordingCursor:
+    rowcount = 3
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, query):
+        self.queries.append(query)
+
+
+def test_mysql_load_data_escapes_the_path():
+    cursor = RecordingCursor()
+    backend = MySQLBackend('localhost', 'user', 'password', 'db', allow_local_infile=True)
+
+    rows = backend.load_csv_file(cursor, "C:\\data\\o'brien.csv", 'db.test', ['x', 'y'])
+
+    assert rows == 3
+    assert "LOAD DATA LOCAL INFILE 'C:/data/o''brien.csv' INTO TABLE db.test" in cursor.queries[0]
+
+
+def test_mysql_replace_mode_is_a_batchable_upsert():
+    re_insert = pytest.importorskip('mysql.connector.cursor').RE_SQL_INSERT_STMT
+    backend = MySQLBackend('localhost', 'user', 'password', 'db')
+
+    statement = backend.insert_statement('mapping', ['x', 'y', 'ideal_function'], mode='replace')
+
+    assert statement == ("INSERT INTO mapping (x, y, ideal_function) VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE "
+                         "x = VALUES(x), y = VALUES(y), ideal_function = VALUES(ideal_function)")
+    # mysql.connector turns executemany into one multi-row INSERT only for statements matching this pattern
+    assert re_insert.match(statement)
+    assert not re_insert.match(SQLiteBackend('unused.db').insert_statement('mapping', ['x'], mode='replace'))
+    assert backend.insert_statement('mapping', ['x'], mode='insert') == "INSERT INTO mapping (x) VALUES (%s)"
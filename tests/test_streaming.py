@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+from connection_pool import registry
+from storage_backend import SQLiteBackend
+from streaming import RESULT_COLUMNS, ResultBatch, ResultSink
+
+
+def make_batch(start, size=25):
+    x = np.arange(start, start + size, dtype=np.float64)
+    function = (np.arange(size) % 3 - 1).astype(np.int32)  # -1 is an unmatched point
+    delta = np.where(function >= 0, x / 100.0, np.nan)
+    return ResultBatch(x, x * 2.0, delta, function, ('Y42 (ideal func)', 'Y41 (ideal func)'))
+
+
+class GatedBackend(SQLiteBackend):
+    """
+    An SQLite backend whose writes wait until `gate` is set, standing in for a slow result table.
+    """
+    def __init__(self, path):
+        super().__init__(path)
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def write_frame(self, frame, table_name, if_exists='append', dtype=None):
+        self.started.set()
+        self.gate.wait(10)
+        super().write_frame(frame, table_name, if_exists, dtype)
+
+
+class FailingBackend:
+    def __init__(self):
+        self.failed = threading.Event()
+
+    def write_frame(self, frame, table_name, if_exists='append', dtype=None):
+        self.failed.set()
+        raise RuntimeError("disk full")
+
+
+@pytest.fixture(autouse=True)
+def dispose_engines():
+    yield
+    registry.dispose_all()
+
+
+def test_batches_are_written_in_order(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'results.db'))
+    batches = [make_batch(start) for start in range(0, 100, 25)]
+
+    rows = ResultSink(backend, 'results', queue_size=1).consume(iter(batches))
+
+    stored = pd.read_sql_query("SELECT * FROM results", backend.engine())
+    assert rows == len(stored) == 100
+    assert list(stored.columns) == RESULT_COLUMNS
+    np.testing.assert_array_equal(stored['X (test func)'].to_numpy(), np.arange(100.0))
+    expected = pd.concat([batch.to_frame() for batch in batches], ignore_index=True)
+    assert stored['No. of ideal func'].tolist() == expected['No. of ideal func'].tolist()
+
+    # A second sink replaces the table on its first batch
+    assert ResultSink(backend, 'results').consume([make_batch(0, 5)]) == 5
+    assert len(pd.read_sql_query("SELECT * FROM results", backend.engine())) == 5
+
+
+def test_write_errors_surface_in_write_and_close():
+    target = FailingBackend()
+    sink = ResultSink(target, 'results', queue_size=1)
+    sink.write(make_batch(0))
+    assert target.failed.wait(10)
+
+    with pytest.raises(RuntimeError, match='disk full'):
+        for start in range(25, 10000, 25):
+            sink.write(make_batch(start))
+    with pytest.raises(RuntimeError, match='disk full'):
+        sink.close()
+    with pytest.raises(ValueError):
+        sink.write(make_batch(0))
+
+
+def test_full_queue_blocks_the_producer(tmp_path):
+    backend = GatedBackend(str(tmp_path / 'results.db'))
+    sink = ResultSink(backend, 'results', queue_size=1)
+    sink.write(make_batch(0))
+    assert backend.started.wait(10)  # The writer holds the first batch
+    sink.write(make_batch(25))       # The second one fills the queue
+
+    producer = threading.Thread(target=sink.write, args=(make_batch(50),))
+    producer.start()
+    producer.join(0.3)
+    assert producer.is_alive()       # The third write waits for room in the queue
+
+    backend.gate.set()
+    producer.join(10)
+    assert not producer.is_alive()
+    assert sink.close() == 75